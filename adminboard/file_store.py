@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+內容尋址文件庫
+把任務下載的文件按 sha256 收進 objects/ab/cd/<hash> 佈局：定長分塊流式哈希，內存佔用恆定；
+內容相同的文件用硬鏈接指向同一對象（跨文件系統時只記錄引用），哈希寫回任務數據庫的 files 表。
+serve 子命令即 file_manager 服務（端口 5005），按哈希查詢並以 sendfile 零拷貝返回文件內容
+"""
+
+import argparse
+import errno
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import sqlite3
+import stat
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024            # 流式哈希的分塊大小
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+DEFAULT_STORE_ROOT = os.environ.get('FILE_STORE_ROOT', '/home/alexchuang/manus/file_store')
+DEFAULT_TASK_DB = os.environ.get('MANUS_TASK_DB', '/home/alexchuang/manus/manus_tasks.db')
+DOWNLOAD_DIR_NAME = 'doc'           # 任務目錄下存放下載文件的子目錄
+# 下載中的臨時文件與數據庫文件不入庫
+SKIP_SUFFIXES = ('.crdownload', '.part', '.tmp', '.db', '.db-wal', '.db-shm', '.db-journal')
+OBJECT_MODE = 0o444                 # 對象與其硬鏈接共享 inode，只讀防止一處修改波及所有副本
+
+_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileStoreError(Exception):
+    """文件庫操作失敗"""
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    """按定長分塊讀入同一個緩衝區計算 sha256，返回 (hexdigest, size)"""
+    digest = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    size = 0
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+            size += n
+    return digest.hexdigest(), size
+
+
+def resolve_ingest_tree(tree, base_dir):
+    """解析待收錄的目錄並限制在任務根目錄之內（符號鏈接按真實路徑判斷）；越界時拋出 FileStoreError"""
+    base_dir = os.path.realpath(base_dir)
+    resolved = os.path.realpath(tree or base_dir)
+    if os.path.commonpath([base_dir, resolved]) != base_dir:
+        raise FileStoreError(f"目錄不在任務根目錄 {base_dir} 之內: {tree}")
+    if not os.path.isdir(resolved):
+        raise FileStoreError(f"目錄不存在: {tree}")
+    return resolved
+
+
+def iter_download_files(root, store_root=None, all_files=False):
+    """遍歷下載目錄樹；默認只收 */doc/ 下的文件（任務下載佈局），跳過文件庫自身與符號鏈接"""
+    root = os.path.abspath(root)
+    store_root = os.path.abspath(store_root) if store_root else None
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames
+                             if not d.startswith('.') and os.path.join(dirpath, d) != store_root)
+        if not all_files and DOWNLOAD_DIR_NAME not in os.path.relpath(dirpath, root).split(os.sep):
+            continue
+        for filename in sorted(filenames):
+            if filename.startswith('.') or filename.endswith(SKIP_SUFFIXES):
+                continue
+            path = os.path.join(dirpath, filename)
+            if stat.S_ISREG(os.lstat(path).st_mode):
+                yield path
+
+
+class FileStore:
+    """對象目錄加 catalog.db：objects 記錄每個內容一份，refs 記錄每個入庫路徑指向的哈希"""
+
+    def __init__(self, root=DEFAULT_STORE_ROOT, chunk_size=CHUNK_SIZE):
+        self.root = os.path.abspath(root)
+        self.chunk_size = chunk_size
+        self.objects_dir = os.path.join(self.root, 'objects')
+        self.tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.root, 'catalog.db'), check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        with self._conn:
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY, size INTEGER NOT NULL, created_at TEXT)''')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS refs (
+                path TEXT PRIMARY KEY, sha256 TEXT NOT NULL, size INTEGER NOT NULL,
+                mtime_ns INTEGER, inode INTEGER, linked INTEGER NOT NULL, updated_at TEXT)''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_refs_sha256 ON refs (sha256)')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256[:2], sha256[2:4], sha256)
+
+    def _cached_ref(self, path, st):
+        """路徑的 size / mtime / inode 均未變化時沿用上次的哈希，重複入庫不必重讀文件"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM refs WHERE path = ?', (path,)).fetchone()
+        if row is None or (row['size'], row['mtime_ns'], row['inode']) != (st.st_size, st.st_mtime_ns, st.st_ino):
+            return None
+        try:
+            if row['linked'] and os.stat(self.object_path(row['sha256'])).st_ino != st.st_ino:
+                return None
+        except FileNotFoundError:
+            return None
+        return row
+
+    def _store_object(self, path, sha256):
+        """對象不存在時把原文件硬鏈接進庫（零拷貝）；跨文件系統時複製。已存在返回 False"""
+        object_path = self.object_path(sha256)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        try:
+            os.link(path, object_path)
+        except FileExistsError:
+            return False
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            tmp_path = os.path.join(self.tmp_dir, f"{sha256}.{uuid.uuid4().hex}")
+            shutil.copyfile(path, tmp_path)
+            os.chmod(tmp_path, OBJECT_MODE)
+            os.replace(tmp_path, object_path)
+            return True
+        os.chmod(object_path, OBJECT_MODE)
+        return True
+
+    def _link_to_object(self, path, sha256):
+        """用指向對象的硬鏈接原子替換原文件；無法建立硬鏈接時返回 False，只記錄引用"""
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.cas")
+        try:
+            os.link(self.object_path(sha256), tmp_path)
+        except OSError as e:
+            if e.errno in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                return False
+            raise
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+        return True
+
+    def ingest(self, path):
+        """收錄單個文件，返回 {'path','sha256','size','status','saved_bytes'}；
+        status: stored 新對象 / deduplicated 已替換為硬鏈接 / referenced 僅記錄引用 / unchanged 之前已收錄"""
+        path = os.path.abspath(path)
+        before = os.stat(path)
+        if not stat.S_ISREG(before.st_mode):
+            raise FileStoreError(f"不是普通文件: {path}")
+        cached = self._cached_ref(path, before)
+        if cached is not None:
+            return {'path': path, 'sha256': cached['sha256'], 'size': cached['size'],
+                    'status': 'unchanged', 'saved_bytes': 0}
+
+        sha256, size = hash_file(path, self.chunk_size)
+        after = os.stat(path)
+        if (after.st_size, after.st_mtime_ns, after.st_ino) != (before.st_size, before.st_mtime_ns, before.st_ino):
+            raise FileStoreError(f"文件在哈希期間被修改: {path}")
+
+        saved = 0
+        if self._store_object(path, sha256):
+            status = 'stored'
+        elif os.stat(self.object_path(sha256)).st_ino == after.st_ino:
+            status = 'unchanged'
+        elif self._link_to_object(path, sha256):
+            status = 'deduplicated'
+            # 原 inode 還有其他鏈接時磁盤塊不會釋放
+            saved = size if after.st_nlink == 1 else 0
+        else:
+            status = 'referenced'
+
+        current = os.stat(path)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR IGNORE INTO objects VALUES (?, ?, ?)', (sha256, size, now))
+            self._conn.execute('INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (path, sha256, size, current.st_mtime_ns, current.st_ino,
+                                int(status != 'referenced'), now))
+        return {'path': path, 'sha256': sha256, 'size': size, 'status': status, 'saved_bytes': saved}
+
+    def ingest_tree(self, root, workers=DEFAULT_WORKERS, all_files=False, progress=None):
+        """線程池並行收錄下載目錄樹（hashlib 與文件讀取都會釋放 GIL），返回結果列表與節省報告"""
+        results = []
+        errors = []
+        started = time.perf_counter()
+        paths = iter_download_files(root, self.root, all_files)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < workers * 4:
+                    path = next(paths, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    pending[executor.submit(self.ingest, path)] = path
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    try:
+                        results.append(future.result())
+                    except (OSError, FileStoreError) as e:
+                        logger.error(f"收錄文件 {path} 失敗: {str(e)}")
+                        errors.append({'path': path, 'error': str(e)})
+                    if progress is not None:
+                        progress(len(results) + len(errors))
+        elapsed = time.perf_counter() - started
+        return results, self._report(results, errors, elapsed)
+
+    def _report(self, results, errors, elapsed):
+        statuses = {}
+        for result in results:
+            statuses[result['status']] = statuses.get(result['status'], 0) + 1
+        scanned = sum(r['size'] for r in results if r['status'] != 'unchanged')
+        report = {
+            'files': len(results),
+            'statuses': statuses,
+            'errors': errors,
+            'scanned_bytes': scanned,
+            'saved_bytes': sum(r['saved_bytes'] for r in results),
+            'elapsed': round(elapsed, 3),
+            'mb_per_sec': round(scanned / elapsed / 1e6, 1) if elapsed > 0 else None
+        }
+        report['store'] = self.stats()
+        return report
+
+    def stats(self):
+        """logical 為全部引用路徑的總大小，physical 為對象佔用；兩者之差即去重節省的空間"""
+        with self._lock:
+            objects, physical = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects').fetchone()
+            refs, logical, referenced = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(linked = 0), 0) FROM refs').fetchone()
+        return {
+            'objects': objects,
+            'refs': refs,
+            'referenced_only': referenced,
+            'logical_bytes': logical,
+            'physical_bytes': physical,
+            'saved_bytes': max(logical - physical, 0),
+            'dedup_ratio': round(logical / physical, 3) if physical else None
+        }
+
+    def lookup(self, sha256):
+        """按哈希查詢對象元數據與引用它的路徑；不存在返回 None"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM objects WHERE sha256 = ?', (sha256,)).fetchone()
+            if row is None:
+                return None
+            refs = self._conn.execute('SELECT path, linked, updated_at FROM refs WHERE sha256 = ? ORDER BY path',
+                                      (sha256,)).fetchall()
+        entry = dict(row)
+        entry['refs'] = [dict(ref) for ref in refs]
+        return entry
+
+    def lookup_path(self, path):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM refs WHERE path = ?', (os.path.abspath(path),)).fetchone()
+        return dict(row) if row is not None else None
+
+
+def record_hashes(db_path, results):
+    """把哈希寫回任務數據庫 files.sha256（舊庫自動加列），按 filepath 匹配；返回更新的行數"""
+    hashes = {os.path.normpath(r['path']): r['sha256'] for r in results}
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(files)')}
+        if not columns:
+            raise FileStoreError(f"任務數據庫中沒有 files 表: {db_path}")
+        with conn:
+            if 'sha256' not in columns:
+                conn.execute('ALTER TABLE files ADD COLUMN sha256 TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files (sha256)')
+        updates = []
+        for file_id, filepath, current in conn.execute('SELECT id, filepath, sha256 FROM files'):
+            sha256 = hashes.get(os.path.normpath(filepath)) if filepath else None
+            if sha256 is not None and sha256 != current:
+                updates.append((sha256, file_id))
+        if updates:
+            with conn:
+                conn.executemany('UPDATE files SET sha256 = ? WHERE id = ?', updates)
+        return len(updates)
+    finally:
+        conn.close()
+
+
+def ingest_downloads(store, root, db_path=None, workers=DEFAULT_WORKERS, all_files=False, progress=None):
+    """收錄下載目錄樹並（可選）把哈希寫回任務數據庫，返回節省報告"""
+    results, report = store.ingest_tree(root, workers, all_files, progress)
+    if db_path and os.path.exists(db_path):
+        report['db_updated'] = record_hashes(db_path, results)
+    return report
+
+
+class FileStoreHandler(BaseHTTPRequestHandler):
+    """GET /health、/api/stats、/api/objects/<hash>、/api/lookup?path=；GET|HEAD /objects/<hash> 返回內容"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FileStore/1.0'
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, payload, status=HTTPStatus.OK):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        store = self.server.store
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        try:
+            if url.path == '/health':
+                self._send_json({'status': 'healthy', 'objects': store.stats()['objects'],
+                                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+            elif url.path == '/api/stats':
+                self._send_json(store.stats())
+            elif url.path == '/api/lookup':
+                path = parse_qs(url.query).get('path', [''])[0]
+                ref = store.lookup_path(path) if path else None
+                if ref is None:
+                    self._send_json({'error': f'未收錄的路徑: {path}'}, HTTPStatus.NOT_FOUND)
+                else:
+                    self._send_json(ref)
+            elif len(parts) == 3 and parts[:2] == ['api', 'objects'] and _SHA256.match(parts[2]):
+                entry = store.lookup(parts[2])
+                if entry is None:
+                    self._send_json({'error': f'對象不存在: {parts[2]}'}, HTTPStatus.NOT_FOUND)
+                else:
+                    self._send_json(entry)
+            elif len(parts) == 2 and parts[0] == 'objects' and _SHA256.match(parts[1]):
+                self._send_object(parts[1])
+            else:
+                self._send_json({'error': f'未知路徑: {url.path}'}, HTTPStatus.NOT_FOUND)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as e:
+            logger.error(f"處理請求 {self.path} 時發生錯誤: {str(e)}")
+            self._send_json({'error': str(e)}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def _send_object(self, sha256):
+        """內容不可變：ETag 即哈希；支持單段 Range，響應體交給 socket.sendfile（Linux 上為 os.sendfile）"""
+        store = self.server.store
+        try:
+            f = open(store.object_path(sha256), 'rb')
+        except FileNotFoundError:
+            self._send_json({'error': f'對象不存在: {sha256}'}, HTTPStatus.NOT_FOUND)
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            etag = f'"{sha256}"'
+            if etag in self.headers.get('If-None-Match', ''):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            offset, count, status = 0, size, HTTPStatus.OK
+            match = _RANGE.match(self.headers.get('Range', ''))
+            if match and (match.group(1) or match.group(2)):
+                start, end = match.groups()
+                if start:
+                    offset = int(start)
+                    last = min(int(end), size - 1) if end else size - 1
+                else:
+                    offset = max(size - int(end), 0)
+                    last = size - 1
+                if offset >= size or last < offset:
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header('Content-Range', f'bytes */{size}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                count, status = last - offset + 1, HTTPStatus.PARTIAL_CONTENT
+
+            entry = store.lookup(sha256)
+            name = os.path.basename(entry['refs'][0]['path']) if entry and entry['refs'] else sha256
+            self.send_response(status)
+            self.send_header('Content-Type', mimetypes.guess_type(name)[0] or 'application/octet-stream')
+            self.send_header('Content-Length', str(count))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+            if status == HTTPStatus.PARTIAL_CONTENT:
+                self.send_header('Content-Range', f'bytes {offset}-{offset + count - 1}/{size}')
+            self.end_headers()
+            if self.command != 'HEAD' and count:
+                self.connection.sendfile(f, offset, count)
+
+
+class FileStoreServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store):
+        super().__init__(address, FileStoreHandler)
+        self.store = store
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='內容尋址文件庫')
+    parser.add_argument('--root', default=DEFAULT_STORE_ROOT, help='文件庫目錄，需與下載目錄同一文件系統才能硬鏈接去重')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve = subparsers.add_parser('serve', help='啟動 file_manager 服務')
+    serve.add_argument('--host', default='0.0.0.0')
+    serve.add_argument('--port', type=int, default=5005)
+    ingest = subparsers.add_parser('ingest', help='並行收錄下載目錄樹並輸出節省報告')
+    ingest.add_argument('tree', nargs='?', default=os.path.dirname(DEFAULT_TASK_DB))
+    ingest.add_argument('--db', default=DEFAULT_TASK_DB, help='寫回 files.sha256 的任務數據庫')
+    ingest.add_argument('--no-db', action='store_true', help='不寫回任務數據庫')
+    ingest.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    ingest.add_argument('--all', action='store_true', help='收錄整棵目錄樹，而不只是 */doc/ 下的下載文件')
+    lookup = subparsers.add_parser('lookup', help='按哈希或路徑查詢')
+    lookup.add_argument('key')
+    subparsers.add_parser('stats', help='輸出文件庫統計')
+    args = parser.parse_args()
+
+    store = FileStore(args.root)
+    if args.command == 'serve':
+        server = FileStoreServer((args.host, args.port), store)
+        logger.info(f"文件庫服務監聽 {args.host}:{args.port}，對象目錄 {store.objects_dir}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            store.close()
+        return
+
+    if args.command == 'ingest':
+        def progress(done):
+            if done % 1000 == 0:
+                print(f"⏳ 已處理 {done} 個文件", file=sys.stderr)
+
+        result = ingest_downloads(store, args.tree, None if args.no_db else args.db,
+                                  args.workers, args.all, progress)
+    elif args.command == 'lookup':
+        result = store.lookup(args.key) if _SHA256.match(args.key) else store.lookup_path(args.key)
+    else:
+        result = store.stats()
+    store.close()
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
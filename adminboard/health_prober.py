@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+後台健康探測調度器
+按服務各自的間隔定期探測，結果寫入共享的內存快照，API 直接讀取快照而不做任何外部 I/O
+"""
+
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_INTERVAL = 10.0   # 秒
+DEFAULT_STALE_AFTER = 30.0      # 秒
+
+
+class HealthProber:
+    """長駐的後台探測器，維護所有服務的最新健康快照"""
+
+    def __init__(self, services, check_func=None, default_interval=DEFAULT_PROBE_INTERVAL,
+                 stale_after=DEFAULT_STALE_AFTER, max_workers=None, engine=None):
+        self.services = services
+        self.check_func = check_func
+        self.engine = engine
+        self.default_interval = default_interval
+        self.stale_after = stale_after
+        self.max_workers = max_workers or max(len(services), 1)
+
+        self._entries = {}          # service_name -> (monotonic 時間戳, 結果)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queue = []            # (下次到期時間, service_name, 調度代數)
+        self._generations = {}      # service_name -> 最新調度代數，被取代的隊列項自動失效
+        self._in_flight = set()
+        self._listeners = []
+        self.version = 0            # 每次快照更新遞增，用於生成 ETag
+        self.updated_at = None      # 最近一次快照更新的時間戳
+        self._executor = None
+        self._thread = None
+        self._running = False
+
+    def interval_for(self, service_name):
+        """獲取服務的探測間隔"""
+        config = self.services.get(service_name, {})
+        return float(config.get('interval', self.default_interval))
+
+    @property
+    def in_flight_count(self):
+        return len(self._in_flight)
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def add_listener(self, callback):
+        """註冊探測結果回調 callback(service_name, result)"""
+        self._listeners.append(callback)
+
+    def start(self):
+        """啟動調度線程（重複調用無副作用）"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            if self.engine is not None:
+                self.engine.start()
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='health-probe')
+            self._queue = []
+            for name in list(self.services):
+                self._schedule(name, 0)
+            self._thread = threading.Thread(target=self._run, name='health-prober', daemon=True)
+            self._thread.start()
+        logger.info(f"健康探測調度器已啟動，共 {len(self.services)} 個服務")
+
+    def stop(self):
+        """停止調度線程"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            self._wakeup.notify_all()
+        self._thread.join(timeout=5)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        logger.info("健康探測調度器已停止")
+
+    def _run(self):
+        while True:
+            try:
+                if not self._run_once():
+                    return
+            except Exception as e:
+                # 單個條目出錯不能讓調度線程退出，否則所有服務都停止探測
+                logger.error(f"健康探測調度出錯: {str(e)}")
+                time.sleep(0.1)
+
+    def _run_once(self):
+        """處理一個到期的隊列項；調度器停止時返回 False"""
+        with self._lock:
+            if not self._running:
+                return False
+            if not self._queue:
+                self._wakeup.wait()
+                return True
+            due, service_name, generation = self._queue[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                self._wakeup.wait(timeout=delay)
+                return True
+            heapq.heappop(self._queue)
+            # 持鎖取配置快照：釋放鎖後註冊表熱加載可能刪除該服務
+            config = self.services.get(service_name)
+            if config is None or generation != self._generations.get(service_name, 0):
+                return True
+            # 上一輪探測尚未結束時不重複提交
+            if service_name in self._in_flight:
+                self._schedule(service_name, self.interval_for(service_name))
+                return True
+            self._in_flight.add(service_name)
+        try:
+            future = self._dispatch(service_name, config)
+        except Exception:
+            with self._lock:
+                self._in_flight.discard(service_name)
+                if self._running and service_name in self.services:
+                    self._schedule(service_name, self.interval_for(service_name))
+            raise
+        future.add_done_callback(lambda future, name=service_name: self._on_done(name, future, reschedule=True))
+        return True
+
+    def _dispatch(self, service_name, config):
+        """提交一次探測，返回 Future；有異步引擎時走事件循環，否則走線程池"""
+        if self.engine is not None:
+            return self.engine.submit(service_name, config)
+        return self._executor.submit(self.check_func, service_name, config)
+
+    def _on_done(self, service_name, future, reschedule=False):
+        config = self.services.get(service_name)
+        if config is None:
+            # 探測期間服務已被移除
+            with self._lock:
+                self._in_flight.discard(service_name)
+                self._entries.pop(service_name, None)
+            return None
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"探測服務 {service_name} 時發生錯誤: {str(e)}")
+            result = {
+                'name': config['name'],
+                'port': config['port'],
+                'type': config['type'],
+                'status': 'error',
+                'status_code': 0,
+                'response_time': 'Error',
+                'url': f"http://localhost:{config['port']}",
+                'error': str(e),
+                'last_check': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+        with self._lock:
+            self._entries[service_name] = (time.monotonic(), result)
+            self.version += 1
+            self.updated_at = time.time()
+            if reschedule:
+                self._in_flight.discard(service_name)
+                if self._running and service_name in self.services:
+                    self._schedule(service_name, self.interval_for(service_name))
+        for callback in self._listeners:
+            try:
+                callback(service_name, result)
+            except Exception as e:
+                logger.error(f"探測結果回調失敗: {str(e)}")
+        return result
+
+    def _schedule(self, service_name, delay):
+        """加入調度隊列並取代該服務之前的隊列項（需持有鎖）"""
+        generation = self._generations.get(service_name, 0) + 1
+        self._generations[service_name] = generation
+        heapq.heappush(self._queue, (time.monotonic() + delay, service_name, generation))
+        self._wakeup.notify()
+
+    def on_registry_change(self, added, removed, changed):
+        """註冊表變更回調：只重新調度新增與變更的服務，其餘調度不受影響"""
+        with self._lock:
+            for service_name in removed:
+                self._generations.pop(service_name, None)
+                self._entries.pop(service_name, None)
+            if self._running:
+                for service_name in added + changed:
+                    self._schedule(service_name, 0)
+
+    def probe_now(self, timeout=10):
+        """立即同步探測所有服務並更新快照（?fresh=1 使用）"""
+        self.start()
+        futures = {}
+        for service_name, config in list(self.services.items()):
+            try:
+                futures[service_name] = self._dispatch(service_name, config)
+            except Exception as e:
+                logger.error(f"即時探測服務 {service_name} 提交失敗: {str(e)}")
+        for service_name, future in futures.items():
+            try:
+                future.exception(timeout=timeout)
+            except FutureTimeoutError:
+                logger.error(f"即時探測服務 {service_name} 超時")
+                continue
+            self._on_done(service_name, future)
+        return self.snapshot()
+
+    def snapshot(self):
+        """讀取當前快照，附帶每個條目的年齡與過期標記"""
+        now = time.monotonic()
+        with self._lock:
+            entries = [(name, self._entries.get(name)) for name in list(self.services)]
+
+        services_status = []
+        for service_name, entry in entries:
+            if entry is None:
+                config = self.services.get(service_name)
+                if config is None:
+                    continue
+                services_status.append({
+                    'name': config['name'],
+                    'port': config['port'],
+                    'type': config['type'],
+                    'status': 'pending',
+                    'status_code': 0,
+                    'response_time': 'N/A',
+                    'url': f"http://localhost:{config['port']}",
+                    'age': None,
+                    'stale': True
+                })
+                continue
+            checked_at, result = entry
+            age = round(now - checked_at, 2)
+            services_status.append(dict(result, age=age, stale=age > self.stale_after))
+        return services_status
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+服務延遲時間序列存儲
+每個服務使用定長數組實現的環形緩衝，包含原始樣本、1 分鐘、1 小時三個降採樣層級，內存佔用固定
+"""
+
+import bisect
+import math
+import re
+import threading
+import time
+from array import array
+
+# 延遲直方圖分箱上界（毫秒），按 1.25 倍對數間隔從 1ms 到約 87s；分位數在箱內線性插值
+HISTOGRAM_BOUNDS = [round(1.25 ** i, 2) for i in range(52)]
+HISTOGRAM_BINS = len(HISTOGRAM_BOUNDS) + 1
+
+_WINDOW_PATTERN = re.compile(r'^(\d+)([smhd])$')
+_WINDOW_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_window(window):
+    """把 '15m'、'1h'、'7d' 形式的窗口解析為秒數"""
+    match = _WINDOW_PATTERN.match(window or '')
+    if not match:
+        raise ValueError(f"無效的時間窗口: {window}")
+    seconds = int(match.group(1)) * _WINDOW_UNITS[match.group(2)]
+    if seconds <= 0:
+        raise ValueError(f"無效的時間窗口: {window}")
+    return seconds
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(int(math.ceil(q / 100.0 * len(sorted_values))) - 1, len(sorted_values) - 1)
+    return sorted_values[max(index, 0)]
+
+
+class RawRing:
+    """原始樣本環形緩衝：時間戳、延遲（失敗記為 NaN）"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array('d', [0.0]) * capacity
+        self.latencies = array('d', [0.0]) * capacity
+        self.size = 0
+        self.head = 0
+
+    def append(self, ts, latency_ms):
+        self.timestamps[self.head] = ts
+        self.latencies[self.head] = latency_ms if latency_ms is not None else math.nan
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def oldest(self):
+        if self.size == 0:
+            return None
+        return self.timestamps[(self.head - self.size) % self.capacity]
+
+    def since(self, cutoff):
+        """返回 cutoff 之後的 (成功延遲列表, 總數, 錯誤數)"""
+        latencies = []
+        total = errors = 0
+        for offset in range(self.size):
+            i = (self.head - 1 - offset) % self.capacity
+            if self.timestamps[i] < cutoff:
+                break
+            total += 1
+            value = self.latencies[i]
+            if math.isnan(value):
+                errors += 1
+            else:
+                latencies.append(value)
+        return latencies, total, errors
+
+
+class BucketRing:
+    """固定分辨率的降採樣環形緩衝，每個桶保存計數、錯誤數與延遲直方圖"""
+
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.keys = array('q', [-1]) * capacity
+        self.counts = array('I', [0]) * capacity
+        self.errors = array('I', [0]) * capacity
+        self.histogram = array('I', [0]) * (capacity * HISTOGRAM_BINS)
+
+    @property
+    def span(self):
+        return self.resolution * self.capacity
+
+    def add(self, ts, latency_ms):
+        key = int(ts // self.resolution)
+        slot = key % self.capacity
+        if self.keys[slot] != key:
+            # 槽位屬於舊的時間段，覆蓋前清零
+            self.keys[slot] = key
+            self.counts[slot] = 0
+            self.errors[slot] = 0
+            base = slot * HISTOGRAM_BINS
+            for b in range(HISTOGRAM_BINS):
+                self.histogram[base + b] = 0
+        self.counts[slot] += 1
+        if latency_ms is None:
+            self.errors[slot] += 1
+        else:
+            bin_index = bisect.bisect_left(HISTOGRAM_BOUNDS, latency_ms)
+            self.histogram[slot * HISTOGRAM_BINS + bin_index] += 1
+
+    def since(self, cutoff, now):
+        """合併 cutoff 之後各桶，返回 (直方圖, 總數, 錯誤數)"""
+        merged = [0] * HISTOGRAM_BINS
+        total = errors = 0
+        first_key = int(cutoff // self.resolution)
+        last_key = int(now // self.resolution)
+        for key in range(max(first_key, last_key - self.capacity + 1), last_key + 1):
+            slot = key % self.capacity
+            if self.keys[slot] != key:
+                continue
+            total += self.counts[slot]
+            errors += self.errors[slot]
+            base = slot * HISTOGRAM_BINS
+            for b in range(HISTOGRAM_BINS):
+                merged[b] += self.histogram[base + b]
+        return merged, total, errors
+
+
+def _histogram_percentile(histogram, q):
+    """假設樣本在箱內均勻分布，按目標名次在箱的上下界之間線性插值；溢出箱返回最大上界"""
+    total = sum(histogram)
+    if total == 0:
+        return None
+    target = q / 100.0 * total
+    running = 0
+    for bin_index, count in enumerate(histogram):
+        if count and running + count >= target:
+            if bin_index >= len(HISTOGRAM_BOUNDS):
+                return HISTOGRAM_BOUNDS[-1]
+            lower = HISTOGRAM_BOUNDS[bin_index - 1] if bin_index > 0 else 0.0
+            upper = HISTOGRAM_BOUNDS[bin_index]
+            return round(lower + (upper - lower) * (target - running) / count, 2)
+        running += count
+    return HISTOGRAM_BOUNDS[-1]
+
+
+class ServiceSeries:
+    """單個服務的三層時間序列"""
+
+    def __init__(self, raw_capacity, minute_capacity, hour_capacity):
+        self.raw = RawRing(raw_capacity)
+        self.minutes = BucketRing(60, minute_capacity)
+        self.hours = BucketRing(3600, hour_capacity)
+
+    def add(self, ts, latency_ms):
+        self.raw.append(ts, latency_ms)
+        self.minutes.add(ts, latency_ms)
+        self.hours.add(ts, latency_ms)
+
+    def summarize(self, window_seconds, now):
+        cutoff = now - window_seconds
+        oldest = self.raw.oldest()
+        if oldest is not None and (self.raw.size < self.raw.capacity or oldest <= cutoff):
+            latencies, total, errors = self.raw.since(cutoff)
+            latencies.sort()
+            tier = 'raw'
+            p50, p95, p99 = (_percentile(latencies, q) for q in (50, 95, 99))
+        else:
+            ring = self.minutes if window_seconds <= self.minutes.span else self.hours
+            histogram, total, errors = ring.since(cutoff, now)
+            tier = '1m' if ring is self.minutes else '1h'
+            p50, p95, p99 = (_histogram_percentile(histogram, q) for q in (50, 95, 99))
+
+        availability = round((total - errors) / total * 100, 2) if total else None
+        return {
+            'tier': tier,
+            'samples': total,
+            'errors': errors,
+            'availability_percentage': availability,
+            'latency_ms': {'p50': p50, 'p95': p95, 'p99': p99}
+        }
+
+
+class LatencyStore:
+    """所有服務的延遲時間序列，按服務懶創建"""
+
+    def __init__(self, raw_capacity=3600, minute_capacity=1440, hour_capacity=24 * 30):
+        self.raw_capacity = raw_capacity
+        self.minute_capacity = minute_capacity
+        self.hour_capacity = hour_capacity
+
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, service_name, latency_ms, ok=True, ts=None):
+        """記錄一次探測，失敗的探測只計入錯誤數"""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            series = self._series.get(service_name)
+            if series is None:
+                series = ServiceSeries(self.raw_capacity, self.minute_capacity, self.hour_capacity)
+                self._series[service_name] = series
+            series.add(ts, latency_ms if ok else None)
+
+    def record_result(self, service_name, result):
+        """探測結果回調，直接註冊到 HealthProber"""
+        self.record(service_name, result.get('response_time_ms'),
+                    ok=result.get('status') == 'healthy')
+
+    def summarize(self, service_name, window_seconds, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            series = self._series.get(service_name)
+            if series is None:
+                return None
+            return series.summarize(window_seconds, now)
+
+    def discard(self, service_name):
+        with self._lock:
+            self._series.pop(service_name, None)
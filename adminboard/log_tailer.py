@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+服務日誌讀取後端
+按字節偏移增量索引日誌文件（行偏移、級別、時間），通過 inode 與大小檢測輪轉，
+分頁與過濾只查內存索引，讀取時按塊定位，內存佔用與文件大小無關
+"""
+
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+# 單行返回的最大字節數，避免超長行撐大響應
+MAX_LINE_BYTES = 64 * 1024
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'WARN': 30, 'ERROR': 40, 'CRITICAL': 50, 'FATAL': 50}
+LEVEL_NAMES = {0: None, 10: 'DEBUG', 20: 'INFO', 30: 'WARNING', 40: 'ERROR', 50: 'CRITICAL'}
+
+_LEVEL_PATTERN = re.compile(rb'\b(DEBUG|INFO|WARNING|WARN|ERROR|CRITICAL|FATAL)\b')
+_TIME_PATTERN = re.compile(rb'(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})')
+
+
+def parse_time(value):
+    """解析 'YYYY-mm-dd HH:MM:SS' 或 Unix 時間戳，返回秒數"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    return datetime.strptime(value.replace('T', ' '), '%Y-%m-%d %H:%M:%S').timestamp()
+
+
+class LogIndex:
+    """單個日誌文件的增量行索引"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.generation = -1
+        self._reset(None)
+
+    def _reset(self, identity):
+        self.generation += 1                # 每次重建遞增，跟隨方據此發現輪轉、截斷或重建
+        self.identity = identity            # (st_dev, st_ino)
+        self.indexed_bytes = 0
+        self.offsets = array('Q')           # 每行起始偏移
+        self.levels = array('B')            # 日誌級別
+        self.times = array('I')             # 行時間（秒，單調不減），無時間的行沿用上一行
+        self._last_time = 0
+        self._time_cache = (None, 0)
+
+    def refresh(self):
+        """把文件新增部分加入索引；檢測到輪轉或截斷時重建"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset(None)
+            return False
+
+        identity = (stat.st_dev, stat.st_ino)
+        if identity != self.identity or stat.st_size < self.indexed_bytes:
+            if self.identity is not None:
+                logger.info(f"檢測到日誌輪轉: {self.path}")
+            self._reset(identity)
+
+        if stat.st_size > self.indexed_bytes:
+            self._index_from(self.indexed_bytes, stat.st_size)
+        return True
+
+    def _index_from(self, start, end):
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            position = start
+            pending = b''
+            while position < end:
+                chunk = f.read(min(READ_CHUNK_SIZE, end - position))
+                if not chunk:
+                    break
+                position += len(chunk)
+                data = pending + chunk
+                line_start = 0
+                base = position - len(data)
+                while True:
+                    newline = data.find(b'\n', line_start)
+                    if newline < 0:
+                        break
+                    # 只看本行的開頭，短行不能讀到下一行的級別與時間
+                    self._add_line(base + line_start, data[line_start:min(newline, line_start + 200)])
+                    line_start = newline + 1
+                pending = data[line_start:]
+        # 末尾未換行的半行留到下次再索引
+        self.indexed_bytes = end - len(pending)
+
+    def _add_line(self, offset, head):
+        level_match = _LEVEL_PATTERN.search(head)
+        time_match = _TIME_PATTERN.search(head, 0, 40)
+        if time_match:
+            key = time_match.group(0)
+            cached_key, cached_value = self._time_cache
+            if key != cached_key:
+                try:
+                    stamp = f"{time_match.group(1).decode()} {time_match.group(2).decode()}"
+                    cached_value = int(datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S').timestamp())
+                except ValueError:
+                    cached_value = self._last_time
+                self._time_cache = (key, cached_value)
+            # 多線程寫入時時間可能略有倒序；取累計最大值保證 times 單調，select 才能二分
+            self._last_time = max(self._last_time, cached_value)
+        self.offsets.append(offset)
+        self.levels.append(LEVELS[level_match.group(1).decode()] if level_match else 0)
+        self.times.append(self._last_time)
+
+    def line_end(self, index):
+        if index + 1 < len(self.offsets):
+            return self.offsets[index + 1]
+        return self.indexed_bytes
+
+    def select(self, after=0, limit=100, min_level=0, since=None, until=None):
+        """在索引中查找符合條件的行號，不讀取文件；返回 (行號列表, 下一頁起始偏移)"""
+        start = bisect.bisect_left(self.offsets, after)
+        if since is not None:
+            # times 單調不減，直接二分定位
+            start = max(start, bisect.bisect_left(self.times, int(since)))
+        matched = []
+        for i in range(start, len(self.offsets)):
+            if until is not None and self.times[i] > until:
+                return matched, self.offsets[i]
+            if min_level and self.levels[i] < min_level:
+                continue
+            matched.append(i)
+            if len(matched) >= limit:
+                return matched, self.line_end(i)
+        return matched, max(after, self.indexed_bytes)
+
+
+class LogTailer:
+    """按服務管理日誌索引，提供分頁讀取與持續跟隨"""
+
+    def __init__(self, services, log_dir):
+        self.services = services
+        self.log_dir = log_dir
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def log_path(self, service_name):
+        config = self.services[service_name]
+        return config.get('log_file') or os.path.join(self.log_dir, f"{service_name}.log")
+
+    def _index_for(self, service_name):
+        path = self.log_path(service_name)
+        with self._lock:
+            index = self._indexes.get(service_name)
+            if index is None or index.path != path:
+                index = LogIndex(path)
+                self._indexes[service_name] = index
+        return index
+
+    def discard(self, service_name):
+        with self._lock:
+            self._indexes.pop(service_name, None)
+
+    def read(self, service_name, after=0, limit=100, level=None, since=None, until=None):
+        """讀取一頁日誌，返回行內容與下一頁游標"""
+        index = self._index_for(service_name)
+        min_level = LEVELS.get((level or '').upper(), 0)
+        with index.lock:
+            exists = index.refresh()
+            generation = index.generation
+            if not exists:
+                return {'file': index.path, 'exists': False, 'entries': [], 'next_offset': after, 'size': 0,
+                        'generation': generation}
+            selected, next_offset = index.select(after, limit, min_level, since, until)
+            spans = [(index.offsets[i], index.line_end(i), index.levels[i], index.times[i]) for i in selected]
+            size = index.indexed_bytes
+
+        entries = []
+        with open(index.path, 'rb') as f:
+            for start, end, level_code, line_time in spans:
+                f.seek(start)
+                line = f.read(min(end - start, MAX_LINE_BYTES)).decode('utf-8', errors='replace').rstrip('\r\n')
+                entries.append({
+                    'offset': start,
+                    'level': LEVEL_NAMES.get(level_code),
+                    'time': line_time or None,
+                    'line': line
+                })
+
+        return {'file': index.path, 'exists': True, 'entries': entries, 'next_offset': next_offset, 'size': size,
+                'generation': generation}
+
+    def follow(self, service_name, after=None, level=None, poll_interval=1.0, batch_size=500):
+        """持續跟隨日誌，生成新增的行；after 為空時從文件末尾開始。
+        兩次輪詢之間文件被替換（設備號 / inode 變化）或截斷時從新文件開頭讀，
+        即使新文件已經長過舊的偏移也不會跳過開頭"""
+        generation = None
+        if after is None:
+            index = self._index_for(service_name)
+            with index.lock:
+                index.refresh()
+                after = index.indexed_bytes
+                generation = index.generation
+        while True:
+            page = self.read(service_name, after=after, limit=batch_size, level=level)
+            if generation is not None and page['generation'] != generation:
+                # 按舊文件偏移讀到的內容作廢，從頭重讀
+                generation = page['generation']
+                after = 0
+                continue
+            generation = page['generation']
+            for entry in page['entries']:
+                yield entry
+            if page['size'] < after:
+                # 游標超出文件末尾（文件被截斷）時從頭開始
+                after = 0
+                continue
+            after = page['next_offset']
+            if len(page['entries']) < batch_size:
+                time.sleep(poll_interval)
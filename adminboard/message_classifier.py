@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+消息分類引擎
+把 classifier.js 的加權關鍵詞表編譯為一個 Aho-Corasick 自動機，每條消息只掃描一次；
+批量評分在 numpy 可用時以矩陣運算完成，並提供分塊、可斷點續跑的全表重新分類任務
+
+用法:
+    python message_classifier.py classify "正在執行部署腳本"
+    python message_classifier.py reclassify --db /path/to/manus_tasks.db [--chunk-size 5000] [--restart] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 與 manus-task-manager/src/utils/classifier.js 保持一致
+CLASSIFICATION_KEYWORDS = {
+    '思考': {
+        'primary': ['分析', '考慮', '評估', '判斷', '推理', '計劃', '策略', '設計'],
+        'secondary': ['我認為', '我覺得', '我想', '可能', '也許', '或許', '假設'],
+        'tertiary': ['思考', '想法', '觀點', '見解', '理論', '概念', '方案', '建議']
+    },
+    '觀察': {
+        'primary': ['發現', '注意到', '觀察', '檢測', '識別', '確認', '檢查', '監測'],
+        'secondary': ['我看到', '顯示', '出現', '結果', '狀態', '情況', '現象'],
+        'tertiary': ['確認意圖', '理解', '明白', '了解', '察覺', '記錄', '報告']
+    },
+    '行動': {
+        'primary': ['執行', '運行', '創建', '修改', '實施', '完成', '操作', '處理'],
+        'secondary': ['發送', '點擊', '開始', '啟動', '停止', '刪除', '更新', '安裝'],
+        'tertiary': ['配置', '部署', '測試', '調試', '優化', '建立', '設置', '調整']
+    }
+}
+
+KEYWORD_WEIGHTS = {
+    'primary': 3,
+    'secondary': 2,
+    'tertiary': 1
+}
+
+# 同分時的優先級，與 determineCategory 相同
+CATEGORY_PRIORITY = ['行動', '觀察', '思考']
+DEFAULT_CATEGORY = '其他'
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class AhoCorasick:
+    """多模式匹配自動機；返回每個模式的不重疊出現次數，與 JS 的 String.match(/kw/g) 計數一致"""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._lengths = [len(pattern) for pattern in self.patterns]
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] = self._output[state] + (index,)
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def count(self, text):
+        """單次掃描，返回 {模式序號: 次數}"""
+        goto, fail, output, lengths = self._goto, self._fail, self._output, self._lengths
+        counts = {}
+        last_end = {}
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                end = position + 1
+                for index in output[state]:
+                    # 同一模式的重疊匹配不計，與正則全局匹配一致
+                    if end - lengths[index] >= last_end.get(index, 0):
+                        counts[index] = counts.get(index, 0) + 1
+                        last_end[index] = end
+        return counts
+
+
+def keyword_fingerprint(keywords=CLASSIFICATION_KEYWORDS, weights=KEYWORD_WEIGHTS):
+    """關鍵詞表指紋，記錄在檢查點中；表變化後重新分類需從頭開始"""
+    payload = json.dumps([keywords, weights], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class MessageClassifier:
+    """加權關鍵詞分類器：所有關鍵詞共用一個自動機，權重展開為 關鍵詞 x 分類 矩陣"""
+
+    def __init__(self, keywords=None, weights=None):
+        self.keywords = keywords or CLASSIFICATION_KEYWORDS
+        self.weights = weights or KEYWORD_WEIGHTS
+        # 按優先級排列分類列，argmax 取第一個最大值即實現同分優先級
+        self.categories = [c for c in CATEGORY_PRIORITY if c in self.keywords] + \
+                          [c for c in self.keywords if c not in CATEGORY_PRIORITY]
+        column = {category: i for i, category in enumerate(self.categories)}
+
+        patterns = {}
+        weight_rows = []
+        for category, groups in self.keywords.items():
+            for level, words in groups.items():
+                weight = self.weights.get(level, 1)
+                for word in words:
+                    word = word.lower()
+                    if word not in patterns:
+                        patterns[word] = len(patterns)
+                        weight_rows.append([0] * len(self.categories))
+                    weight_rows[patterns[word]][column[category]] += weight
+        self.automaton = AhoCorasick(patterns)
+        self.weight_rows = weight_rows
+        self.weight_matrix = np.array(weight_rows, dtype=np.int64) if np is not None else None
+        self.fingerprint = keyword_fingerprint(self.keywords, self.weights)
+
+    def scores(self, content):
+        """單條消息各分類得分"""
+        totals = dict.fromkeys(self.categories, 0)
+        if not content or not isinstance(content, str):
+            return totals
+        for index, count in self.automaton.count(content.lower().strip()).items():
+            for category, weight in zip(self.categories, self.weight_rows[index]):
+                totals[category] += weight * count
+        return totals
+
+    def classify(self, content):
+        scores = self.scores(content)
+        best = max(scores.values(), default=0)
+        if best == 0:
+            return DEFAULT_CATEGORY
+        return next(category for category in self.categories if scores[category] == best)
+
+    def classify_batch(self, contents):
+        """批量分類：掃描得到 消息 x 關鍵詞 計數矩陣，與權重矩陣相乘後按行取最大"""
+        if self.weight_matrix is None:
+            return [self.classify(content) for content in contents]
+        keyword_count = len(self.weight_rows)
+        flat_index = []
+        flat_count = []
+        for row, content in enumerate(contents):
+            if not content or not isinstance(content, str):
+                continue
+            for index, count in self.automaton.count(content.lower().strip()).items():
+                flat_index.append(row * keyword_count + index)
+                flat_count.append(count)
+        counts = np.bincount(np.array(flat_index, dtype=np.int64), weights=np.array(flat_count, dtype=np.float64),
+                             minlength=len(contents) * keyword_count).reshape(len(contents), keyword_count)
+        scores = counts @ self.weight_matrix
+        best = scores.argmax(axis=1)
+        labels = np.array(self.categories + [DEFAULT_CATEGORY], dtype=object)
+        best[scores.max(axis=1) == 0] = len(self.categories)
+        return labels[best].tolist()
+
+
+def _load_checkpoint(path, fingerprint):
+    try:
+        with open(path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if checkpoint.get('fingerprint') != fingerprint:
+        logger.warning(f"檢查點 {path} 的關鍵詞表已變化，從頭開始重新分類")
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(path, checkpoint):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def reclassify_messages(db_path, classifier=None, chunk_size=DEFAULT_CHUNK_SIZE, checkpoint_path=None,
+                        restart=False, dry_run=False, progress=None):
+    """按 id 分塊流式重新分類 messages：每塊一個事務批量 UPDATE 變化的行，提交後寫檢查點。
+    分類是確定性的，提交後、寫檢查點前中斷只會重做最後一塊"""
+    classifier = classifier or MessageClassifier()
+    checkpoint_path = checkpoint_path or os.path.splitext(db_path)[0] + '_reclassify.json'
+    # 試運行只統計，既不續跑也不寫檢查點，以免與真實運行的進度混在一起
+    checkpoint = None if restart or dry_run else _load_checkpoint(checkpoint_path, classifier.fingerprint)
+    if checkpoint is None or checkpoint.get('completed'):
+        checkpoint = {
+            'fingerprint': classifier.fingerprint,
+            'last_id': 0,
+            'processed': 0,
+            'changed': 0,
+            'transitions': {},
+            'started_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'completed': False
+        }
+    else:
+        logger.info(f"從檢查點續跑: 已處理 {checkpoint['processed']} 條，最後 id {checkpoint['last_id']}")
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    transitions = Counter(checkpoint['transitions'])
+    started = time.perf_counter()
+    processed_this_run = 0
+    try:
+        conn.execute('PRAGMA journal_mode = WAL')
+        while True:
+            rows = conn.execute('SELECT id, content, category FROM messages WHERE id > ? ORDER BY id LIMIT ?',
+                                (checkpoint['last_id'], chunk_size)).fetchall()
+            if not rows:
+                break
+            labels = classifier.classify_batch([row[1] for row in rows])
+            updates = [(label, row[0]) for row, label in zip(rows, labels) if label != row[2]]
+            for (old, new) in ((row[2], label) for row, label in zip(rows, labels) if label != row[2]):
+                transitions[f"{old}→{new}"] += 1
+            if updates and not dry_run:
+                with conn:
+                    conn.executemany('UPDATE messages SET category = ? WHERE id = ?', updates)
+
+            checkpoint['last_id'] = rows[-1][0]
+            checkpoint['processed'] += len(rows)
+            checkpoint['changed'] += len(updates)
+            checkpoint['transitions'] = dict(transitions)
+            processed_this_run += len(rows)
+            if not dry_run:
+                _save_checkpoint(checkpoint_path, checkpoint)
+            if progress is not None:
+                elapsed = time.perf_counter() - started
+                progress(checkpoint, processed_this_run / elapsed if elapsed > 0 else 0.0)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    checkpoint['completed'] = True
+    checkpoint['finished_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if not dry_run:
+        _save_checkpoint(checkpoint_path, checkpoint)
+    return {
+        'processed': checkpoint['processed'],
+        'processed_this_run': processed_this_run,
+        'changed': checkpoint['changed'],
+        'transitions': dict(transitions.most_common()),
+        'elapsed': round(elapsed, 3),
+        'messages_per_sec': round(processed_this_run / elapsed, 1) if elapsed > 0 else None,
+        'dry_run': dry_run,
+        'checkpoint': checkpoint_path
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='消息分類引擎')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    classify = subparsers.add_parser('classify', help='分類單條文本並輸出得分')
+    classify.add_argument('text')
+    reclassify = subparsers.add_parser('reclassify', help='全表重新分類')
+    reclassify.add_argument('--db', default=os.environ.get('MANUS_TASK_DB', '/home/alexchuang/manus/manus_tasks.db'))
+    reclassify.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    reclassify.add_argument('--checkpoint', help='檢查點文件，默認與數據庫同目錄')
+    reclassify.add_argument('--restart', action='store_true', help='忽略檢查點從頭開始')
+    reclassify.add_argument('--dry-run', action='store_true', help='只統計變化，不寫數據庫')
+    args = parser.parse_args()
+
+    classifier = MessageClassifier()
+    if args.command == 'classify':
+        print(json.dumps({'category': classifier.classify(args.text), 'scores': classifier.scores(args.text)},
+                         ensure_ascii=False))
+        return
+
+    def progress(checkpoint, rate):
+        print(f"⏳ 已處理 {checkpoint['processed']} 條（id ≤ {checkpoint['last_id']}），"
+              f"變更 {checkpoint['changed']} 條，{rate:.0f} 條/秒", file=sys.stderr)
+
+    report = reclassify_messages(args.db, classifier, args.chunk_size, args.checkpoint,
+                                 restart=args.restart, dry_run=args.dry_run, progress=progress)
+    if report['changed'] and not args.dry_run:
+        # 分類是原地更新，高水位看不到，需讓管理平台的消息匯總表重建
+        from task_analytics import TaskAnalytics
+        analytics = TaskAnalytics(args.db)
+        analytics.invalidate('messages')
+        analytics.close()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
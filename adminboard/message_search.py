@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+消息全文搜索
+在旁路索引庫中為 messages.content 建立 FTS5 索引：中文按二元組切分後交給 unicode61 分詞，
+按 rowid 高水位分批增量追平任務數據庫，支持 bm25 排序、摘要高亮以及任務 / 分類 / 時間過濾
+"""
+
+import html
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from task_analytics import AnalyticsError, prepare_database, sqlite_uri
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_POLL_INTERVAL = 2.0         # 秒
+SNIPPET_CONTEXT = 30                # 摘要中匹配位置前後保留的字符數
+INDEX_VERSION = '1'                 # 切分規則變化時遞增，觸發重建
+
+# 漢字、假名與諺文按二元組切分；其餘文本交給 unicode61 分詞
+_CJK_RUN = re.compile(r'[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]+')
+
+
+def _bigrams(run):
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def segment_for_index(text):
+    """每段中日韓文本展開為相鄰二元組，並在段尾補上最後一個單字，以便單字前綴查詢命中"""
+    def expand(match):
+        run = match.group()
+        tokens = _bigrams(run) + [run[-1]]
+        return ' ' + ' '.join(tokens) + ' '
+    return _CJK_RUN.sub(expand, text)
+
+
+def build_match_query(query):
+    """把用戶輸入轉換為 FTS5 MATCH 表達式：空白分隔的詞之間為 AND，每段中文轉為二元組短語"""
+    clauses = []
+    for term in query.split():
+        position = 0
+        for match in _CJK_RUN.finditer(term):
+            clauses.extend(_plain_clauses(term[position:match.start()]))
+            run = match.group()
+            if len(run) == 1:
+                clauses.append(f'"{run}"*')
+            else:
+                clauses.append('"' + ' '.join(_bigrams(run)) + '"')
+            position = match.end()
+        clauses.extend(_plain_clauses(term[position:]))
+    return ' AND '.join(clauses)
+
+
+def _plain_clauses(text):
+    words = re.findall(r'\w+', text)
+    return [f'"{word}"' for word in words]
+
+
+def highlight_terms(query):
+    """摘要高亮用的原始詞（不含二元組展開）"""
+    terms = []
+    for term in query.split():
+        terms.extend(match.group() for match in _CJK_RUN.finditer(term))
+        terms.extend(re.findall(r'\w+', _CJK_RUN.sub(' ', term)))
+    return sorted(set(terms), key=len, reverse=True)
+
+
+def make_snippet(content, terms, context=SNIPPET_CONTEXT):
+    """以第一個匹配位置為中心截取摘要，HTML 轉義後用 <mark> 包裹匹配詞"""
+    lowered = content.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [p for p in positions if p >= 0]
+    first = min(positions) if positions else 0
+    start = max(first - context, 0)
+    end = min(first + context * 2, len(content))
+    excerpt = html.escape(content[start:end])
+    if terms:
+        pattern = re.compile('|'.join(re.escape(html.escape(term)) for term in terms), re.IGNORECASE)
+        excerpt = pattern.sub(lambda m: f'<mark>{m.group()}</mark>', excerpt)
+    return ('…' if start > 0 else '') + excerpt + ('…' if end < len(content) else '')
+
+
+def normalize_time(value):
+    """接受 'YYYY-mm-dd[ HH:MM:SS]' 或 Unix 時間戳，返回與 messages.timestamp（UTC）可比較的字符串"""
+    if value is None or value == '':
+        return None
+    try:
+        return datetime.fromtimestamp(float(value), timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        pass
+    value = value.replace('T', ' ')
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            continue
+    raise ValueError(f"無效的時間: {value}")
+
+
+class MessageSearch:
+    """消息全文索引；後台線程持續追平新消息，查詢時連接源表做過濾"""
+
+    def __init__(self, db_path, index_path=None, batch_size=DEFAULT_BATCH_SIZE,
+                 poll_interval=DEFAULT_POLL_INTERVAL):
+        self.db_path = db_path
+        self.index_path = index_path or os.path.splitext(db_path)[0] + '_search.db'
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+        self._conn = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.indexed_through = 0
+
+    def _connection(self):
+        if self._conn is None:
+            if not os.path.exists(self.db_path):
+                raise AnalyticsError(f"任務數據庫不存在: {self.db_path}")
+            prepare_database(self.db_path)
+            conn = sqlite3.connect(sqlite_uri(self.index_path, 'rwc'), uri=True,
+                                   check_same_thread=False, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('ATTACH DATABASE ? AS src', (sqlite_uri(self.db_path, 'ro'),))
+            conn.execute('CREATE TABLE IF NOT EXISTS search_meta (key TEXT PRIMARY KEY, value TEXT)')
+            meta = dict(conn.execute('SELECT key, value FROM search_meta').fetchall())
+            if meta.get('version') != INDEX_VERSION:
+                self._reset(conn)
+            else:
+                self.indexed_through = int(meta.get('high_water', 0))
+            self._conn = conn
+        return self._conn
+
+    def _reset(self, conn):
+        """無內容（contentless）FTS5 表：只存倒排索引，原文與過濾字段從源表按 rowid 取"""
+        with conn:
+            conn.execute('DROP TABLE IF EXISTS message_fts')
+            conn.execute("CREATE VIRTUAL TABLE message_fts USING fts5("
+                         "content, content='', tokenize='unicode61 remove_diacritics 2')")
+            conn.execute("INSERT OR REPLACE INTO search_meta VALUES ('version', ?)", (INDEX_VERSION,))
+            conn.execute("INSERT OR REPLACE INTO search_meta VALUES ('high_water', '0')")
+        self.indexed_through = 0
+
+    def sync(self, max_batches=None):
+        """按 id 分批索引高水位之後的消息，每批單獨提交；返回本次索引的消息數"""
+        indexed = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            with self._lock:
+                conn = self._connection()
+                source_max = conn.execute('SELECT MAX(id) FROM src.messages').fetchone()[0] or 0
+                if source_max < self.indexed_through:
+                    logger.warning(f"消息表 id 回退（{source_max} < {self.indexed_through}），重建全文索引")
+                    self._reset(conn)
+                rows = conn.execute('SELECT id, content FROM src.messages WHERE id > ? ORDER BY id LIMIT ?',
+                                    (self.indexed_through, self.batch_size)).fetchall()
+                if not rows:
+                    break
+                high_water = rows[-1]['id']
+                with conn:
+                    conn.executemany('INSERT INTO message_fts (rowid, content) VALUES (?, ?)',
+                                     ((row['id'], segment_for_index(row['content'] or '')) for row in rows))
+                    conn.execute("INSERT OR REPLACE INTO search_meta VALUES ('high_water', ?)", (str(high_water),))
+                self.indexed_through = high_water
+            indexed += len(rows)
+            batches += 1
+        return indexed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                indexed = self.sync()
+                if indexed:
+                    logger.info(f"全文索引新增 {indexed} 條消息，已索引至 id {self.indexed_through}")
+            except AnalyticsError:
+                pass
+            except sqlite3.Error as e:
+                logger.error(f"全文索引同步失敗: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='message-search', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def status(self):
+        with self._lock:
+            conn = self._connection()
+            source_max = conn.execute('SELECT MAX(id) FROM src.messages').fetchone()[0] or 0
+            return {
+                'indexed_through': self.indexed_through,
+                'pending': conn.execute('SELECT COUNT(*) FROM src.messages WHERE id > ?',
+                                        (self.indexed_through,)).fetchone()[0],
+                'source_max_id': source_max,
+                'index_path': self.index_path
+            }
+
+    def search(self, query, task_id=None, category=None, since=None, until=None, limit=20, offset=0):
+        """bm25 排序的全文搜索，過濾條件通過 rowid 連接源表；返回結果與摘要"""
+        match = build_match_query(query)
+        if not match:
+            raise ValueError('搜索詞為空')
+        sql = ['''SELECT m.id, m.task_id, m.content, m.category, m.timestamp, m.source, m.message_type,
+                         bm25(message_fts) AS score
+                  FROM message_fts JOIN src.messages AS m ON m.id = message_fts.rowid
+                  WHERE message_fts MATCH ?''']
+        params = [match]
+        for clause, value in (('m.task_id = ?', task_id), ('m.category = ?', category),
+                              ('m.timestamp >= ?', normalize_time(since)),
+                              ('m.timestamp <= ?', normalize_time(until))):
+            if value is not None:
+                sql.append(f'AND {clause}')
+                params.append(value)
+        sql.append('ORDER BY score LIMIT ? OFFSET ?')
+        params += [limit, offset]
+
+        started = time.perf_counter()
+        with self._lock:
+            rows = self._connection().execute(' '.join(sql), params).fetchall()
+        elapsed = time.perf_counter() - started
+
+        terms = highlight_terms(query)
+        results = []
+        for row in rows:
+            entry = dict(row)
+            entry['score'] = round(-entry['score'], 4)
+            entry['snippet'] = make_snippet(entry.pop('content'), terms)
+            results.append(entry)
+        return {
+            'query': query,
+            'match': match,
+            'results': results,
+            'took_ms': round(elapsed * 1000, 2),
+            'indexed_through': self.indexed_through
+        }
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+OpenMetrics 指標導出
+輕量的計數器/直方圖/儀表實現（無外部依賴），用於探測、路由與系統指標的 /metrics 端點
+"""
+
+import bisect
+import threading
+import time
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 每個請求的插樁開銷預算（微秒）
+INSTRUMENTATION_BUDGET_US = 20
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# TYPE {self.name} counter", f"# HELP {self.name} {self.documentation}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}_total{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}       # labelvalues -> [各桶計數..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# TYPE {self.name} histogram", f"# HELP {self.name} {self.documentation}"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = f'le="{"+Inf" if bound == float("inf") else repr(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(float(series[-2]))}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class GaugeCallback:
+    """採集時調用回調取值的儀表，回調返回 {labelvalues 元組: 值}"""
+
+    def __init__(self, name, documentation, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self):
+        lines = [f"# TYPE {self.name} gauge", f"# HELP {self.name} {self.documentation}"]
+        for labelvalues, value in sorted(self.callback().items()):
+            if value is None:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames, callback):
+        return self.register(GaugeCallback(name, documentation, labelnames, callback))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class AdminBoardMetrics:
+    """管理平台熱路徑指標：探測、路由延遲、隊列深度與系統儀表"""
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.probe_duration = self.registry.histogram(
+            'adminboard_probe_duration_seconds', '單個健康端點請求耗時', ('service', 'endpoint'))
+        self.probe_outcomes = self.registry.counter(
+            'adminboard_probe_outcomes', '服務探測結果計數', ('service', 'status'))
+        self.request_duration = self.registry.histogram(
+            'adminboard_request_duration_seconds', 'Flask 路由處理耗時', ('route', 'method', 'code'))
+        self.instrumentation_overhead = self.registry.histogram(
+            'adminboard_instrumentation_overhead_seconds', '每個請求的插樁開銷', (),
+            buckets=(0.000005, 0.00001, 0.00002, 0.00005, 0.0001, 0.001))
+        self.registry.gauge(
+            'adminboard_instrumentation_budget_seconds', '每個請求的插樁開銷預算', (),
+            lambda: {(): INSTRUMENTATION_BUDGET_US / 1e6})
+
+    def observe_probe(self, service_name, endpoint, duration, status_code):
+        self.probe_duration.observe(duration, service_name, endpoint)
+
+    def record_outcome(self, service_name, result):
+        self.probe_outcomes.inc(service_name, result.get('status', 'unknown'))
+
+    def observe_request(self, route, method, code, duration, started, before_overhead=0.0):
+        """started 為 after_request 鉤子的起點；before_overhead 為 before_request 中計時本身的開銷"""
+        self.request_duration.observe(duration, route, method, str(code))
+        self.instrumentation_overhead.observe(time.perf_counter() - started + before_overhead)
+
+    def add_gauge(self, name, documentation, labelnames, callback):
+        return self.registry.gauge(name, documentation, labelnames, callback)
+
+    def render(self):
+        return self.registry.render()
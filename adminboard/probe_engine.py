@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+異步健康探測引擎
+所有服務與候選端點在同一個事件循環上並發探測，共用帶 keep-alive 的 aiohttp 連接池
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# 候選健康檢查端點，按優先順序排列
+HEALTH_ENDPOINTS = ['/', '/health', '/status', '/api/health']
+
+
+class AsyncProbeEngine:
+    """在獨立線程的事件循環上運行的探測引擎，供同步代碼通過 Future 調用"""
+
+    def __init__(self, endpoints=None, timeout=5.0, connection_limit=200,
+                 limit_per_host=4, keepalive_timeout=30.0, observer=None):
+        self.endpoints = list(endpoints or HEALTH_ENDPOINTS)
+        self.timeout = timeout
+        self.connection_limit = connection_limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        # 每次端點請求完成後回調 observer(service_name, endpoint, 耗時秒, 狀態碼)
+        self.observer = observer
+
+        self._preferred = {}    # service_name -> 上次成功的端點
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """啟動事件循環線程並建立共享會話（重複調用無副作用），返回事件循環。
+        會話建好之後才發布 _loop，並發的 submit 不會看到沒有會話的循環"""
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='probe-engine', daemon=True)
+            thread.start()
+            asyncio.run_coroutine_threadsafe(self._open_session(), loop).result()
+            self._thread = thread
+            self._loop = loop
+        logger.info("異步探測引擎已啟動")
+        return loop
+
+    def stop(self):
+        """關閉會話並停止事件循環"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_session(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        loop.close()
+        logger.info("異步探測引擎已停止")
+
+    async def _open_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        self._session = aiohttp.ClientSession(connector=connector)
+
+    async def _close_session(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def forget(self, service_name):
+        """清除服務的首選端點（配置變更或刪除時調用）"""
+        self._preferred.pop(service_name, None)
+
+    def submit(self, service_name, config):
+        """提交單個服務的探測，返回 concurrent.futures.Future"""
+        loop = self._loop or self.start()
+        return asyncio.run_coroutine_threadsafe(self.check_service(service_name, config), loop)
+
+    def check_many(self, services, timeout=None):
+        """同步探測多個服務，返回 {service_name: 結果}"""
+        loop = self._loop or self.start()
+        future = asyncio.run_coroutine_threadsafe(self._check_many(services), loop)
+        return future.result(timeout=timeout)
+
+    async def _check_many(self, services):
+        names = list(services)
+        results = await asyncio.gather(*(self.check_service(name, services[name]) for name in names))
+        return dict(zip(names, results))
+
+    async def check_service(self, service_name, config):
+        """探測單個服務：先試上次成功的端點，失敗後並發競速其餘端點"""
+        url = f"http://localhost:{config['port']}"
+        timeout = aiohttp.ClientTimeout(total=float(config.get('timeout', self.timeout)))
+        endpoints = self._candidate_endpoints(service_name, config)
+        start_time = time.time()
+
+        try:
+            endpoint = None
+            preferred = self._preferred.get(service_name)
+            if preferred in endpoints:
+                if await self._fetch(service_name, url, preferred, timeout) == 200:
+                    endpoint = preferred
+                else:
+                    endpoints = [e for e in endpoints if e != preferred]
+            if endpoint is None:
+                endpoint = await self._race(service_name, url, endpoints, timeout)
+        except Exception as e:
+            logger.error(f"檢查服務 {service_name} 時發生錯誤: {str(e)}")
+            self._preferred.pop(service_name, None)
+            return {
+                'name': config['name'],
+                'port': config['port'],
+                'type': config['type'],
+                'status': 'error',
+                'status_code': 0,
+                'response_time': 'Error',
+                'url': url,
+                'error': str(e),
+                'last_check': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+
+        if endpoint is None:
+            self._preferred.pop(service_name, None)
+            return {
+                'name': config['name'],
+                'port': config['port'],
+                'type': config['type'],
+                'status': 'offline',
+                'status_code': 0,
+                'response_time': 'N/A',
+                'url': url,
+                'last_check': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+
+        self._preferred[service_name] = endpoint
+        response_time = round((time.time() - start_time) * 1000, 2)
+        return {
+            'name': config['name'],
+            'port': config['port'],
+            'type': config['type'],
+            'status': 'healthy',
+            'status_code': 200,
+            'response_time': f"{response_time}ms",
+            'response_time_ms': response_time,
+            'endpoint': endpoint,
+            'url': url,
+            'last_check': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def _candidate_endpoints(self, service_name, config):
+        health_path = config.get('health_path')
+        if health_path:
+            return [health_path] + [e for e in self.endpoints if e != health_path]
+        return list(self.endpoints)
+
+    async def _fetch(self, service_name, url, endpoint, timeout):
+        """請求單個端點，返回狀態碼；連接失敗返回 0"""
+        start_time = time.perf_counter()
+        try:
+            async with self._session.get(f"{url}{endpoint}", timeout=timeout) as response:
+                # 讀完響應體，連接才能放回池中復用
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = 0
+        if self.observer is not None:
+            self.observer(service_name, endpoint, time.perf_counter() - start_time, status)
+        return status
+
+    async def _race(self, service_name, url, endpoints, timeout):
+        """並發請求所有端點，第一個返回 200 的勝出，其餘立即取消"""
+        if not endpoints:
+            return None
+        pending = {asyncio.ensure_future(self._fetch(service_name, url, e, timeout)): e for e in endpoints}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    endpoint = pending.pop(task)
+                    if task.result() == 200:
+                        return endpoint
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+服務進程管理
+以子進程方式啟動、停止、重啟已註冊服務並記錄 PID，重啟等操作作為異步任務在有界線程池中執行
+"""
+
+import itertools
+import logging
+import os
+import shlex
+import signal
+import socket
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READY_TIMEOUT = 30.0    # 秒
+DEFAULT_STOP_TIMEOUT = 10.0     # 秒
+
+
+class SupervisorError(Exception):
+    """服務進程操作失敗"""
+
+
+def port_in_use(port, host='localhost', timeout=0.5):
+    """端口上已有進程在監聽時返回 True"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def process_start_time(pid):
+    """進程的啟動時間，用於識別 PID 是否已被其他進程複用；無法獲取時返回 None"""
+    try:
+        if psutil is not None:
+            return round(psutil.Process(pid).create_time(), 2)
+        with open(f"/proc/{pid}/stat") as f:
+            # comm 字段可能含空格，從最後一個 ')' 之後數起，第 22 個字段為 starttime
+            return float(f.read().rsplit(')', 1)[1].split()[19])
+    except Exception:
+        return None
+
+
+class ProcessSupervisor:
+    """管理服務子進程；PID 寫入 run_dir，管理平台重啟後仍可接管。
+    相對的 cwd 按 base_dir（通常是註冊表文件所在目錄）解析，未配置 cwd 時即在 base_dir 下運行"""
+
+    def __init__(self, services, run_dir, log_path_func=None, readiness_check=None, base_dir=None):
+        self.services = services
+        self.run_dir = run_dir
+        self.base_dir = os.path.abspath(base_dir or os.getcwd())
+        self.log_path_func = log_path_func
+        self.readiness_check = readiness_check
+
+        self._children = {}         # service_name -> subprocess.Popen
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _service_lock(self, service_name):
+        with self._lock:
+            return self._locks.setdefault(service_name, threading.Lock())
+
+    def _pid_file(self, service_name):
+        return os.path.join(self.run_dir, f"{service_name}.pid")
+
+    def pid(self, service_name):
+        """返回服務當前存活的 PID，未運行時返回 None。
+        PID 文件記錄進程啟動時間：只有進程仍是自己的進程組組長且啟動時間一致才視為同一進程，
+        否則 PID 已被複用（或文件來自舊版本），刪除 PID 文件並視為已停止"""
+        child = self._children.get(service_name)
+        if child is not None:
+            return child.pid if child.poll() is None else None
+        try:
+            with open(self._pid_file(service_name)) as f:
+                fields = f.read().split()
+            pid = int(fields[0])
+            start_time = float(fields[1]) if len(fields) > 1 else None
+        except (FileNotFoundError, ValueError, IndexError):
+            return None
+        try:
+            leader = os.getpgid(pid) == pid
+        except ProcessLookupError:
+            leader = False
+        if leader and start_time is not None and process_start_time(pid) == start_time:
+            return pid
+        logger.info(f"服務 {service_name} 的 PID 文件已過期（PID {pid}），視為已停止")
+        try:
+            os.remove(self._pid_file(service_name))
+        except FileNotFoundError:
+            pass
+        return None
+
+    def status(self, service_name):
+        pid = self.pid(service_name)
+        return {'service': service_name, 'running': pid is not None, 'pid': pid}
+
+    def can_manage(self, service_name):
+        """配置了啟動命令的服務才能由管理平台啟停"""
+        return bool(self.services.get(service_name, {}).get('command'))
+
+    def _launch_spec(self, service_name):
+        """校驗啟動配置，返回 (命令參數, 工作目錄)"""
+        config = self.services[service_name]
+        command = config.get('command')
+        if not command:
+            raise SupervisorError(f"服務 {service_name} 未配置啟動命令")
+        args = shlex.split(command) if isinstance(command, str) else list(command)
+        cwd = os.path.join(self.base_dir, config.get('cwd', '.'))
+        if not os.path.isdir(cwd):
+            raise SupervisorError(f"服務 {service_name} 的工作目錄不存在: {cwd}")
+        return args, cwd
+
+    def _external(self, service_name):
+        """端口已被佔用但不是本平台記錄的進程：服務在監督範圍外運行"""
+        return self.pid(service_name) is None and port_in_use(self.services[service_name]['port'])
+
+    def start(self, service_name, wait_ready=True):
+        """啟動服務進程，可選等待健康檢查通過；服務已在監督範圍外運行時不再重複啟動"""
+        config = self.services[service_name]
+        args, cwd = self._launch_spec(service_name)
+
+        with self._service_lock(service_name):
+            pid = self.pid(service_name)
+            if pid is not None:
+                return {'service': service_name, 'pid': pid, 'already_running': True}
+            if port_in_use(config['port']):
+                # 否則新進程綁定端口失敗，而就緒檢查會被舊實例應答，誤報啟動成功
+                return {'service': service_name, 'pid': None, 'already_running': True, 'external': True}
+
+            env = dict(os.environ, **{k: str(v) for k, v in config.get('env', {}).items()})
+            log_file = subprocess.DEVNULL
+            if self.log_path_func is not None:
+                log_path = self.log_path_func(service_name)
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+                log_file = open(log_path, 'ab')
+            try:
+                child = subprocess.Popen(args, cwd=cwd, env=env,
+                                         stdout=log_file, stderr=subprocess.STDOUT,
+                                         stdin=subprocess.DEVNULL, start_new_session=True)
+            finally:
+                if log_file is not subprocess.DEVNULL:
+                    log_file.close()
+
+            self._children[service_name] = child
+            os.makedirs(self.run_dir, exist_ok=True)
+            with open(self._pid_file(service_name), 'w') as f:
+                f.write(f"{child.pid}\n{process_start_time(child.pid)}\n")
+            logger.info(f"服務 {service_name} 已啟動，PID {child.pid}")
+
+        if wait_ready:
+            self.wait_ready(service_name)
+        return {'service': service_name, 'pid': child.pid, 'already_running': False}
+
+    def wait_ready(self, service_name):
+        """輪詢健康檢查直到服務就緒，超時或進程退出時拋出 SupervisorError"""
+        if self.readiness_check is None:
+            return
+        config = self.services[service_name]
+        deadline = time.monotonic() + float(config.get('ready_timeout', DEFAULT_READY_TIMEOUT))
+        delay = 0.2
+        while time.monotonic() < deadline:
+            child = self._children.get(service_name)
+            if child is not None and child.poll() is not None:
+                raise SupervisorError(f"服務 {service_name} 啟動後退出，返回碼 {child.returncode}")
+            if self.readiness_check(service_name, config):
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+        raise SupervisorError(f"服務 {service_name} 在就緒超時內未通過健康檢查")
+
+    def stop(self, service_name, timeout=DEFAULT_STOP_TIMEOUT):
+        """先發送 SIGTERM，超時後 SIGKILL 整個進程組"""
+        with self._service_lock(service_name):
+            pid = self.pid(service_name)
+            if pid is None:
+                self._forget(service_name)
+                return {'service': service_name, 'pid': None, 'was_running': False}
+
+            self._signal_group(pid, signal.SIGTERM)
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline and self._alive(service_name, pid):
+                time.sleep(0.1)
+            if self._alive(service_name, pid):
+                logger.warning(f"服務 {service_name} 未在 {timeout}s 內退出，強制終止")
+                self._signal_group(pid, signal.SIGKILL)
+
+            self._forget(service_name)
+            logger.info(f"服務 {service_name} 已停止，PID {pid}")
+            return {'service': service_name, 'pid': pid, 'was_running': True}
+
+    def restart(self, service_name):
+        """先校驗配置並確認服務可控，再停止舊進程，避免停掉之後無法啟動"""
+        self._launch_spec(service_name)
+        if self._external(service_name):
+            raise SupervisorError(f"服務 {service_name} 的端口 {self.services[service_name]['port']} "
+                                  f"已被非本平台啟動的進程佔用，請先手動停止")
+        stopped = self.stop(service_name)
+        started = self.start(service_name)
+        return {'service': service_name, 'stopped_pid': stopped['pid'], 'pid': started['pid']}
+
+    def _alive(self, service_name, pid):
+        child = self._children.get(service_name)
+        if child is not None and child.pid == pid:
+            return child.poll() is None
+        return self.pid(service_name) == pid
+
+    @staticmethod
+    def _signal_group(pid, sig):
+        """服務以新會話啟動，進程組 ID 即其 PID；pid() 已確認它仍是該進程組的組長"""
+        try:
+            os.killpg(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _forget(self, service_name):
+        self._children.pop(service_name, None)
+        try:
+            os.remove(self._pid_file(service_name))
+        except FileNotFoundError:
+            pass
+
+
+class JobQueue:
+    """異步任務隊列：提交即返回任務 ID，由有界線程池執行，結果可輪詢"""
+
+    def __init__(self, max_workers=4, history_size=500):
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='service-job')
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, job_type, service_name, func, *args):
+        job_id = f"{int(time.time())}-{next(self._ids)}"
+        job = {
+            'id': job_id,
+            'type': job_type,
+            'service': service_name,
+            'status': 'queued',
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.history_size:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job, func, args)
+        return dict(job)
+
+    def _run(self, job, func, args):
+        with self._lock:
+            job['status'] = 'running'
+            job['started_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            result = func(*args)
+            status, error = 'succeeded', None
+        except Exception as e:
+            logger.error(f"任務 {job['id']} ({job['type']} {job['service']}) 失敗: {str(e)}")
+            result, status, error = None, 'failed', str(e)
+        with self._lock:
+            job['status'] = status
+            job['result'] = result
+            job['error'] = error
+            job['finished_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def counts(self):
+        """按狀態統計任務數"""
+        counts = {'queued': 0, 'running': 0, 'succeeded': 0, 'failed': 0}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+        return counts
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
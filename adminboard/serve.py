@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+統一管理平台 - 生產環境入口
+使用 gunicorn 單進程 + 多線程（gthread）運行，關閉調試器。
+探測調度、系統採樣、任務隊列、SSE 廣播與全文索引同步都是進程內狀態，
+只能有一個 worker 持有；併發靠 --threads 擴展
+
+用法: python serve.py --port 9001 --threads 32
+  或: gunicorn -k gthread -w 1 --threads 32 -b 0.0.0.0:9001 serve:application
+"""
+
+import argparse
+import sys
+
+from unified_admin_platform import app
+
+# 供 gunicorn/其他 WSGI 服務器直接加載
+application = app
+
+
+def build_options(args):
+    return {
+        'bind': f"{args.host}:{args.port}",
+        # 多 worker 會各自運行一套後台任務：探測流量翻倍、任務 ID 衝突、全文索引重複寫入
+        'workers': 1,
+        # SSE 與日誌跟隨是長連接，每個連接佔用一個線程
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'keepalive': 5,
+        'timeout': 60,
+        'graceful_timeout': 15,
+        'accesslog': '-' if args.access_log else None,
+        'errorlog': '-',
+        'loglevel': 'info'
+    }
+
+
+def run(options):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ 未安裝 gunicorn，請執行: pip install gunicorn")
+        sys.exit(1)
+
+    class AdminBoardApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                if value is not None and key in self.cfg.settings:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return application
+
+    AdminBoardApplication().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='統一管理平台生產環境入口')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=9001)
+    parser.add_argument('--threads', type=int, default=32, help='工作線程數，每個 SSE / 日誌跟隨長連接佔用一個')
+    parser.add_argument('--access-log', action='store_true', help='輸出訪問日誌')
+    args = parser.parse_args()
+
+    app.debug = False
+    print("🚀 統一管理平台（生產模式）啟動中...")
+    print(f"📊 管理界面: http://localhost:{args.port}")
+    print(f"⚙️  workers=1 threads={args.threads}")
+    print("=" * 50)
+    run(build_options(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+動態服務註冊表
+從 JSON/YAML 配置文件加載服務，監視文件變化並熱加載，只對新增、刪除、變更的條目通知訂閱者
+"""
+
+import json
+import logging
+import os
+import threading
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ('port', 'name')
+
+
+class RegistryError(Exception):
+    """註冊表配置無效"""
+
+
+def load_registry_file(path):
+    """讀取配置文件，支持 {'services': {...}} 或直接的服務映射"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise RegistryError("讀取 YAML 註冊表需要安裝 PyYAML")
+            data = yaml.safe_load(f) or {}
+        else:
+            data = json.load(f)
+    services = data.get('services', data) if isinstance(data, dict) else None
+    if not isinstance(services, dict):
+        raise RegistryError(f"註冊表格式無效: {path}")
+    return services
+
+
+def normalize_entry(service_name, entry):
+    """校驗並補全單個服務條目"""
+    if not isinstance(entry, dict):
+        raise RegistryError(f"服務 {service_name} 的配置必須是對象")
+    missing = [field for field in REQUIRED_FIELDS if field not in entry]
+    if missing:
+        raise RegistryError(f"服務 {service_name} 缺少字段: {', '.join(missing)}")
+    normalized = dict(entry)
+    normalized['port'] = int(entry['port'])
+    normalized.setdefault('type', 'Service')
+    normalized.setdefault('tags', [])
+    return normalized
+
+
+class ServiceRegistry:
+    """維護共享的服務字典；熱加載時原地更新，持有該字典的組件無需重建"""
+
+    def __init__(self, services, path, poll_interval=2.0):
+        self.services = services
+        self.path = path
+        self.poll_interval = poll_interval
+
+        self._listeners = []
+        self._file_state = None     # (st_mtime_ns, st_size)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_listener(self, callback):
+        """註冊變更回調 callback(added, removed, changed)，參數均為服務名列表"""
+        self._listeners.append(callback)
+
+    def reload(self, force=False):
+        """文件有變化時重新加載，返回 (added, removed, changed)"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return [], [], []
+            file_state = (stat.st_mtime_ns, stat.st_size)
+            if not force and file_state == self._file_state:
+                return [], [], []
+
+            # 無論解析成功與否都記錄文件狀態，錯誤只在文件再次變化後重試
+            self._file_state = file_state
+            try:
+                raw = load_registry_file(self.path)
+            except (OSError, ValueError, RegistryError) as e:
+                # 配置寫到一半或格式錯誤時保留當前註冊表
+                logger.error(f"加載服務註冊表失敗，保留當前配置: {str(e)}")
+                return [], [], []
+
+            incoming = {}
+            for service_name, entry in raw.items():
+                try:
+                    incoming[service_name] = normalize_entry(service_name, entry)
+                except (RegistryError, TypeError, ValueError) as e:
+                    logger.error(f"忽略無效的服務條目: {str(e)}")
+                    if service_name in self.services:
+                        incoming[service_name] = self.services[service_name]
+
+            added = [name for name in incoming if name not in self.services]
+            removed = [name for name in self.services if name not in incoming]
+            changed = [name for name in incoming
+                       if name in self.services and self.services[name] != incoming[name]]
+
+            for service_name in removed:
+                del self.services[service_name]
+            for service_name in added + changed:
+                self.services[service_name] = incoming[service_name]
+
+        if added or removed or changed:
+            logger.info(f"服務註冊表已更新: 新增 {len(added)}，刪除 {len(removed)}，變更 {len(changed)}")
+            for callback in self._listeners:
+                try:
+                    callback(added, removed, changed)
+                except Exception as e:
+                    logger.error(f"註冊表變更回調失敗: {str(e)}")
+        return added, removed, changed
+
+    def start(self):
+        """啟動文件監視線程（重複調用無副作用）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._watch, name='service-registry', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.reload()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+生產環境響應處理
+ETag/Last-Modified 條件響應、JSON 響應 gzip/brotli 壓縮，以及可用時基於 orjson 的 JSON 序列化
+"""
+
+import gzip
+import logging
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# 小於該字節數的響應不壓縮，壓縮收益抵不過開銷
+MIN_COMPRESS_SIZE = 512
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """使用 orjson 序列化的 JSON provider，無法處理的類型回退到默認實現"""
+
+    def dumps(self, obj, **kwargs):
+        try:
+            option = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj), mimetype=self.mimetype)
+
+
+def choose_encoding(accept_encoding):
+    """按客戶端支持選擇壓縮算法，brotli 優先"""
+    if brotli is not None and 'br' in accept_encoding:
+        return 'br'
+    if 'gzip' in accept_encoding:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """壓縮 JSON 響應；流式響應與已編碼響應保持不變"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code != 200
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+    data = response.get_data()
+    if encoding is None or len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if response.headers.get('ETag'):
+        # 壓縮後的表示與原始表示字節不同，改為弱校驗
+        etag, _ = response.get_etag()
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def conditional_response(response):
+    """為 JSON GET 響應補充 ETag，並處理 If-None-Match / If-Modified-Since"""
+    if (request.method != 'GET' or response.direct_passthrough or response.is_streamed
+            or response.status_code != 200 or response.mimetype != 'application/json'):
+        return response
+    if not response.headers.get('ETag'):
+        response.add_etag()
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    """為應用註冊生產環境響應處理"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+        logger.info("JSON 序列化使用 orjson")
+
+    @app.after_request
+    def _finalize_response(response):
+        response = conditional_response(response)
+        return compress_response(response)
+
+    return app
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+服務狀態推送流
+由共享的後台探測結果驅動，只在狀態或延遲區間變化時向所有訂閱者推送增量（Server-Sent Events）
+"""
+
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 延遲區間上界（毫秒），落在同一區間內的抖動不推送
+LATENCY_BUCKETS = [(50, 'fast'), (200, 'normal'), (1000, 'slow')]
+
+
+def parse_response_time(value):
+    """把 '12.3ms' 形式的響應時間解析為毫秒浮點數，無法解析時返回 None"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and value.endswith('ms'):
+        try:
+            return float(value[:-2])
+        except ValueError:
+            return None
+    return None
+
+
+def latency_bucket(result):
+    """根據探測結果計算延遲區間"""
+    response_ms = parse_response_time(result.get('response_time'))
+    if response_ms is None:
+        return None
+    for upper, label in LATENCY_BUCKETS:
+        if response_ms < upper:
+            return label
+    return 'very_slow'
+
+
+def format_event(event, data, event_id=None):
+    """格式化單個 SSE 幀"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class StatusBroadcaster:
+    """向多個訂閱者廣播服務狀態增量，每個增量只序列化一次"""
+
+    def __init__(self, heartbeat_interval=15.0, queue_size=256):
+        self.heartbeat_interval = heartbeat_interval
+        self.queue_size = queue_size
+
+        self._subscribers = set()
+        self._last_keys = {}        # service_name -> (status, 延遲區間)
+        self._lock = threading.Lock()
+        self._event_ids = itertools.count(1)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, service_name, result):
+        """探測結果回調：僅當狀態或延遲區間變化時推送"""
+        key = (result.get('status'), latency_bucket(result))
+        with self._lock:
+            if self._last_keys.get(service_name) == key:
+                return False
+            self._last_keys[service_name] = key
+            if not self._subscribers:
+                return True
+            frame = format_event('delta', {
+                'service': service_name,
+                'status': key[0],
+                'latency_bucket': key[1],
+                'result': result
+            }, event_id=next(self._event_ids))
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(frame)
+            except queue.Full:
+                # 消費過慢的客戶端直接斷開，讓其重連後重新獲取快照
+                logger.warning("狀態推送訂閱者隊列已滿，斷開連接")
+                self.unsubscribe(subscriber)
+                self._close(subscriber)
+        return True
+
+    def remove(self, service_name):
+        """服務從註冊表刪除時推送 removed 事件"""
+        with self._lock:
+            self._last_keys.pop(service_name, None)
+            frame = format_event('removed', {'service': service_name}, event_id=next(self._event_ids))
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(frame)
+            except queue.Full:
+                self.unsubscribe(subscriber)
+                self._close(subscriber)
+
+    @staticmethod
+    def _close(subscriber):
+        """清空隊列並放入結束標記"""
+        try:
+            while True:
+                subscriber.get_nowait()
+        except queue.Empty:
+            pass
+        subscriber.put_nowait(None)
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stream(self, snapshot_func):
+        """SSE 生成器：先推送完整快照，再推送增量與週期心跳"""
+        # 先訂閱再取快照，避免兩者之間的變化丟失
+        subscriber = self.subscribe()
+        try:
+            yield format_event('snapshot', {
+                'services': snapshot_func(),
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }, event_id=next(self._event_ids))
+
+            while True:
+                try:
+                    frame = subscriber.get(timeout=self.heartbeat_interval)
+                except queue.Empty:
+                    yield format_event('heartbeat', {'time': time.time()})
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(subscriber)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+系統指標後台採樣器
+按固定頻率採集 CPU、內存、磁盤/網絡 I/O 與各服務進程資源佔用，存入有界緩衝，請求處理直接讀取最新樣本
+"""
+
+import logging
+import platform
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+class SystemSampler:
+    """後台系統指標採樣器"""
+
+    def __init__(self, services, interval=5.0, history_size=720, process_refresh_every=12):
+        self.services = services
+        self.interval = interval
+        self.process_refresh_every = process_refresh_every
+
+        self.available = psutil is not None
+        self.platform_info = {
+            'platform': platform.platform(),
+            'python_version': platform.python_version()
+        }
+
+        self._history = deque(maxlen=history_size)
+        self._latest = None
+        self._processes = {}        # service_name -> psutil.Process
+        self._last_io = None        # (monotonic, disk_io, net_io)
+        self._sample_count = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        if self.available:
+            # cpu_percent(interval=None) 首次調用只建立基準
+            psutil.cpu_percent(interval=None, percpu=True)
+
+    def start(self):
+        """啟動採樣線程（重複調用無副作用）"""
+        with self._lock:
+            if self._thread is not None or not self.available:
+                return
+            # 先同步採集一次，保證啟動後立即有樣本可讀
+            sample = self.collect()
+            self._latest = sample
+            self._history.append(sample)
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+            self._thread.start()
+        logger.info(f"系統指標採樣器已啟動，間隔 {self.interval}s")
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                sample = self.collect()
+                with self._lock:
+                    self._latest = sample
+                    self._history.append(sample)
+            except Exception as e:
+                logger.error(f"採集系統指標時發生錯誤: {str(e)}")
+
+    def collect(self):
+        """採集一次樣本（由採樣器調用，請求處理不直接觸發）"""
+        now = time.monotonic()
+        per_core = psutil.cpu_percent(interval=None, percpu=True)
+        memory = psutil.virtual_memory()
+        disk_io = psutil.disk_io_counters()
+        net_io = psutil.net_io_counters()
+
+        io_rates = {}
+        if self._last_io is not None:
+            last_time, last_disk, last_net = self._last_io
+            elapsed = max(now - last_time, 1e-6)
+            if disk_io is not None and last_disk is not None:
+                io_rates['disk_read_bytes_per_sec'] = round((disk_io.read_bytes - last_disk.read_bytes) / elapsed, 1)
+                io_rates['disk_write_bytes_per_sec'] = round((disk_io.write_bytes - last_disk.write_bytes) / elapsed, 1)
+            if net_io is not None and last_net is not None:
+                io_rates['net_sent_bytes_per_sec'] = round((net_io.bytes_sent - last_net.bytes_sent) / elapsed, 1)
+                io_rates['net_recv_bytes_per_sec'] = round((net_io.bytes_recv - last_net.bytes_recv) / elapsed, 1)
+        self._last_io = (now, disk_io, net_io)
+
+        if self._sample_count % self.process_refresh_every == 0:
+            self._refresh_processes()
+        self._sample_count += 1
+
+        return {
+            'cpu_percent': round(sum(per_core) / len(per_core), 1) if per_core else 0,
+            'cpu_per_core': per_core,
+            'memory_percent': memory.percent,
+            'memory_used': memory.used,
+            'memory_available': memory.available,
+            'disk_percent': psutil.disk_usage('/').percent,
+            'io': io_rates,
+            'services': self._collect_processes(),
+            'sampled_at': time.time(),
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def _refresh_processes(self):
+        """按監聽端口重新定位各服務進程（開銷較大，只定期執行）"""
+        ports = {config['port']: name for name, config in list(self.services.items())}
+        found = {}
+        try:
+            for conn in psutil.net_connections(kind='inet'):
+                if conn.status != psutil.CONN_LISTEN or not conn.pid or not conn.laddr:
+                    continue
+                service_name = ports.get(conn.laddr.port)
+                if service_name and service_name not in found:
+                    existing = self._processes.get(service_name)
+                    # 保留原 Process 對象，cpu_percent 才能計算兩次採樣之間的差值
+                    if existing is not None and existing.pid == conn.pid:
+                        found[service_name] = existing
+                    else:
+                        process = psutil.Process(conn.pid)
+                        process.cpu_percent(interval=None)
+                        found[service_name] = process
+        except (psutil.AccessDenied, psutil.NoSuchProcess) as e:
+            logger.warning(f"無法枚舉監聽端口: {str(e)}")
+            return
+        self._processes = found
+
+    def _collect_processes(self):
+        stats = {}
+        for service_name, process in list(self._processes.items()):
+            try:
+                with process.oneshot():
+                    stats[service_name] = {
+                        'pid': process.pid,
+                        'rss': process.memory_info().rss,
+                        'cpu_percent': process.cpu_percent(interval=None)
+                    }
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                self._processes.pop(service_name, None)
+        return stats
+
+    def latest(self):
+        with self._lock:
+            return self._latest
+
+    def history(self, limit=None):
+        with self._lock:
+            samples = list(self._history)
+        if limit:
+            samples = samples[-limit:]
+        return samples
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+任務數據分析
+只讀訪問 manus-task-manager 的 SQLite 數據庫（WAL 模式），補建覆蓋索引；
+按任務 / 分類的聚合保存在旁路快取庫的匯總表中，按各表 rowid 高水位增量維護，列表使用鍵集分頁
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = 2.0      # 秒，兩次增量刷新的最小間隔
+DEFAULT_CATEGORY = '其他'
+
+# 覆蓋索引：聚合查詢只讀索引不回表
+TASK_DB_INDEXES = [
+    ('idx_messages_task_category', 'CREATE INDEX IF NOT EXISTS idx_messages_task_category '
+                                   'ON messages (task_id, category)'),
+    # 任務消息分頁：按 task_id 定位後沿 id 順序讀取，每頁只掃描 limit 行
+    ('idx_messages_task_id', 'CREATE INDEX IF NOT EXISTS idx_messages_task_id ON messages (task_id, id)'),
+    ('idx_files_task_category', 'CREATE INDEX IF NOT EXISTS idx_files_task_category '
+                                'ON files (task_id, file_category, file_size)'),
+    ('idx_task_sessions_start_time', 'CREATE INDEX IF NOT EXISTS idx_task_sessions_start_time '
+                                     'ON task_sessions (start_time)')
+]
+
+_SUMMARY_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS watermarks (
+        source TEXT PRIMARY KEY,
+        high_water INTEGER NOT NULL,
+        refreshed_at TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS message_summary (
+        task_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        message_count INTEGER NOT NULL,
+        last_message_at TEXT,
+        PRIMARY KEY (task_id, category)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS file_summary (
+        task_id INTEGER NOT NULL,
+        file_category TEXT NOT NULL,
+        file_count INTEGER NOT NULL,
+        total_size INTEGER NOT NULL,
+        PRIMARY KEY (task_id, file_category)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS session_summary (
+        task_id INTEGER PRIMARY KEY,
+        session_count INTEGER NOT NULL,
+        last_start_time TEXT
+    )'''
+]
+
+# 源表 -> (匯總表, 按 rowid 區間聚合並累加的 upsert)
+# 各源表只追加寫入；會話的後續 UPDATE 不影響計數與開始時間
+_SUMMARY_SOURCES = {
+    'messages': ('message_summary', f'''
+        INSERT INTO message_summary (task_id, category, message_count, last_message_at)
+        SELECT COALESCE(task_id, 0), COALESCE(category, '{DEFAULT_CATEGORY}'), COUNT(*), MAX(timestamp)
+        FROM src.messages WHERE id > ? AND id <= ? GROUP BY 1, 2
+        ON CONFLICT (task_id, category) DO UPDATE SET
+            message_count = message_count + excluded.message_count,
+            last_message_at = MAX(COALESCE(last_message_at, ''), COALESCE(excluded.last_message_at, ''))
+    '''),
+    'files': ('file_summary', '''
+        INSERT INTO file_summary (task_id, file_category, file_count, total_size)
+        SELECT COALESCE(task_id, 0), COALESCE(file_category, ''), COUNT(*), COALESCE(SUM(file_size), 0)
+        FROM src.files WHERE id > ? AND id <= ? GROUP BY 1, 2
+        ON CONFLICT (task_id, file_category) DO UPDATE SET
+            file_count = file_count + excluded.file_count,
+            total_size = total_size + excluded.total_size
+    '''),
+    'task_sessions': ('session_summary', '''
+        INSERT INTO session_summary (task_id, session_count, last_start_time)
+        SELECT COALESCE(task_id, 0), COUNT(*), MAX(start_time)
+        FROM src.task_sessions WHERE id > ? AND id <= ? GROUP BY 1
+        ON CONFLICT (task_id) DO UPDATE SET
+            session_count = session_count + excluded.session_count,
+            last_start_time = MAX(COALESCE(last_start_time, ''), COALESCE(excluded.last_start_time, ''))
+    ''')
+}
+
+
+class AnalyticsError(Exception):
+    """任務數據庫不可用或查詢失敗"""
+
+
+def sqlite_uri(path, mode):
+    return f"file:{quote(os.path.abspath(path))}?mode={mode}"
+
+
+def connect_readonly(db_path):
+    """只讀打開任務數據庫；多線程共用時由調用方加鎖"""
+    if not os.path.exists(db_path):
+        raise AnalyticsError(f"任務數據庫不存在: {db_path}")
+    conn = sqlite3.connect(sqlite_uri(db_path, 'ro'), uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA query_only = 1')
+    return conn
+
+
+def prepare_database(db_path):
+    """切換 WAL 並補建索引（一次性寫操作），返回實際的日誌模式；寫入失敗時只記錄警告"""
+    try:
+        conn = sqlite3.connect(sqlite_uri(db_path, 'rw'), uri=True, timeout=10)
+    except sqlite3.Error as e:
+        raise AnalyticsError(f"無法打開任務數據庫 {db_path}: {str(e)}")
+    try:
+        journal_mode = conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for name, sql in TASK_DB_INDEXES:
+            if sql.split(' ON ')[1].split()[0] in tables:
+                conn.execute(sql)
+        conn.execute('PRAGMA optimize')
+        conn.commit()
+        return journal_mode
+    except sqlite3.Error as e:
+        logger.warning(f"任務數據庫 {db_path} 無法切換 WAL 或建立索引，將以現有結構只讀查詢: {str(e)}")
+        return None
+    finally:
+        conn.close()
+
+
+class TaskAnalytics:
+    """任務 / 消息 / 文件 / 會話的只讀分析接口，首次使用時才打開數據庫"""
+
+    def __init__(self, db_path, cache_path=None, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        self.db_path = db_path
+        self.cache_path = cache_path or os.path.splitext(db_path)[0] + '_analytics.db'
+        self.refresh_interval = refresh_interval
+        self.journal_mode = None
+
+        self._conn = None
+        self._lock = threading.RLock()
+        self._last_refresh = None       # None 表示尚未刷新，首次查詢不受最小間隔限制
+        self._data_version = None
+
+    def _connection(self):
+        """旁路快取庫可寫，任務數據庫以只讀方式附加為 src"""
+        if self._conn is None:
+            if not os.path.exists(self.db_path):
+                raise AnalyticsError(f"任務數據庫不存在: {self.db_path}")
+            self.journal_mode = prepare_database(self.db_path)
+            conn = sqlite3.connect(sqlite_uri(self.cache_path, 'rwc'), uri=True,
+                                   check_same_thread=False, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('ATTACH DATABASE ? AS src', (sqlite_uri(self.db_path, 'ro'),))
+            for sql in _SUMMARY_SCHEMA:
+                conn.execute(sql)
+            conn.commit()
+            self._conn = conn
+            logger.info(f"任務數據庫已打開: {self.db_path}（日誌模式 {self.journal_mode}），匯總快取: {self.cache_path}")
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def refresh(self, force=False):
+        """按 rowid 高水位增量更新匯總表；任務庫未提交新數據時直接跳過"""
+        with self._lock:
+            conn = self._connection()
+            now = time.monotonic()
+            if not force and self._last_refresh is not None and now - self._last_refresh < self.refresh_interval:
+                return False
+            self._last_refresh = now
+            data_version = conn.execute('PRAGMA src.data_version').fetchone()[0]
+            if not force and data_version == self._data_version:
+                return False
+
+            source_tables = {row[0] for row in conn.execute(
+                "SELECT name FROM src.sqlite_master WHERE type = 'table'")}
+            marks = {row['source']: row['high_water'] for row in conn.execute('SELECT * FROM watermarks')}
+            refreshed_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            with conn:
+                for source, (summary, upsert) in _SUMMARY_SOURCES.items():
+                    if source not in source_tables:
+                        continue
+                    high_water = conn.execute(f'SELECT MAX(id) FROM src.{source}').fetchone()[0] or 0
+                    previous = marks.get(source, 0)
+                    if high_water < previous or source not in marks:
+                        # 首次構建，或源表被清空 / 替換：全量重建
+                        conn.execute(f'DELETE FROM {summary}')
+                        previous = 0
+                    if high_water > previous:
+                        conn.execute(upsert, (previous, high_water))
+                    conn.execute('INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)',
+                                 (source, high_water, refreshed_at))
+            self._data_version = data_version
+            return True
+
+    def invalidate(self, source=None):
+        """源數據被原地修改（如消息重新分類）後調用，下次刷新時全量重建"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                if source is None:
+                    conn.execute('DELETE FROM watermarks')
+                else:
+                    conn.execute('DELETE FROM watermarks WHERE source = ?', (source,))
+            self._data_version = None
+            self._last_refresh = None
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            self.refresh()
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def overview(self, recent_sessions=10):
+        """全局統計：替代逐表 COUNT(*) / SELECT * 的報告查詢"""
+        with self._lock:
+            categories = self._query('''SELECT category, SUM(message_count) AS count
+                                        FROM message_summary GROUP BY category ORDER BY count DESC''')
+            file_categories = self._query('''SELECT file_category, SUM(file_count) AS count,
+                                                    SUM(total_size) AS total_size
+                                             FROM file_summary GROUP BY file_category ORDER BY count DESC''')
+            task_count = self._query('SELECT COUNT(*) AS count FROM src.tasks')[0]['count']
+            session_count = self._query('SELECT COALESCE(SUM(session_count), 0) AS count FROM session_summary')
+            watermarks = self._query('SELECT * FROM watermarks')
+        return {
+            'tasks': task_count,
+            'messages': sum(row['count'] for row in categories),
+            'files': sum(row['count'] for row in file_categories),
+            'file_bytes': sum(row['total_size'] for row in file_categories),
+            'sessions': session_count[0]['count'],
+            'message_categories': {row['category']: row['count'] for row in categories},
+            'file_categories': {row['file_category']: {'count': row['count'], 'total_size': row['total_size']}
+                                for row in file_categories},
+            'recent_sessions': self.list_sessions(limit=recent_sessions)['sessions'],
+            'watermarks': {row['source']: row['high_water'] for row in watermarks}
+        }
+
+    def _task_aggregates(self, task_ids):
+        if not task_ids:
+            return {}
+        placeholders = ','.join('?' * len(task_ids))
+        aggregates = {task_id: {'messages': 0, 'message_categories': {}, 'files': 0, 'file_bytes': 0,
+                                'file_categories': {}, 'sessions': 0, 'last_message_at': None,
+                                'last_session_at': None}
+                      for task_id in task_ids}
+        for row in self._query(f'SELECT * FROM message_summary WHERE task_id IN ({placeholders})', task_ids):
+            entry = aggregates[row['task_id']]
+            entry['messages'] += row['message_count']
+            entry['message_categories'][row['category']] = row['message_count']
+            entry['last_message_at'] = max(entry['last_message_at'] or '', row['last_message_at'] or '') or None
+        for row in self._query(f'SELECT * FROM file_summary WHERE task_id IN ({placeholders})', task_ids):
+            entry = aggregates[row['task_id']]
+            entry['files'] += row['file_count']
+            entry['file_bytes'] += row['total_size']
+            entry['file_categories'][row['file_category']] = {'count': row['file_count'],
+                                                              'total_size': row['total_size']}
+        for row in self._query(f'SELECT * FROM session_summary WHERE task_id IN ({placeholders})', task_ids):
+            aggregates[row['task_id']]['sessions'] = row['session_count']
+            aggregates[row['task_id']]['last_session_at'] = row['last_start_time']
+        return aggregates
+
+    def get_task(self, task_id):
+        with self._lock:
+            rows = self._query('SELECT * FROM src.tasks WHERE id = ?', (task_id,))
+            if not rows:
+                return None
+            return dict(rows[0], **self._task_aggregates([task_id])[task_id])
+
+    def list_tasks(self, after=None, limit=50):
+        """按 id 倒序的鍵集分頁：after 為上一頁最後一個任務 id"""
+        with self._lock:
+            if after is None:
+                rows = self._query('SELECT * FROM src.tasks ORDER BY id DESC LIMIT ?', (limit + 1,))
+            else:
+                rows = self._query('SELECT * FROM src.tasks WHERE id < ? ORDER BY id DESC LIMIT ?',
+                                   (after, limit + 1))
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            aggregates = self._task_aggregates([row['id'] for row in rows])
+        return {
+            'tasks': [dict(row, **aggregates[row['id']]) for row in rows],
+            'next_after': rows[-1]['id'] if has_more else None
+        }
+
+    def list_messages(self, task_id, after=None, limit=100, category=None):
+        """任務消息按 id 正序的鍵集分頁：after 為上一頁最後一條消息 id"""
+        sql = 'SELECT * FROM src.messages WHERE task_id = ? AND id > ?'
+        params = [task_id, after or 0]
+        if category:
+            sql += ' AND category = ?'
+            params.append(category)
+        rows = self._query(sql + ' ORDER BY id LIMIT ?', params + [limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'messages': rows,
+            'next_after': rows[-1]['id'] if has_more else None
+        }
+
+    def list_sessions(self, before=None, limit=20):
+        """按開始時間倒序的鍵集分頁：before 為上一頁最後一條的 (start_time, id)"""
+        if before is None:
+            rows = self._query('''SELECT * FROM src.task_sessions
+                                  ORDER BY start_time DESC, id DESC LIMIT ?''', (limit + 1,))
+        else:
+            start_time, session_id = before
+            rows = self._query('''SELECT * FROM src.task_sessions
+                                  WHERE (start_time, id) < (?, ?)
+                                  ORDER BY start_time DESC, id DESC LIMIT ?''',
+                               (start_time, session_id, limit + 1))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'sessions': rows,
+            'next_before': [rows[-1]['start_time'], rows[-1]['id']] if has_more else None
+        }
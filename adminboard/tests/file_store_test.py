@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+內容尋址文件庫測試用例
+"""
+
+import hashlib
+import http.client
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from file_store import (FileStore, FileStoreError, FileStoreServer, hash_file, ingest_downloads,
+                        resolve_ingest_tree)
+
+
+class TestFileStore(unittest.TestCase):
+    """相同內容只保留一份對象，原路徑硬鏈接到對象，哈希寫回 files 表"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.base = self.tmpdir.name
+        self.payload = os.urandom(300 * 1024)
+        self.paths = [self.write('task1/doc/documents/a.pdf', self.payload),
+                      self.write('task2/doc/documents/a_copy.pdf', self.payload),
+                      self.write('task2/doc/images/h.txt', b'hello\n')]
+        self.write('notes.txt', b'outside doc')
+        self.write('task1/doc/documents/partial.crdownload', b'')
+
+        self.db_path = os.path.join(self.base, 'manus_tasks.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''CREATE TABLE files (id INTEGER PRIMARY KEY AUTOINCREMENT, task_id INTEGER,
+                        filename TEXT NOT NULL, filepath TEXT NOT NULL, file_size INTEGER)''')
+        conn.executemany('INSERT INTO files (task_id, filename, filepath) VALUES (?, ?, ?)',
+                         [(1, os.path.basename(p), p) for p in self.paths])
+        conn.commit()
+        conn.close()
+        self.store = FileStore(os.path.join(self.base, 'file_store'), chunk_size=64 * 1024)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def write(self, relative, data):
+        path = os.path.join(self.base, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_hash_file_matches_hashlib(self):
+        self.assertEqual(hash_file(self.paths[0], chunk_size=4096),
+                         (hashlib.sha256(self.payload).hexdigest(), len(self.payload)))
+
+    def test_ingest_tree_deduplicates(self):
+        report = ingest_downloads(self.store, self.base, self.db_path, workers=4)
+        self.assertEqual(report['files'], 3)
+        self.assertEqual(report['statuses'], {'stored': 2, 'deduplicated': 1})
+        self.assertEqual(report['saved_bytes'], len(self.payload))
+        self.assertEqual(report['store']['objects'], 2)
+        self.assertEqual(report['store']['saved_bytes'], len(self.payload))
+        self.assertEqual(report['db_updated'], 3)
+
+        first, copy = os.stat(self.paths[0]), os.stat(self.paths[1])
+        self.assertEqual(first.st_ino, copy.st_ino)
+        with open(self.paths[1], 'rb') as f:
+            self.assertEqual(f.read(), self.payload)
+
+        conn = sqlite3.connect(self.db_path)
+        hashes = dict(conn.execute('SELECT filepath, sha256 FROM files'))
+        conn.close()
+        self.assertEqual(hashes[self.paths[0]], hashlib.sha256(self.payload).hexdigest())
+        self.assertEqual(hashes[self.paths[0]], hashes[self.paths[1]])
+
+        again = ingest_downloads(self.store, self.base, self.db_path, workers=4)
+        self.assertEqual(again['statuses'], {'unchanged': 3})
+        self.assertEqual(again['scanned_bytes'], 0)
+        self.assertEqual(again['db_updated'], 0)
+
+    def test_lookup(self):
+        result = self.store.ingest(self.paths[0])
+        entry = self.store.lookup(result['sha256'])
+        self.assertEqual(entry['size'], len(self.payload))
+        self.assertEqual([ref['path'] for ref in entry['refs']], [self.paths[0]])
+        self.assertEqual(self.store.lookup_path(self.paths[0])['sha256'], result['sha256'])
+        self.assertIsNone(self.store.lookup('0' * 64))
+
+    def test_ingest_tree_is_confined_to_base_dir(self):
+        self.assertEqual(resolve_ingest_tree(None, self.base), os.path.realpath(self.base))
+        self.assertEqual(resolve_ingest_tree(os.path.join(self.base, 'task1'), self.base),
+                         os.path.realpath(os.path.join(self.base, 'task1')))
+        with tempfile.TemporaryDirectory() as outside:
+            with self.assertRaises(FileStoreError):
+                resolve_ingest_tree(outside, self.base)
+            os.symlink(outside, os.path.join(self.base, 'escape'))
+            with self.assertRaises(FileStoreError):
+                resolve_ingest_tree(os.path.join(self.base, 'escape'), self.base)
+        with self.assertRaises(FileStoreError):
+            resolve_ingest_tree(os.path.join(self.base, 'task1', '..', '..'), self.base)
+
+    def test_serve_object(self):
+        sha256 = self.store.ingest(self.paths[0])['sha256']
+        server = FileStoreServer(('127.0.0.1', 0), self.store)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+
+            def get(path, headers=None):
+                conn.request('GET', path, headers=headers or {})
+                response = conn.getresponse()
+                return response, response.read()
+
+            response, body = get(f'/objects/{sha256}')
+            self.assertEqual(response.status, 200)
+            self.assertEqual(body, self.payload)
+            self.assertEqual(response.getheader('Content-Type'), 'application/pdf')
+
+            response, body = get(f'/objects/{sha256}', {'Range': 'bytes=100-199'})
+            self.assertEqual(response.status, 206)
+            self.assertEqual(body, self.payload[100:200])
+
+            response, _ = get(f'/objects/{sha256}', {'If-None-Match': f'"{sha256}"'})
+            self.assertEqual(response.status, 304)
+            response, _ = get(f'/objects/{sha256}', {'Range': f'bytes={len(self.payload)}-'})
+            self.assertEqual(response.status, 416)
+            response, _ = get(f'/objects/{"0" * 64}')
+            self.assertEqual(response.status, 404)
+            conn.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+健康探測調度與註冊表熱加載測試用例
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from health_prober import HealthProber
+from service_registry import ServiceRegistry
+
+
+def service(port, interval=0.05):
+    return {'port': port, 'name': f'Service {port}', 'type': 'API', 'interval': interval}
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestHealthProberRegistry(unittest.TestCase):
+    """探測進行中增刪服務不影響調度線程與其他服務"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'services.json')
+        self.services = {}
+        self.release = threading.Event()
+        self.calls = []
+
+        def check(service_name, config):
+            self.calls.append(service_name)
+            if service_name == 'slow':
+                self.release.wait(5)
+            return {'name': config['name'], 'port': config['port'], 'type': config['type'], 'status': 'healthy'}
+
+        self.registry = ServiceRegistry(self.services, self.path)
+        self.prober = HealthProber(self.services, check_func=check, max_workers=4)
+        self.registry.add_listener(self.prober.on_registry_change)
+
+    def tearDown(self):
+        self.release.set()
+        self.prober.stop()
+        self.tmpdir.cleanup()
+
+    def write_registry(self, services):
+        with open(self.path, 'w') as f:
+            json.dump({'services': services}, f)
+        return self.registry.reload(force=True)
+
+    def test_remove_during_probe_and_add(self):
+        self.write_registry({'fast': service(1), 'slow': service(2)})
+        self.prober.start()
+        self.assertTrue(wait_until(lambda: 'slow' in self.calls and self.calls.count('fast') >= 2))
+
+        added, removed, changed = self.write_registry({'fast': service(1), 'new': service(3)})
+        self.assertEqual((added, removed, changed), (['new'], ['slow'], []))
+        self.release.set()
+
+        self.assertTrue(wait_until(lambda: 'new' in self.calls))
+        self.assertTrue(wait_until(lambda: 'slow' not in self.prober._in_flight))
+        names = {entry['name'] for entry in self.prober.snapshot()}
+        self.assertEqual(names, {'Service 1', 'Service 3'})
+
+        fast_calls = self.calls.count('fast')
+        self.assertTrue(wait_until(lambda: self.calls.count('fast') > fast_calls))
+        self.assertTrue(self.prober._thread.is_alive())
+
+    def test_changed_entry_is_rescheduled(self):
+        self.write_registry({'fast': service(1, interval=60)})
+        self.prober.start()
+        self.assertTrue(wait_until(lambda: self.calls.count('fast') == 1))
+        self.write_registry({'fast': service(1, interval=0.05)})
+        self.assertTrue(wait_until(lambda: self.calls.count('fast') >= 3))
+
+
+class FlakyEngine:
+    """submit 對某個服務拋錯，模擬釋放鎖後服務被刪除等競態"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def start(self):
+        pass
+
+    def submit(self, service_name, config):
+        if service_name == 'bad':
+            raise KeyError(service_name)
+        self.submitted.append(service_name)
+        future = Future()
+        future.set_result({'name': config['name'], 'port': config['port'], 'type': config['type'],
+                           'status': 'healthy'})
+        return future
+
+
+class TestHealthProberResilience(unittest.TestCase):
+
+    def test_dispatch_error_does_not_stop_scheduler(self):
+        engine = FlakyEngine()
+        prober = HealthProber({'bad': service(1), 'good': service(2)}, engine=engine)
+        prober.start()
+        try:
+            self.assertTrue(wait_until(lambda: engine.submitted.count('good') >= 3))
+            self.assertTrue(prober._thread.is_alive())
+            self.assertNotIn('bad', prober._in_flight)
+
+            snapshot = {entry['name']: entry for entry in prober.probe_now(timeout=1)}
+            self.assertEqual(snapshot['Service 2']['status'], 'healthy')
+            self.assertEqual(snapshot['Service 1']['status'], 'pending')
+        finally:
+            prober.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
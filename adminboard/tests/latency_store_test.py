@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+服務延遲時間序列存儲測試用例
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from latency_store import LatencyStore, parse_window
+
+NOW = 1_800_000_000.0
+
+
+def exact_percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(int(len(ordered) * q / 100.0 + 0.5) - 1, 0)]
+
+
+class TestLatencyStore(unittest.TestCase):
+    """層級選擇、降採樣層的分位數精度與可用率"""
+
+    def setUp(self):
+        rng = random.Random(3)
+        # 每 2 秒一次探測，持續 6 小時；約 2% 失敗
+        self.samples = [(NOW - offset * 2, rng.lognormvariate(4.0, 0.6)) for offset in range(10800)]
+        self.failures = {ts for ts, _ in self.samples if rng.random() < 0.02}
+        self.store = LatencyStore(raw_capacity=300, minute_capacity=60, hour_capacity=48)
+        for ts, latency in reversed(self.samples):
+            self.store.record('svc', latency, ok=ts not in self.failures, ts=ts)
+
+    def window(self, seconds):
+        cutoff = NOW - seconds
+        return [(ts, latency) for ts, latency in self.samples if ts >= cutoff]
+
+    def test_parse_window(self):
+        self.assertEqual(parse_window('15m'), 900)
+        self.assertEqual(parse_window('7d'), 7 * 86400)
+        for invalid in ('', '0m', '5w', '1.5h'):
+            with self.assertRaises(ValueError):
+                parse_window(invalid)
+
+    def test_tier_selection(self):
+        self.assertEqual(self.store.summarize('svc', 300, now=NOW)['tier'], 'raw')
+        self.assertEqual(self.store.summarize('svc', 1800, now=NOW)['tier'], '1m')
+        self.assertEqual(self.store.summarize('svc', 4 * 3600, now=NOW)['tier'], '1h')
+        self.assertIsNone(self.store.summarize('missing', 600, now=NOW))
+
+    def test_downsampled_percentiles_are_close(self):
+        # 降採樣層按整分鐘 / 整小時對齊，窗口取整使樣本集合與原始數據一致；
+        # 尾部分位數樣本稀疏，箱內插值的誤差更大
+        tolerances = {50: 0.05, 95: 0.08, 99: 0.12}
+        for seconds, tier in ((1800 - NOW % 60, '1m'), (4 * 3600 - NOW % 3600, '1h')):
+            summary = self.store.summarize('svc', seconds, now=NOW)
+            self.assertEqual(summary['tier'], tier)
+            latencies = [latency for ts, latency in self.window(seconds) if ts not in self.failures]
+            for q, tolerance in tolerances.items():
+                expected = exact_percentile(latencies, q)
+                reported = summary['latency_ms'][f'p{q}']
+                self.assertLess(abs(reported - expected) / expected, tolerance, (tier, q, reported, expected))
+
+    def test_availability(self):
+        seconds = 4 * 3600 - NOW % 3600
+        window = self.window(seconds)
+        errors = sum(1 for ts, _ in window if ts in self.failures)
+        summary = self.store.summarize('svc', seconds, now=NOW)
+        self.assertEqual((summary['samples'], summary['errors']), (len(window), errors))
+        self.assertEqual(summary['availability_percentage'], round((len(window) - errors) / len(window) * 100, 2))
+
+    def test_discard(self):
+        self.store.discard('svc')
+        self.assertIsNone(self.store.summarize('svc', 600, now=NOW))
+
+
+if __name__ == '__main__':
+    unittest.main()
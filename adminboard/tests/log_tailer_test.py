@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+日誌索引測試用例
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from log_tailer import LogTailer, parse_time
+
+
+class TestLogTailer(unittest.TestCase):
+    """級別與時間過濾只看本行，且在跨行、亂序時間下保持正確"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tailer = LogTailer({'svc': {}}, self.tmpdir.name)
+        self.path = self.tailer.log_path('svc')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, *lines):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(line + '\n' for line in lines))
+
+    def test_short_line_does_not_borrow_next_line(self):
+        self.write('hello plain line', '2026-01-01 00:00:00 ERROR boom')
+        page = self.tailer.read('svc', level='ERROR')
+        self.assertEqual([e['line'] for e in page['entries']], ['2026-01-01 00:00:00 ERROR boom'])
+
+        first = self.tailer.read('svc', limit=1)['entries'][0]
+        self.assertEqual(first['line'], 'hello plain line')
+        self.assertIsNone(first['level'])
+        self.assertIsNone(first['time'])
+
+    def test_level_and_time_filters_over_mixed_lines(self):
+        self.write('2026-01-01 00:00:00 INFO start',
+                   'continuation without stamp',
+                   '2026-01-01 00:00:10 WARNING slow',
+                   'x',
+                   '2026-01-01 00:00:20 ERROR failed',
+                   '2026-01-01 00:00:30 DEBUG done')
+
+        warnings = self.tailer.read('svc', level='WARNING')
+        self.assertEqual([e['level'] for e in warnings['entries']], ['WARNING', 'ERROR'])
+
+        since = parse_time('2026-01-01 00:00:10')
+        until = parse_time('2026-01-01 00:00:20')
+        window = self.tailer.read('svc', since=since, until=until)
+        self.assertEqual([e['line'] for e in window['entries']],
+                         ['2026-01-01 00:00:10 WARNING slow', 'x', '2026-01-01 00:00:20 ERROR failed'])
+        # 無時間的行沿用上一行的時間
+        self.assertEqual(window['entries'][1]['time'], int(since))
+
+    def test_out_of_order_times_keep_since_filter_correct(self):
+        self.write('2026-01-01 00:00:20 INFO late writer',
+                   '2026-01-01 00:00:05 INFO early writer',
+                   '2026-01-01 00:00:30 INFO after')
+        since = parse_time('2026-01-01 00:00:10')
+        lines = [e['line'] for e in self.tailer.read('svc', since=since)['entries']]
+        self.assertEqual(len(lines), 3)
+        expected = int(datetime(2026, 1, 1, 0, 0, 20).timestamp())
+        self.assertEqual(self.tailer.read('svc')['entries'][1]['time'], expected)
+
+    def test_pagination_and_rotation(self):
+        self.write(*[f'2026-01-01 00:00:0{i} INFO line {i}' for i in range(5)])
+        page = self.tailer.read('svc', limit=2)
+        self.assertEqual(len(page['entries']), 2)
+        rest = self.tailer.read('svc', after=page['next_offset'], limit=10)
+        self.assertEqual([e['line'][-6:] for e in rest['entries']], ['line 2', 'line 3', 'line 4'])
+
+        os.replace(self.path, self.path + '.1')
+        self.write('2026-01-02 00:00:00 INFO rotated')
+        self.assertEqual([e['line'] for e in self.tailer.read('svc')['entries']],
+                         ['2026-01-02 00:00:00 INFO rotated'])
+
+    def take(self, follower, count, timeout=5.0):
+        """在後台線程中從跟隨生成器取 count 行，超時返回已取到的部分"""
+        lines = []
+
+        def pull():
+            for entry in follower:
+                lines.append(entry['line'])
+                if len(lines) >= count:
+                    return
+
+        thread = threading.Thread(target=pull, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        return lines
+
+    def test_follow_reads_replaced_file_from_start(self):
+        self.write('old 1', 'old 2')
+        follower = self.tailer.follow('svc', after=os.path.getsize(self.path), poll_interval=0.01)
+        self.write('old 3')
+        self.assertEqual(self.take(follower, 1), ['old 3'])
+
+        # 新文件在下次輪詢前已經長過舊文件的偏移
+        os.replace(self.path, self.path + '.1')
+        self.write(*[f'new line {i}' for i in range(5)])
+        self.assertEqual(self.take(follower, 5), [f'new line {i}' for i in range(5)])
+
+    def test_follow_restarts_after_truncation(self):
+        self.write('before truncate')
+        follower = self.tailer.follow('svc', after=0, poll_interval=0.01)
+        self.assertEqual(self.take(follower, 1), ['before truncate'])
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('x\n')
+        self.assertEqual(self.take(follower, 1), ['x'])
+
+if __name__ == '__main__':
+    unittest.main()
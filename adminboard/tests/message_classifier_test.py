@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+消息分類引擎測試用例
+"""
+
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ADMINBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ADMINBOARD_DIR)
+from message_classifier import (CLASSIFICATION_KEYWORDS, KEYWORD_WEIGHTS, AhoCorasick, MessageClassifier,
+                                reclassify_messages)
+
+CLASSIFIER_JS = os.path.join(ADMINBOARD_DIR, '..', 'manus-task-manager', 'src', 'utils', 'classifier.js')
+NODE_SCRIPT = '''
+const { MessageClassifier, CLASSIFICATION_KEYWORDS, KEYWORD_WEIGHTS } = require(process.argv[1]);
+const messages = JSON.parse(require('fs').readFileSync(0, 'utf-8'));
+const classifier = new MessageClassifier();
+console.log(JSON.stringify({
+    keywords: CLASSIFICATION_KEYWORDS,
+    weights: KEYWORD_WEIGHTS,
+    labels: messages.map(m => classifier.classify(m))
+}));
+'''
+
+
+def sample_messages(count, seed=7):
+    """隨機拼接各分類關鍵詞與干擾文本，覆蓋同分、重疊與大小寫"""
+    rng = random.Random(seed)
+    words = sorted({w for groups in CLASSIFICATION_KEYWORDS.values() for ws in groups.values() for w in ws})
+    filler = ['今天', '然後', 'the', 'Task', '，', '。', ' ', '系統', 'OK', '123']
+    messages = ['', '   ', '沒有任何關鍵詞的句子']
+    for _ in range(count):
+        parts = [rng.choice(words if rng.random() < 0.4 else filler) for _ in range(rng.randint(1, 12))]
+        text = ''.join(parts)
+        messages.append(text.upper() if rng.random() < 0.1 else text)
+    return messages
+
+
+class TestMessageClassifier(unittest.TestCase):
+
+    def test_aho_corasick_counts_non_overlapping(self):
+        automaton = AhoCorasick(['aa', 'ab', 'b'])
+        self.assertEqual(automaton.count('aaab'), {0: 1, 1: 1, 2: 1})
+        self.assertEqual(automaton.count('aaaa'), {0: 2})
+
+    def test_batch_matches_single(self):
+        classifier = MessageClassifier()
+        messages = sample_messages(2000)
+        self.assertEqual(classifier.classify_batch(messages), [classifier.classify(m) for m in messages])
+
+    @unittest.skipUnless(shutil.which('node'), '需要 node 運行 classifier.js')
+    def test_parity_with_classifier_js(self):
+        messages = sample_messages(3000)
+        output = subprocess.run(['node', '-e', NODE_SCRIPT, os.path.abspath(CLASSIFIER_JS)],
+                                input=json.dumps(messages, ensure_ascii=False), capture_output=True,
+                                text=True, check=True).stdout
+        reference = json.loads(output)
+        self.assertEqual(reference['keywords'], CLASSIFICATION_KEYWORDS)
+        self.assertEqual(reference['weights'], KEYWORD_WEIGHTS)
+        self.assertEqual(MessageClassifier().classify_batch(messages), reference['labels'])
+
+
+class TestReclassify(unittest.TestCase):
+    """分塊重新分類、檢查點續跑，以及試運行不讀寫檢查點"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'manus_tasks.db')
+        self.checkpoint = os.path.join(self.tmpdir.name, 'checkpoint.json')
+        self.messages = sample_messages(500)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, content TEXT, category TEXT)')
+        conn.executemany('INSERT INTO messages (content, category) VALUES (?, ?)',
+                         [(m, '其他') for m in self.messages])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def categories(self):
+        conn = sqlite3.connect(self.db_path)
+        rows = [row[0] for row in conn.execute('SELECT category FROM messages ORDER BY id')]
+        conn.close()
+        return rows
+
+    def test_dry_run_does_not_touch_checkpoint_or_rows(self):
+        report = reclassify_messages(self.db_path, chunk_size=100, checkpoint_path=self.checkpoint, dry_run=True)
+        self.assertEqual(report['processed'], len(self.messages))
+        self.assertGreater(report['changed'], 0)
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.assertEqual(set(self.categories()), {'其他'})
+
+    def test_dry_run_ignores_partial_checkpoint(self):
+        stop = {'calls': 0}
+
+        def interrupt(checkpoint, rate):
+            stop['calls'] += 1
+            if stop['calls'] == 2:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            reclassify_messages(self.db_path, chunk_size=100, checkpoint_path=self.checkpoint, progress=interrupt)
+        with open(self.checkpoint, encoding='utf-8') as f:
+            partial = json.load(f)
+        self.assertEqual(partial['processed'], 200)
+
+        dry = reclassify_messages(self.db_path, chunk_size=100, checkpoint_path=self.checkpoint, dry_run=True)
+        self.assertEqual(dry['processed_this_run'], len(self.messages))
+        with open(self.checkpoint, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), partial)
+
+        resumed = reclassify_messages(self.db_path, chunk_size=100, checkpoint_path=self.checkpoint)
+        self.assertEqual(resumed['processed_this_run'], len(self.messages) - 200)
+        self.assertEqual(self.categories(), MessageClassifier().classify_batch(self.messages))
+
+
+if __name__ == '__main__':
+    unittest.main()
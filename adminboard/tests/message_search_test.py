@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+消息全文搜索測試用例
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from message_search import (MessageSearch, build_match_query, highlight_terms, make_snippet, normalize_time,
+                            segment_for_index)
+from tests.task_db_fixture import create_task_db, execute
+
+MESSAGES = [
+    (1, '正在分析數據庫性能問題', '思考', '2026-10-01 08:00:00'),
+    (1, '數據分析完成，生成報告', '完成', '2026-10-02 08:00:00'),
+    (2, '觀察到 Python 服務響應變慢', '觀察', '2026-10-03 08:00:00'),
+    (2, '庫存數據已更新', '其他', '2026-10-04 08:00:00'),
+    (3, 'データベースの性能を確認', '其他', '2026-10-05 08:00:00'),
+    (3, '<script>分析</script> 結果', '其他', '2026-10-06 08:00:00')
+]
+
+
+class TestSegmentation(unittest.TestCase):
+
+    def test_segment_for_index(self):
+        self.assertEqual(segment_for_index('分析數據').split(), ['分析', '析數', '數據', '據'])
+        self.assertEqual(segment_for_index('run 分析 ok').split(), ['run', '分析', '析', 'ok'])
+
+    def test_build_match_query(self):
+        self.assertEqual(build_match_query('數據庫'), '"數據 據庫"')
+        self.assertEqual(build_match_query('庫'), '"庫"*')
+        self.assertEqual(build_match_query('Python服務 分析'), '"Python" AND "服務" AND "分析"')
+        self.assertEqual(build_match_query('"; DROP'), '"DROP"')
+
+    def test_highlight_and_snippet(self):
+        terms = highlight_terms('分析 Python')
+        self.assertEqual(terms, ['Python', '分析'])
+        snippet = make_snippet('<b>' + 'x' * 50 + '分析</b>', terms, context=5)
+        self.assertEqual(snippet, '…xxxxx<mark>分析</mark>&lt;/b&gt;')
+
+    def test_normalize_time(self):
+        self.assertEqual(normalize_time('2026-10-01'), '2026-10-01 00:00:00')
+        self.assertEqual(normalize_time('2026-10-01T08:30'), '2026-10-01 08:30:00')
+        self.assertEqual(normalize_time('0'), '1970-01-01 00:00:00')
+        self.assertIsNone(normalize_time(''))
+        with self.assertRaises(ValueError):
+            normalize_time('yesterday')
+
+
+class TestMessageSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'manus_tasks.db')
+        create_task_db(self.db_path)
+        execute(self.db_path, 'INSERT INTO messages (task_id, content, category, timestamp) VALUES (?, ?, ?, ?)',
+                MESSAGES)
+        self.search = MessageSearch(self.db_path, batch_size=2)
+        self.assertEqual(self.search.sync(), len(MESSAGES))
+
+    def tearDown(self):
+        self.search.stop()
+        self.tmpdir.cleanup()
+
+    def ids(self, query, **filters):
+        return sorted(r['id'] for r in self.search.search(query, **filters)['results'])
+
+    def test_cjk_phrase_search(self):
+        self.assertEqual(self.ids('數據庫'), [1])
+        self.assertEqual(self.ids('數據'), [1, 2, 4])
+        self.assertEqual(self.ids('分析'), [1, 2, 6])
+        # 二元組必須相鄰：「數庫」不是任何消息的子串
+        self.assertEqual(self.ids('數庫'), [])
+
+    def test_single_character_and_mixed_terms(self):
+        self.assertEqual(self.ids('庫'), [1, 4])
+        self.assertEqual(self.ids('Python 變慢'), [3])
+        self.assertEqual(self.ids('python'), [3])
+        self.assertEqual(self.ids('性能'), [1, 5])
+        self.assertEqual(self.ids('データ'), [5])
+
+    def test_filters(self):
+        self.assertEqual(self.ids('分析', task_id=1), [1, 2])
+        self.assertEqual(self.ids('分析', category='完成'), [2])
+        self.assertEqual(self.ids('分析', since='2026-10-02', until='2026-10-05'), [2])
+
+    def test_results_carry_escaped_snippets(self):
+        result = self.search.search('分析', task_id=3)
+        self.assertEqual(result['match'], '"分析"')
+        snippet = result['results'][0]['snippet']
+        self.assertIn('&lt;script&gt;<mark>分析</mark>&lt;/script&gt;', snippet)
+
+    def test_empty_query_rejected(self):
+        with self.assertRaises(ValueError):
+            self.search.search('  ，。 ')
+
+    def test_incremental_sync_and_restart(self):
+        execute(self.db_path, "INSERT INTO messages (task_id, content) VALUES (4, '新增的數據庫消息')")
+        self.assertEqual(self.search.status()['pending'], 1)
+        self.assertEqual(self.ids('數據庫'), [1])
+        self.assertEqual(self.search.sync(), 1)
+        self.assertEqual(self.ids('數據庫'), [1, 7])
+        self.assertEqual(self.search.status()['pending'], 0)
+
+        # 重新打開索引庫時從高水位續上，不重複索引
+        reopened = MessageSearch(self.db_path, batch_size=2)
+        self.assertEqual(reopened.sync(), 0)
+        self.assertEqual(sorted(r['id'] for r in reopened.search('數據庫')['results']), [1, 7])
+
+    def test_id_rollback_rebuilds_index(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('DELETE FROM messages')
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'messages'")
+        conn.execute("INSERT INTO messages (task_id, content) VALUES (1, '全新的內容')")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.search.sync(), 1)
+        self.assertEqual(self.ids('內容'), [1])
+        self.assertEqual(self.ids('數據'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
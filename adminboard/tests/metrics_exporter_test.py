@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+自身指標與插樁開銷測試用例
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from platform_harness import load_platform
+from metrics_exporter import AdminBoardMetrics
+
+
+class TestMetricsExporter(unittest.TestCase):
+
+    def test_render_openmetrics(self):
+        metrics = AdminBoardMetrics()
+        metrics.observe_probe('svc', '/health', 0.003, 200)
+        metrics.record_outcome('svc', {'status': 'healthy'})
+        text = metrics.render()
+        self.assertIn('adminboard_probe_outcomes_total{service="svc",status="healthy"} 1', text)
+        self.assertTrue(text.endswith('# EOF\n'))
+
+    def test_overhead_includes_before_request(self):
+        metrics = AdminBoardMetrics()
+        metrics.observe_request('/api/x', 'GET', 200, 0.01, time.perf_counter(), before_overhead=0.5)
+        self.assertGreaterEqual(metrics.instrumentation_overhead._series[()][-2], 0.5)
+
+
+class TestRequestInstrumentation(unittest.TestCase):
+    """指標鉤子最後運行（耗時包含壓縮），每個請求記錄一次插樁開銷；開銷預算由 scripts/perf_suite.py 檢查"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.platform, _ = load_platform()
+        cls.client = cls.platform.app.test_client()
+
+    def test_metrics_hook_runs_last(self):
+        # Flask 按註冊的逆序執行 after_request，最先註冊的最後運行
+        hooks = self.platform.app.after_request_funcs[None]
+        self.assertIs(hooks[0], self.platform.record_request_metrics)
+
+    def test_timer_runs_last_before_request(self):
+        hooks = self.platform.app.before_request_funcs[None]
+        self.assertIs(hooks[-1], self.platform.start_request_timer)
+
+    def test_overhead_recorded_per_request(self):
+        histogram = self.platform.admin_metrics.instrumentation_overhead
+        with histogram._lock:
+            before = list(histogram._series.get((), [0, 0]))
+        requests = 500
+        for _ in range(requests):
+            self.client.get('/api/jobs/missing')
+        with histogram._lock:
+            after = histogram._series[()]
+            count = after[-1] - before[-1]
+            total = after[-2] - before[-2]
+        self.assertEqual(count, requests)
+        self.assertGreater(total, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
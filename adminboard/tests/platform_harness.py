@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+管理平台測試夾具
+管理平台在導入時讀取註冊表路徑，同一進程只能導入一次：首次調用時啟動可切換狀態碼的樁服務，
+把註冊表指向它後再導入，之後各測試模塊共用同一個實例
+"""
+
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_state = {}
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """所有路徑返回 StubHandler.status"""
+    status = 200
+
+    def do_GET(self):
+        self.send_response(type(self).status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_platform():
+    """返回 (unified_admin_platform 模塊, 樁服務 handler 類)"""
+    if not _state:
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        tmpdir = tempfile.mkdtemp(prefix='adminboard-test-')
+        registry = os.path.join(tmpdir, 'services.json')
+        with open(registry, 'w') as f:
+            json.dump({'services': {'stub': {'port': server.server_address[1], 'name': 'Stub',
+                                             'type': 'API', 'interval': 3600}}}, f)
+        os.environ['ADMINBOARD_SERVICES'] = registry
+        os.environ['MANUS_TASK_DB'] = os.path.join(tmpdir, 'missing.db')
+        import unified_admin_platform
+        _state['platform'] = unified_admin_platform
+    return _state['platform'], StubHandler
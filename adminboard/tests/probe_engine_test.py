@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+異步健康探測引擎測試用例
+"""
+
+import asyncio
+import http.server
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from probe_engine import AsyncProbeEngine
+
+
+class HealthOnlyHandler(http.server.BaseHTTPRequestHandler):
+    """只有 /health 返回 200"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200 if self.path == '/health' else 404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SlowStartEngine(AsyncProbeEngine):
+    """放大建立會話的耗時，使並發的 submit 落在啟動窗口內"""
+
+    async def _open_session(self):
+        await asyncio.sleep(0.2)
+        await super()._open_session()
+
+
+def config(port):
+    return {'port': port, 'name': f'Service {port}', 'type': 'API'}
+
+
+class TestAsyncProbeEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), HealthOnlyHandler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.engines = []
+
+    def tearDown(self):
+        for engine in self.engines:
+            engine.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def engine(self, engine_class=AsyncProbeEngine):
+        engine = engine_class(timeout=2.0)
+        self.engines.append(engine)
+        return engine
+
+    def test_healthy_endpoint_is_remembered(self):
+        engine = self.engine()
+        first = engine.submit('svc', config(self.port)).result(5)
+        self.assertEqual((first['status'], first['endpoint']), ('healthy', '/health'))
+        self.assertEqual(engine._preferred['svc'], '/health')
+        self.assertEqual(engine.check_many({'svc': config(self.port)}, timeout=5)['svc']['status'], 'healthy')
+
+    def test_closed_port_is_offline(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        result = self.engine().submit('gone', config(port)).result(5)
+        self.assertEqual(result['status'], 'offline')
+
+    def test_submit_during_start_waits_for_session(self):
+        engine = self.engine(SlowStartEngine)
+        starter = threading.Thread(target=engine.start)
+        starter.start()
+        time.sleep(0.05)
+        result = engine.submit('svc', config(self.port)).result(5)
+        starter.join(5)
+        self.assertEqual(result['status'], 'healthy')
+
+
+if __name__ == '__main__':
+    unittest.main()
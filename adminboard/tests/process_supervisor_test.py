@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+服務進程管理測試用例
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from process_supervisor import JobQueue, ProcessSupervisor, SupervisorError, port_in_use, process_start_time
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class TestProcessSupervisor(unittest.TestCase):
+    """啟動配置校驗、相對 cwd 解析，以及不接管監督範圍外的進程"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.base_dir = self.tmpdir.name
+        os.makedirs(os.path.join(self.base_dir, 'svc'))
+        with open(os.path.join(self.base_dir, 'svc', 'marker.py'), 'w') as f:
+            f.write("import os, time\nopen('started', 'w').write(os.getcwd())\ntime.sleep(30)\n")
+        self.services = {
+            'managed': {'port': free_port(), 'command': f"{sys.executable} marker.py", 'cwd': 'svc'},
+            'unmanaged': {'port': free_port()}
+        }
+        self.supervisor = ProcessSupervisor(self.services, os.path.join(self.base_dir, 'run'),
+                                            base_dir=self.base_dir)
+
+    def tearDown(self):
+        for name in self.services:
+            self.supervisor.stop(name, timeout=2)
+        self.tmpdir.cleanup()
+
+    def test_relative_cwd_resolves_against_base_dir(self):
+        result = self.supervisor.start('managed')
+        self.assertFalse(result['already_running'])
+        marker = os.path.join(self.base_dir, 'svc', 'started')
+        deadline = time.monotonic() + 10
+        while not os.path.exists(marker) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(os.path.exists(marker))
+        self.assertEqual(self.supervisor.status('managed')['pid'], result['pid'])
+
+        stopped = self.supervisor.stop('managed', timeout=2)
+        self.assertTrue(stopped['was_running'])
+        self.assertIsNone(self.supervisor.pid('managed'))
+
+    def test_restart_without_command_does_not_stop(self):
+        self.assertFalse(self.supervisor.can_manage('unmanaged'))
+        with mock.patch.object(self.supervisor, 'stop') as stop:
+            with self.assertRaises(SupervisorError):
+                self.supervisor.restart('unmanaged')
+        stop.assert_not_called()
+
+    def test_external_process_is_not_duplicated(self):
+        with socket.socket() as listener:
+            listener.bind(('127.0.0.1', self.services['managed']['port']))
+            listener.listen()
+            self.assertTrue(port_in_use(self.services['managed']['port']))
+
+            result = self.supervisor.start('managed')
+            self.assertTrue(result['external'])
+            self.assertIsNone(self.supervisor.pid('managed'))
+            with self.assertRaises(SupervisorError):
+                self.supervisor.restart('managed')
+
+    def test_adopts_process_from_pid_file(self):
+        started = self.supervisor.start('managed')
+        adopter = ProcessSupervisor(self.services, os.path.join(self.base_dir, 'run'), base_dir=self.base_dir)
+        self.assertEqual(adopter.pid('managed'), started['pid'])
+        self.assertTrue(adopter.stop('managed', timeout=2)['was_running'])
+        self.assertIsNone(self.supervisor.pid('managed'))
+
+
+class TestStalePidFile(unittest.TestCase):
+    """PID 已被其他進程複用時不得向其進程組發送信號"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.run_dir = self.tmpdir.name
+        self.supervisor = ProcessSupervisor({'svc': {'port': free_port()}}, self.run_dir, base_dir=self.run_dir)
+        self.pid_file = os.path.join(self.run_dir, 'svc.pid')
+        self.others = []
+
+    def tearDown(self):
+        for process in self.others:
+            process.kill()
+            process.wait()
+        self.tmpdir.cleanup()
+
+    def unrelated(self, **kwargs):
+        process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'], **kwargs)
+        self.others.append(process)
+        return process
+
+    def assert_stale(self, process, content):
+        with open(self.pid_file, 'w') as f:
+            f.write(content)
+        with mock.patch('os.killpg') as killpg:
+            self.assertIsNone(self.supervisor.pid('svc'))
+            self.assertFalse(self.supervisor.stop('svc', timeout=1)['was_running'])
+        killpg.assert_not_called()
+        self.assertFalse(os.path.exists(self.pid_file))
+        self.assertIsNone(process.poll())
+
+    def test_pid_not_a_group_leader(self):
+        process = self.unrelated()
+        self.assert_stale(process, f"{process.pid}\n{process_start_time(process.pid)}\n")
+
+    def test_start_time_mismatch(self):
+        process = self.unrelated(start_new_session=True)
+        self.assert_stale(process, f"{process.pid}\n{process_start_time(process.pid) - 1}\n")
+
+    def test_legacy_pid_file_without_start_time(self):
+        process = self.unrelated(start_new_session=True)
+        self.assert_stale(process, str(process.pid))
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def test_job_lifecycle(self):
+        queue = JobQueue(max_workers=2)
+        ok = queue.submit('noop', 'svc', lambda x: x * 2, 21)
+        failed = queue.submit('boom', 'svc', lambda: 1 / 0)
+        deadline = time.monotonic() + 5
+        while queue.counts()['succeeded'] + queue.counts()['failed'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(queue.get(ok['id'])['result'], 42)
+        self.assertEqual(queue.get(failed['id'])['status'], 'failed')
+        self.assertIsNone(queue.get('missing'))
+
+
+if __name__ == '__main__':
+    unittest.main()
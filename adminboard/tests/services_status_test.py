@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+服務狀態接口條件響應測試用例
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from platform_harness import load_platform
+
+
+class TestServicesStatusETag(unittest.TestCase):
+    """?fresh=1 的 ETag 反映本次探測結果；age 與 timestamp 變化時仍以弱 ETag 返回 304"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.platform, cls.stub = load_platform()
+        cls.client = cls.platform.app.test_client()
+
+    def test_fresh_probe_invalidates_etag(self):
+        self.stub.status = 200
+        self.client.get('/api/services/status?fresh=1')
+        deadline = time.monotonic() + 5
+        while self.platform.health_prober.version < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        first = self.client.get('/api/services/status?fresh=1')
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(first.json['services'][0]['status'], 'healthy')
+
+        cached = self.client.get('/api/services/status', headers={'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+
+        self.stub.status = 500
+        try:
+            fresh = self.client.get('/api/services/status?fresh=1', headers={'If-None-Match': etag})
+        finally:
+            self.stub.status = 200
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh.json['services'][0]['status'], 'healthy')
+        self.assertNotEqual(fresh.headers['ETag'], etag)
+
+
+if __name__ == '__main__':
+    unittest.main()
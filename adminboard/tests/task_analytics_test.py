@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+任務數據分析測試用例
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from task_analytics import AnalyticsError, TaskAnalytics
+from tests.task_db_fixture import create_task_db, execute
+
+
+class TestTaskAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'manus_tasks.db')
+        create_task_db(self.db_path)
+        execute(self.db_path, 'INSERT INTO tasks (name) VALUES (?)', [(f'task{i}',) for i in range(1, 8)])
+        execute(self.db_path, 'INSERT INTO messages (task_id, content, category, timestamp) VALUES (?, ?, ?, ?)',
+                [(1 + i % 3, f'消息 {i}', '思考' if i % 2 else '觀察', f'2026-10-01 00:00:{i:02d}')
+                 for i in range(30)])
+        execute(self.db_path, 'INSERT INTO files (task_id, filename, filepath, file_category, file_size) '
+                              'VALUES (?, ?, ?, ?, ?)',
+                [(1, 'a.pdf', '/tmp/a.pdf', 'documents', 100), (1, 'b.png', '/tmp/b.png', 'images', 50),
+                 (2, 'c.pdf', '/tmp/c.pdf', 'documents', 10)])
+        # 相同開始時間的會話，驗證 (start_time, id) 複合鍵分頁不重不漏
+        execute(self.db_path, 'INSERT INTO task_sessions (task_id, session_type, start_time) VALUES (?, ?, ?)',
+                [(1 + i % 2, 'collect', f'2026-10-0{1 + i // 4} 08:00:00') for i in range(11)])
+        self.analytics = TaskAnalytics(self.db_path, refresh_interval=0)
+
+    def tearDown(self):
+        self.analytics.close()
+        self.tmpdir.cleanup()
+
+    def test_missing_database(self):
+        with self.assertRaises(AnalyticsError):
+            TaskAnalytics(os.path.join(self.tmpdir.name, 'missing.db')).overview()
+
+    def test_list_tasks_keyset_pagination(self):
+        seen = []
+        after = None
+        while True:
+            page = self.analytics.list_tasks(after=after, limit=3)
+            seen.extend(task['id'] for task in page['tasks'])
+            after = page['next_after']
+            if after is None:
+                break
+        self.assertEqual(seen, list(range(7, 0, -1)))
+        task1 = self.analytics.get_task(1)
+        self.assertEqual(task1['messages'], 10)
+        self.assertEqual(task1['files'], 2)
+        self.assertEqual(task1['file_bytes'], 150)
+
+    def test_list_messages_keyset_pagination(self):
+        first = self.analytics.list_messages(1, limit=4)
+        second = self.analytics.list_messages(1, after=first['next_after'], limit=4)
+        third = self.analytics.list_messages(1, after=second['next_after'], limit=4)
+        ids = [m['id'] for page in (first, second, third) for m in page['messages']]
+        self.assertEqual(ids, list(range(1, 31, 3)))
+        self.assertIsNone(third['next_after'])
+
+        thinking = self.analytics.list_messages(1, category='思考', limit=100)
+        self.assertTrue(all(m['category'] == '思考' for m in thinking['messages']))
+        self.assertEqual(len(thinking['messages']), 5)
+
+    def test_list_messages_uses_task_index(self):
+        self.analytics.refresh(force=True)
+        conn = sqlite3.connect(self.db_path)
+        plan = ' '.join(row[-1] for row in conn.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM messages WHERE task_id = ? AND id > ? ORDER BY id LIMIT ?',
+            (1, 0, 10)))
+        conn.close()
+        # 不同 SQLite 版本把主鍵寫作 id 或 rowid
+        self.assertRegex(plan, r'USING (COVERING )?INDEX idx_messages_task_id \(task_id=\? AND (id|rowid)>\?\)')
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_list_sessions_keyset_pagination_with_ties(self):
+        seen = []
+        before = None
+        while True:
+            page = self.analytics.list_sessions(before=before, limit=3)
+            seen.extend((s['start_time'], s['id']) for s in page['sessions'])
+            before = page['next_before']
+            if before is None:
+                break
+        self.assertEqual(len(seen), 11)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_summary_refresh_is_incremental(self):
+        overview = self.analytics.overview()
+        self.assertEqual(overview['messages'], 30)
+        self.assertEqual(overview['message_categories'], {'思考': 15, '觀察': 15})
+        self.assertEqual(overview['watermarks']['messages'], 30)
+
+        execute(self.db_path, 'INSERT INTO messages (task_id, content, category) VALUES (?, ?, ?)',
+                [(4, '新消息', '完成')] * 5)
+        overview = self.analytics.overview()
+        self.assertEqual(overview['messages'], 35)
+        self.assertEqual(overview['message_categories']['完成'], 5)
+        self.assertEqual(overview['watermarks']['messages'], 35)
+        self.assertEqual(self.analytics.get_task(4)['message_categories'], {'完成': 5})
+
+        # 數據未變化時跳過刷新
+        self.assertFalse(self.analytics.refresh())
+
+    def test_refresh_interval_throttles(self):
+        analytics = TaskAnalytics(self.db_path, cache_path=os.path.join(self.tmpdir.name, 'slow.db'),
+                                  refresh_interval=3600)
+        try:
+            self.assertEqual(analytics.overview()['messages'], 30)
+            execute(self.db_path, "INSERT INTO messages (task_id, content) VALUES (1, '節流期間')")
+            self.assertEqual(analytics.overview()['messages'], 30)
+            self.assertTrue(analytics.refresh(force=True))
+            self.assertEqual(analytics.overview()['messages'], 31)
+        finally:
+            analytics.close()
+
+    def test_invalidate_rebuilds_after_in_place_update(self):
+        self.assertEqual(self.analytics.overview()['message_categories'], {'思考': 15, '觀察': 15})
+        # 重新分類原地改寫 category，rowid 高水位不變
+        execute(self.db_path, "UPDATE messages SET category = '完成' WHERE category = '觀察'")
+        self.analytics.refresh(force=True)
+        self.assertEqual(self.analytics.overview()['message_categories'], {'思考': 15, '觀察': 15})
+
+        self.analytics.invalidate('messages')
+        self.assertEqual(self.analytics.overview()['message_categories'], {'思考': 15, '完成': 15})
+
+    def test_source_table_truncated_triggers_rebuild(self):
+        self.assertEqual(self.analytics.overview()['files'], 3)
+        execute(self.db_path, 'DELETE FROM files')
+        execute(self.db_path, "DELETE FROM sqlite_sequence WHERE name = 'files'")
+        execute(self.db_path, "INSERT INTO files (task_id, filename, filepath, file_category, file_size) "
+                              "VALUES (3, 'd.txt', '/tmp/d.txt', 'documents', 7)")
+        overview = self.analytics.overview()
+        self.assertEqual(overview['files'], 1)
+        self.assertEqual(overview['file_bytes'], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
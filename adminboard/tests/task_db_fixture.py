@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+任務數據庫測試夾具
+按 manus-task-manager 的建表語句建立臨時 SQLite 數據庫，供分析與搜索測試寫入數據
+"""
+
+import sqlite3
+
+TASK_DB_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        display_name TEXT,
+        replay_url TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'active'
+    )''',
+    '''CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER,
+        content TEXT NOT NULL,
+        category TEXT DEFAULT '其他',
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        source TEXT DEFAULT 'unknown',
+        message_type TEXT DEFAULT 'text',
+        FOREIGN KEY (task_id) REFERENCES tasks (id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER,
+        filename TEXT NOT NULL,
+        filepath TEXT NOT NULL,
+        file_type TEXT,
+        file_category TEXT,
+        file_size INTEGER,
+        sha256 TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (task_id) REFERENCES tasks (id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS task_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER,
+        session_type TEXT,
+        start_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+        end_time DATETIME,
+        messages_collected INTEGER DEFAULT 0,
+        files_downloaded INTEGER DEFAULT 0,
+        messages_sent INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'running',
+        FOREIGN KEY (task_id) REFERENCES tasks (id)
+    )'''
+]
+
+
+def create_task_db(db_path):
+    conn = sqlite3.connect(db_path)
+    for sql in TASK_DB_SCHEMA:
+        conn.execute(sql)
+    conn.commit()
+    conn.close()
+
+
+def execute(db_path, sql, rows=None):
+    """以獨立連接寫入並提交，模擬任務管理器的並發寫入"""
+    conn = sqlite3.connect(db_path, timeout=10)
+    try:
+        if rows is None:
+            conn.execute(sql)
+        else:
+            conn.executemany(sql, rows)
+        conn.commit()
+    finally:
+        conn.close()
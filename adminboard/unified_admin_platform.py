@@ -4,26 +4,35 @@
 解決路由衝突和函數重複問題
 """
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, g
 from flask_cors import CORS
-import requests
 import time
 import json
 import logging
+import os
 from datetime import datetime
-import asyncio
-import aiohttp
-import threading
-from concurrent.futures import ThreadPoolExecutor
+from health_prober import HealthProber
+from probe_engine import AsyncProbeEngine
+from status_stream import StatusBroadcaster
+from latency_store import LatencyStore, parse_window
+from system_sampler import SystemSampler
+from log_tailer import LogTailer, parse_time
+from process_supervisor import ProcessSupervisor, JobQueue
+from service_registry import ServiceRegistry
+from task_analytics import TaskAnalytics, AnalyticsError
+from message_search import MessageSearch
+from message_classifier import MessageClassifier, reclassify_messages
+from file_store import FileStore, FileStoreError, ingest_downloads, resolve_ingest_tree, DEFAULT_STORE_ROOT
+import serving
+from metrics_exporter import AdminBoardMetrics, OPENMETRICS_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE
 
 app = Flask(__name__)
-CORS(app)
 
 # 配置日誌
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 服務配置
+# 服務配置（內置默認值，註冊表文件存在時以文件為準並熱加載）
 SERVICES = {
     'mcp_server': {'port': 5000, 'name': 'MCP Server', 'type': 'API'},
     'testing_flow': {'port': 5001, 'name': 'Testing Flow', 'type': 'Web'},
@@ -34,113 +43,92 @@ SERVICES = {
     'system_monitor': {'port': 5006, 'name': 'System Monitor', 'type': 'Dashboard'}
 }
 
-def check_service_health(service_name, config):
-    """檢查單個服務健康狀態"""
-    try:
-        start_time = time.time()
-        url = f"http://localhost:{config['port']}"
-        
-        # 嘗試不同的健康檢查端點
-        health_endpoints = ['/', '/health', '/status', '/api/health']
-        
-        for endpoint in health_endpoints:
-            try:
-                response = requests.get(f"{url}{endpoint}", timeout=5)
-                response_time = round((time.time() - start_time) * 1000, 2)
-                
-                if response.status_code == 200:
-                    return {
-                        'name': config['name'],
-                        'port': config['port'],
-                        'type': config['type'],
-                        'status': 'healthy',
-                        'status_code': response.status_code,
-                        'response_time': f"{response_time}ms",
-                        'url': url,
-                        'last_check': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }
-            except:
-                continue
-                
-        # 如果所有端點都失敗，返回離線狀態
-        return {
-            'name': config['name'],
-            'port': config['port'],
-            'type': config['type'],
-            'status': 'offline',
-            'status_code': 0,
-            'response_time': 'N/A',
-            'url': url,
-            'last_check': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        
-    except Exception as e:
-        logger.error(f"檢查服務 {service_name} 時發生錯誤: {str(e)}")
-        return {
-            'name': config['name'],
-            'port': config['port'],
-            'type': config['type'],
-            'status': 'error',
-            'status_code': 0,
-            'response_time': 'Error',
-            'url': f"http://localhost:{config['port']}",
-            'error': str(e),
-            'last_check': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+# 服務註冊表文件
+SERVICE_REGISTRY_PATH = os.environ.get(
+    'ADMINBOARD_SERVICES', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services.json'))
+
+# 快照條目超過此秒數未更新即標記為過期
+STALE_AFTER = 30.0
+
+# 系統指標採樣間隔（秒）
+SYSTEM_SAMPLE_INTERVAL = 5.0
+
+# 服務日誌目錄（服務配置中的 log_file 優先），單頁最多返回的行數
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+LOG_PAGE_LIMIT = 1000
+
+# 服務 PID 文件目錄，服務控制任務的並行度
+RUN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run')
+SERVICE_JOB_WORKERS = 4
+
+# manus-task-manager 的 SQLite 數據庫，分頁接口單頁上限
+TASK_DB_PATH = os.environ.get('MANUS_TASK_DB', '/home/alexchuang/manus/manus_tasks.db')
+TASK_PAGE_LIMIT = 500
 
 @app.route('/')
 def index():
     """主頁面"""
     return render_template('admin_dashboard.html')
 
+# 後台探測器：按各服務間隔探測，API 只讀取快照
+# 自身性能指標，由 /metrics 導出
+admin_metrics = AdminBoardMetrics()
+# 探測統一在異步引擎的單個事件循環上執行，共用 keep-alive 連接池
+probe_engine = AsyncProbeEngine(observer=admin_metrics.observe_probe)
+health_prober = HealthProber(SERVICES, stale_after=STALE_AFTER, engine=probe_engine)
+# 狀態推送：所有客戶端共用同一個探測循環的結果
+status_broadcaster = StatusBroadcaster()
+health_prober.add_listener(status_broadcaster.publish)
+health_prober.add_listener(admin_metrics.record_outcome)
+# 延遲歷史：固定內存的環形緩衝，支持百分位查詢
+latency_store = LatencyStore()
+health_prober.add_listener(latency_store.record_result)
+# 系統指標：後台按 SYSTEM_SAMPLE_INTERVAL 採樣，請求只讀最新樣本
+system_sampler = SystemSampler(SERVICES, interval=SYSTEM_SAMPLE_INTERVAL)
+# 日誌讀取：按字節偏移增量索引
+log_tailer = LogTailer(SERVICES, LOG_DIR)
+
 @app.route('/api/services/status')
 def get_services_status():
-    """獲取所有服務狀態 - 修復版本"""
-    try:
-        services_status = []
-        
-        # 使用線程池並行檢查所有服務
-        with ThreadPoolExecutor(max_workers=len(SERVICES)) as executor:
-            future_to_service = {
-                executor.submit(check_service_health, name, config): name 
-                for name, config in SERVICES.items()
-            }
-            
-            for future in future_to_service:
-                try:
-                    service_status = future.result(timeout=10)
-                    services_status.append(service_status)
-                except Exception as e:
-                    service_name = future_to_service[future]
-                    logger.error(f"檢查服務 {service_name} 超時: {str(e)}")
-                    services_status.append({
-                        'name': SERVICES[service_name]['name'],
-                        'port': SERVICES[service_name]['port'],
-                        'type': SERVICES[service_name]['type'],
-                        'status': 'timeout',
-                        'status_code': 0,
-                        'response_time': 'Timeout',
-                        'url': f"http://localhost:{SERVICES[service_name]['port']}",
-                        'error': 'Health check timeout',
-                        'last_check': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    })
+    """獲取所有服務狀態 - 讀取後台探測快照，?fresh=1 時即時探測"""
+    try:
+        if request.args.get('fresh') == '1':
+            health_prober.probe_now()
+        # 即時探測之後、取快照之前讀版本：ETag 反映本次探測，且只會落後於內容而不會超前
+        version = health_prober.version
+        services_status = health_prober.snapshot()
         
         # 計算統計信息
         total_services = len(services_status)
         healthy_services = len([s for s in services_status if s['status'] == 'healthy'])
         offline_services = total_services - healthy_services
+        stale_services = len([s for s in services_status if s.get('stale')])
         health_percentage = round((healthy_services / total_services) * 100, 1) if total_services > 0 else 0
         
-        return jsonify({
+        # 快照未更新且過期狀態未變時直接返回 304，省去序列化；
+        # 響應中的 age 與 timestamp 每次都不同，內容只在語義上等價，因此用弱 ETag
+        etag = f"status-{os.getpid()}-{version}-{stale_services}"
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+        
+        response = jsonify({
             'services': services_status,
             'summary': {
                 'total': total_services,
                 'healthy': healthy_services,
                 'offline': offline_services,
+                'stale': stale_services,
                 'health_percentage': health_percentage
             },
+            'stale_after': STALE_AFTER,
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         })
+        response.set_etag(etag, weak=True)
+        if health_prober.updated_at is not None:
+            response.last_modified = health_prober.updated_at
+        return response
         
     except Exception as e:
         logger.error(f"獲取服務狀態時發生錯誤: {str(e)}")
@@ -149,85 +137,462 @@ def get_services_status():
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }), 500
 
-@app.route('/api/service/<service_name>/restart', methods=['POST'])
-def restart_service(service_name):
-    """重啟指定服務"""
+@app.route('/api/services/stream')
+def stream_services_status():
+    """推送服務狀態增量（Server-Sent Events）"""
+    response = Response(status_broadcaster.stream(health_prober.snapshot),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/services/<service_name>/metrics')
+def get_service_metrics(service_name):
+    """獲取服務延遲百分位與可用率，?window=15m/1h/1d"""
     try:
         if service_name not in SERVICES:
             return jsonify({'error': f'服務 {service_name} 不存在'}), 404
-            
-        # 這裡可以添加實際的服務重啟邏輯
-        # 目前返回模擬結果
+        
+        window = request.args.get('window', '1h')
+        try:
+            window_seconds = parse_window(window)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        health_prober.start()
+        metrics = latency_store.summarize(service_name, window_seconds)
+        
         return jsonify({
-            'message': f'服務 {service_name} 重啟請求已發送',
             'service': SERVICES[service_name]['name'],
+            'window': window,
+            'metrics': metrics or {
+                'tier': None,
+                'samples': 0,
+                'errors': 0,
+                'availability_percentage': None,
+                'latency_ms': {'p50': None, 'p95': None, 'p99': None}
+            },
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         })
         
     except Exception as e:
-        logger.error(f"重啟服務 {service_name} 時發生錯誤: {str(e)}")
+        logger.error(f"獲取服務 {service_name} 指標時發生錯誤: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/system/info')
-def get_system_info():
-    """獲取系統信息"""
+def is_service_ready(service_name, config):
+    """就緒檢查：通過探測引擎請求一次健康端點"""
+    try:
+        return probe_engine.submit(service_name, config).result(timeout=15)['status'] == 'healthy'
+    except Exception:
+        return False
+
+# 服務進程管理：子進程輸出寫入服務日誌文件，操作作為異步任務執行
+process_supervisor = ProcessSupervisor(SERVICES, RUN_DIR, log_path_func=log_tailer.log_path,
+                                       readiness_check=is_service_ready,
+                                       base_dir=os.path.dirname(os.path.abspath(SERVICE_REGISTRY_PATH)))
+service_jobs = JobQueue(max_workers=SERVICE_JOB_WORKERS)
+
+def on_registry_change(added, removed, changed):
+    """註冊表熱加載後只更新受影響的服務"""
+    for service_name in removed + changed:
+        probe_engine.forget(service_name)
+        log_tailer.discard(service_name)
+    for service_name in removed:
+        latency_store.discard(service_name)
+        status_broadcaster.remove(service_name)
+        if process_supervisor.pid(service_name) is not None:
+            logger.warning(f"服務 {service_name} 已從註冊表刪除，但其進程仍在運行")
+    health_prober.on_registry_change(added, removed, changed)
+
+# 任務數據分析與消息全文搜索：只讀訪問任務數據庫，匯總表與全文索引放在旁路庫中
+task_analytics = TaskAnalytics(TASK_DB_PATH)
+message_search = MessageSearch(TASK_DB_PATH)
+
+# 服務註冊表：原地更新 SERVICES，各組件共享同一個字典
+service_registry = ServiceRegistry(SERVICES, SERVICE_REGISTRY_PATH)
+service_registry.reload(force=True)
+service_registry.add_listener(on_registry_change)
+
+@app.before_request
+def start_background_tasks():
+    """首個請求時啟動後台任務（重複調用無副作用）"""
+    service_registry.start()
+    health_prober.start()
+    system_sampler.start()
+    message_search.start()
+
+@app.before_request
+def start_request_timer():
+    """最後一個 before_request 鉤子：記錄路由起點及本鉤子自身的開銷"""
+    request_started = time.perf_counter()
+    g.request_timer = (request_started, time.perf_counter() - request_started)
+
+@app.after_request
+def record_request_metrics(response):
+    """記錄路由處理耗時（流式響應只計到響應頭返回）"""
+    hook_started = time.perf_counter()
+    request_timer = g.pop('request_timer', None)
+    if request_timer is not None and request.url_rule is not None:
+        request_started, timer_overhead = request_timer
+        admin_metrics.observe_request(request.url_rule.rule, request.method, response.status_code,
+                                      hook_started - request_started, hook_started, timer_overhead)
+    return response
+
+# after_request 按註冊的逆序執行：指標鉤子先註冊、最後運行，路由耗時包含 CORS、條件響應與壓縮
+CORS(app)
+# 條件響應、壓縮與 orjson；ADMINBOARD_SERVING_HOOKS=0 關閉，供壓測對比
+if os.environ.get('ADMINBOARD_SERVING_HOOKS', '1') != '0':
+    serving.init_app(app)
+
+def _queue_gauges():
+    gauges = {('probe_in_flight',): health_prober.in_flight_count,
+              ('probe_schedule',): health_prober.queue_depth,
+              ('stream_subscribers',): status_broadcaster.subscriber_count}
+    job_counts = service_jobs.counts()
+    gauges[('service_jobs_queued',)] = job_counts['queued']
+    gauges[('service_jobs_running',)] = job_counts['running']
+    return gauges
+
+def _system_gauges():
+    sample = system_sampler.latest() or {}
+    gauges = {(key,): sample.get(key) for key in ('cpu_percent', 'memory_percent', 'disk_percent')}
+    for key, value in sample.get('io', {}).items():
+        gauges[(key,)] = value
+    return gauges
+
+def _cpu_core_gauges():
+    sample = system_sampler.latest() or {}
+    return {(str(core),): value for core, value in enumerate(sample.get('cpu_per_core', []))}
+
+def _service_process_gauges():
+    sample = system_sampler.latest() or {}
+    gauges = {}
+    for service_name, stats in sample.get('services', {}).items():
+        gauges[(service_name, 'rss_bytes')] = stats['rss']
+        gauges[(service_name, 'cpu_percent')] = stats['cpu_percent']
+    return gauges
+
+admin_metrics.add_gauge('adminboard_queue_depth', '後台隊列與並發深度', ('queue',), _queue_gauges)
+admin_metrics.add_gauge('adminboard_system', '系統指標（與 /api/system/info 一致）', ('metric',), _system_gauges)
+admin_metrics.add_gauge('adminboard_system_cpu_core_percent', '各 CPU 核心使用率', ('core',), _cpu_core_gauges)
+admin_metrics.add_gauge('adminboard_service_process', '服務進程資源佔用', ('service', 'metric'),
+                        _service_process_gauges)
+
+@app.route('/metrics')
+def get_metrics():
+    """導出 OpenMetrics 文本格式指標"""
+    accept = request.headers.get('Accept', '')
+    content_type = OPENMETRICS_CONTENT_TYPE if 'application/openmetrics-text' in accept else PROMETHEUS_CONTENT_TYPE
+    return Response(admin_metrics.render(), content_type=content_type)
+
+@app.route('/api/service/<service_name>/<action>', methods=['POST'])
+def control_service(service_name, action):
+    """啟動/停止/重啟指定服務 - 作為異步任務執行，返回任務 ID"""
     try:
-        import psutil
-        import platform
+        if service_name not in SERVICES:
+            return jsonify({'error': f'服務 {service_name} 不存在'}), 404
+        if action not in ('start', 'stop', 'restart'):
+            return jsonify({'error': f'不支持的操作 {action}'}), 404
+        if action != 'stop' and not process_supervisor.can_manage(service_name):
+            return jsonify({'error': f'服務 {service_name} 未配置啟動命令'}), 400
+        
+        job = service_jobs.submit(action, service_name, getattr(process_supervisor, action), service_name)
         
         return jsonify({
-            'platform': platform.platform(),
-            'python_version': platform.python_version(),
-            'cpu_percent': psutil.cpu_percent(interval=1),
-            'memory_percent': psutil.virtual_memory().percent,
-            'disk_percent': psutil.disk_usage('/').percent,
+            'message': f'服務 {service_name} {action} 任務已提交',
+            'service': SERVICES[service_name]['name'],
+            'job_id': job['id'],
+            'job': job,
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        })
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"操作服務 {service_name} ({action}) 時發生錯誤: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/services/restart-all', methods=['POST'])
+def restart_all_services():
+    """並行重啟所有可管理的服務，每個服務一個任務，由有界線程池執行；未配置啟動命令的服務跳過"""
+    try:
+        names = list(SERVICES)
+        jobs = [service_jobs.submit('restart', name, process_supervisor.restart, name)
+                for name in names if process_supervisor.can_manage(name)]
+        skipped = [{'service': name, 'status': 'skipped', 'reason': '未配置啟動命令'}
+                   for name in names if not process_supervisor.can_manage(name)]
         
-    except ImportError:
         return jsonify({
-            'platform': 'Unknown',
-            'python_version': 'Unknown',
-            'cpu_percent': 0,
-            'memory_percent': 0,
-            'disk_percent': 0,
-            'note': 'psutil not installed',
+            'message': f'已提交 {len(jobs)} 個重啟任務，跳過 {len(skipped)} 個',
+            'job_ids': [job['id'] for job in jobs],
+            'jobs': jobs,
+            'skipped': skipped,
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        })
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"批量重啟服務時發生錯誤: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """查詢異步任務狀態"""
+    job = service_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f'任務 {job_id} 不存在'}), 404
+    return jsonify(job)
+
+@app.route('/api/system/info')
+def get_system_info():
+    """獲取系統信息 - 讀取後台採樣器的最新樣本"""
+    try:
+        system_sampler.start()
+        sample = system_sampler.latest()
+        
+        if sample is None:
+            return jsonify(dict(system_sampler.platform_info,
+                                cpu_percent=0,
+                                memory_percent=0,
+                                disk_percent=0,
+                                note='psutil not installed',
+                                timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        
+        return jsonify(dict(system_sampler.platform_info, **sample))
+        
     except Exception as e:
         logger.error(f"獲取系統信息時發生錯誤: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/system/history')
+def get_system_history():
+    """獲取系統指標採樣歷史，?limit=N 只返回最近 N 個樣本"""
+    try:
+        system_sampler.start()
+        limit = request.args.get('limit', type=int)
+        samples = system_sampler.history(limit)
+        
+        return jsonify({
+            'interval': system_sampler.interval,
+            'count': len(samples),
+            'samples': samples,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+        
+    except Exception as e:
+        logger.error(f"獲取系統指標歷史時發生錯誤: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/logs/<service_name>')
 def get_service_logs(service_name):
-    """獲取服務日誌"""
+    """獲取服務日誌 - ?after=<offset>&limit=&level=&since=&until=，?stream=1 持續跟隨"""
     try:
         if service_name not in SERVICES:
             return jsonify({'error': f'服務 {service_name} 不存在'}), 404
-            
-        # 這裡可以添加實際的日誌讀取邏輯
-        # 目前返回模擬日誌
-        logs = [
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: 服務 {SERVICES[service_name]['name']} 正在運行",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: 端口 {SERVICES[service_name]['port']} 監聽中",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: 服務類型: {SERVICES[service_name]['type']}"
-        ]
         
-        return jsonify({
+        try:
+            after = request.args.get('after', type=int)
+            limit = min(request.args.get('limit', 100, type=int), LOG_PAGE_LIMIT)
+            level = request.args.get('level')
+            since = parse_time(request.args.get('since'))
+            until = parse_time(request.args.get('until'))
+        except ValueError as e:
+            return jsonify({'error': f'無效的查詢參數: {str(e)}'}), 400
+        
+        if request.args.get('stream') == '1':
+            def generate():
+                for entry in log_tailer.follow(service_name, after=after, level=level):
+                    yield json.dumps(entry, ensure_ascii=False) + '\n'
+            return Response(generate(), mimetype='application/x-ndjson',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        
+        page = log_tailer.read(service_name, after=after or 0, limit=limit,
+                               level=level, since=since, until=until)
+        
+        result = {
             'service': SERVICES[service_name]['name'],
-            'logs': logs,
+            'logs': [entry['line'] for entry in page['entries']],
+            'entries': page['entries'],
+            'file': page['file'],
+            'size': page['size'],
+            'next_offset': page['next_offset'],
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        })
+        }
+        if not page['exists']:
+            result['note'] = '日誌文件不存在'
+        return jsonify(result)
         
     except Exception as e:
         logger.error(f"獲取服務 {service_name} 日誌時發生錯誤: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+
+@app.route('/api/tasks')
+def list_tasks():
+    """任務列表（含聚合統計）- 鍵集分頁 ?after=<上一頁最後的任務 id>&limit="""
+    try:
+        after = request.args.get('after', type=int)
+        limit = min(request.args.get('limit', 50, type=int), TASK_PAGE_LIMIT)
+        page = task_analytics.list_tasks(after=after, limit=limit)
+        return jsonify(dict(page, timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        
+    except AnalyticsError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.error(f"獲取任務列表時發生錯誤: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/tasks/overview')
+def get_tasks_overview():
+    """任務數據總覽：消息分類、文件分類與最近會話"""
+    try:
+        overview = task_analytics.overview()
+        return jsonify(dict(overview, timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        
+    except AnalyticsError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.error(f"獲取任務總覽時發生錯誤: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/tasks/<int:task_id>')
+def get_task(task_id):
+    """單個任務及其聚合統計"""
+    try:
+        task = task_analytics.get_task(task_id)
+        if task is None:
+            return jsonify({'error': f'任務 {task_id} 不存在'}), 404
+        return jsonify(task)
+        
+    except AnalyticsError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.error(f"獲取任務 {task_id} 時發生錯誤: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/tasks/<int:task_id>/messages')
+def list_task_messages(task_id):
+    """任務消息 - 鍵集分頁 ?after=<上一頁最後的消息 id>&limit=&category="""
+    try:
+        after = request.args.get('after', type=int)
+        limit = min(request.args.get('limit', 100, type=int), TASK_PAGE_LIMIT)
+        page = task_analytics.list_messages(task_id, after=after, limit=limit,
+                                            category=request.args.get('category'))
+        return jsonify(dict(page, task_id=task_id, timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        
+    except AnalyticsError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.error(f"獲取任務 {task_id} 消息時發生錯誤: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+message_classifier = MessageClassifier()
+reclassify_job_id = None
+
+def run_reclassify(dry_run):
+    """重新分類任務：完成後讓消息匯總表在下次刷新時全量重建"""
+    report = reclassify_messages(TASK_DB_PATH, message_classifier, dry_run=dry_run)
+    if not dry_run and report['changed']:
+        task_analytics.invalidate('messages')
+    return report
+
+@app.route('/api/messages/reclassify', methods=['POST'])
+def reclassify_all_messages():
+    """按當前關鍵詞表重新分類全部消息（異步任務，支持斷點續跑），?dry_run=1 只統計"""
+    global reclassify_job_id
+    try:
+        if not os.path.exists(TASK_DB_PATH):
+            return jsonify({'error': f'任務數據庫不存在: {TASK_DB_PATH}'}), 503
+        
+        running = service_jobs.get(reclassify_job_id) if reclassify_job_id else None
+        if running is not None and running['status'] in ('queued', 'running'):
+            return jsonify({'error': '重新分類任務正在運行', 'job_id': running['id']}), 409
+        
+        job = service_jobs.submit('reclassify', 'messages', run_reclassify,
+                                  request.args.get('dry_run') == '1')
+        reclassify_job_id = job['id']
+        return jsonify({
+            'message': '已提交消息重新分類任務',
+            'job_id': job['id'],
+            'job': job,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"提交消息重新分類任務時發生錯誤: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+file_ingest_job_id = None
+
+def run_file_ingest(tree, workers):
+    """收錄下載目錄樹到內容尋址文件庫，並把哈希寫回任務數據庫"""
+    store = FileStore(DEFAULT_STORE_ROOT)
+    try:
+        return ingest_downloads(store, tree, TASK_DB_PATH, workers=workers)
+    finally:
+        store.close()
+
+@app.route('/api/files/ingest', methods=['POST'])
+def ingest_task_files():
+    """去重收錄任務下載文件（異步任務）- ?tree=&workers=，tree 必須在任務數據庫所在目錄之內"""
+    global file_ingest_job_id
+    try:
+        try:
+            tree = resolve_ingest_tree(request.args.get('tree'), os.path.dirname(TASK_DB_PATH))
+        except FileStoreError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        running = service_jobs.get(file_ingest_job_id) if file_ingest_job_id else None
+        if running is not None and running['status'] in ('queued', 'running'):
+            return jsonify({'error': '文件收錄任務正在運行', 'job_id': running['id']}), 409
+        
+        workers = max(request.args.get('workers', 8, type=int), 1)
+        job = service_jobs.submit('ingest', 'file_manager', run_file_ingest, tree, workers)
+        file_ingest_job_id = job['id']
+        return jsonify({
+            'message': '已提交文件收錄任務',
+            'job_id': job['id'],
+            'job': job,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"提交文件收錄任務時發生錯誤: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/messages/search')
+def search_messages():
+    """消息全文搜索 - ?q=&task_id=&category=&since=&until=&limit=&offset=，按相關度排序並返回摘要"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': '缺少搜索詞 q'}), 400
+        
+        try:
+            result = message_search.search(
+                query,
+                task_id=request.args.get('task_id', type=int),
+                category=request.args.get('category') or None,
+                since=request.args.get('since'),
+                until=request.args.get('until'),
+                limit=min(request.args.get('limit', 20, type=int), TASK_PAGE_LIMIT),
+                offset=max(request.args.get('offset', 0, type=int), 0))
+        except ValueError as e:
+            return jsonify({'error': f'無效的查詢參數: {str(e)}'}), 400
+        
+        result['index'] = message_search.status()
+        result['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return jsonify(result)
+        
+    except AnalyticsError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.error(f"搜索消息時發生錯誤: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     print("🚀 統一管理平台啟動中...")
     print("📊 管理界面: http://localhost:9001")
     print("🔧 API端點: http://localhost:9001/api/services/status")
+    print("🏭 生產環境請使用: python serve.py")
     print("=" * 50)
     
-    app.run(host='0.0.0.0', port=9001, debug=True)
-
+    # 開發服務器；ADMINBOARD_DEBUG=1 時啟用調試模式（交互式調試器不可暴露在生產環境）
+    app.run(host='0.0.0.0', port=9001, debug=os.environ.get('ADMINBOARD_DEBUG') == '1')
@@ -2,6 +2,7 @@ const { chromium } = require('playwright');
 const fs = require('fs');
 const path = require('path');
 const sqlite3 = require('sqlite3').verbose();
+const { createDefaultClassifier } = require('./utils/classifier');
 
 // 配置
 const CONFIG = {
@@ -23,23 +24,9 @@ const FILE_TYPES = {
     'Links': 'links'
 };
 
-// 消息分類關鍵詞
-const CLASSIFICATION_KEYWORDS = {
-    '思考': [
-        '我認為', '我覺得', '分析', '考慮', '思考', '判斷', '評估', '推理', 
-        '計劃', '策略', '假設', '推測', '預測', '設想', '構思', '規劃'
-    ],
-    '觀察': [
-        '我看到', '發現', '注意到', '觀察', '檢測', '顯示', '出現', '結果',
-        '確認意圖', '確認', '理解', '明白', '了解', '識別', '檢查', '察覺',
-        '監測', '記錄', '報告', '狀態', '情況'
-    ],
-    '行動': [
-        '執行', '運行', '創建', '修改', '發送', '點擊', '操作', '實施', 
-        '完成', '開始', '啟動', '停止', '刪除', '更新', '安裝', '配置',
-        '部署', '測試', '調試', '優化'
-    ]
-};
+// 消息分類：與 utils/classifier.js 共用同一套關鍵詞與權重規則，
+// 管理平台的批量重新分類（adminboard/message_classifier.py）也以該文件為準
+const messageClassifier = createDefaultClassifier();
 
 // 工具函數
 function sanitizeTaskName(taskName) {
@@ -49,24 +36,6 @@ function sanitizeTaskName(taskName) {
         .trim();
 }
 
-function classifyMessage(content) {
-    const text = content.toLowerCase();
-    let scores = { '思考': 0, '觀察': 0, '行動': 0 };
-    
-    for (const [category, keywords] of Object.entries(CLASSIFICATION_KEYWORDS)) {
-        for (const keyword of keywords) {
-            if (text.includes(keyword.toLowerCase())) {
-                scores[category] += 1;
-            }
-        }
-    }
-    
-    const maxScore = Math.max(...Object.values(scores));
-    if (maxScore === 0) return '其他';
-    
-    return Object.keys(scores).find(key => scores[key] === maxScore);
-}
-
 function ensureDirectoryExists(dirPath) {
     if (!fs.existsSync(dirPath)) {
         fs.mkdirSync(dirPath, { recursive: true });
@@ -123,6 +92,7 @@ class ManusDatabase {
                 file_type TEXT,
                 file_category TEXT,
                 file_size INTEGER,
+                sha256 TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (task_id) REFERENCES tasks (id)
             )`,
@@ -200,7 +170,7 @@ class ManusDatabase {
     
     async addMessage(taskId, content, source = 'unknown', messageType = 'text') {
         try {
-            const category = classifyMessage(content);
+            const category = messageClassifier.classify(content);
             const result = await this.run(
                 'INSERT INTO messages (task_id, content, category, source, message_type) VALUES (?, ?, ?, ?, ?)',
                 [taskId, content, category, source, messageType]
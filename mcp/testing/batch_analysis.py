@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+批量代碼分析
+把大量 (代碼, 語言) 或整個目錄樹分塊分發到進程池，按完成順序流式返回結果並統計吞吐量
+
+用法: python batch_analysis.py <目錄> [--workers N] [--chunksize M] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from code_analysis import CodeAnalyzer
+
+# 擴展名 -> 語言
+LANGUAGE_EXTENSIONS = {'.py': 'python', '.js': 'javascript', '.mjs': 'javascript', '.cjs': 'javascript'}
+SKIP_DIRS = {'.git', 'node_modules', '__pycache__', '.venv', 'venv', '.tox', '.mypy_cache', 'build', 'dist'}
+DEFAULT_CHUNKSIZE = 16
+
+# 每個工作進程持有自己的分析器（及快取）
+_worker_analyzer = None
+
+
+def _get_worker_analyzer():
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = CodeAnalyzer()
+    return _worker_analyzer
+
+
+def _analyze_chunk(chunk):
+    """在工作進程中分析一塊任務；路徑任務在工作進程內讀取文件，避免大內容跨進程傳輸"""
+    analyzer = _get_worker_analyzer()
+    results = []
+    for key, code, language, path in chunk:
+        if path is not None:
+            try:
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    code = f.read()
+            except OSError as e:
+                results.append((key, {'error': str(e), 'error_type': 'io_error'}))
+                continue
+        try:
+            results.append((key, analyzer.analyze(code, language)))
+        except Exception as e:
+            results.append((key, {'error': str(e), 'error_type': 'processing_error'}))
+    return results
+
+
+def iter_source_files(root, extensions=None):
+    """遍歷目錄樹中可分析的源文件，生成 (路徑, 語言)"""
+    extensions = extensions or LANGUAGE_EXTENSIONS
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for filename in sorted(filenames):
+            language = extensions.get(os.path.splitext(filename)[1])
+            if language:
+                yield os.path.join(dirpath, filename), language
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchReport:
+    """批量分析統計"""
+
+    def __init__(self):
+        self.files = 0
+        self.errors = 0
+        self.lines = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add(self, result):
+        self.files += 1
+        if 'error' in result:
+            self.errors += 1
+        else:
+            self.lines += result['analysis']['lines_of_code']
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def files_per_sec(self):
+        return round(self.files / self.elapsed, 1) if self.elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            'files': self.files,
+            'errors': self.errors,
+            'lines_of_code': self.lines,
+            'elapsed': round(self.elapsed, 3),
+            'files_per_sec': self.files_per_sec
+        }
+
+
+class BatchAnalyzer:
+    """進程池批量分析器；提交中的塊數有上限，目錄再大內存也保持平穩"""
+
+    def __init__(self, workers=None, chunksize=DEFAULT_CHUNKSIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.report = BatchReport()
+
+    def analyze_items(self, items):
+        """items 為 (key, code, language) 序列，按完成順序生成 (key, 結果)"""
+        tasks = ((key, code, language, None) for key, code, language in items)
+        yield from self._run(tasks)
+
+    def analyze_paths(self, paths):
+        """paths 為 (路徑, 語言) 序列，以路徑作為結果鍵"""
+        tasks = ((path, None, language, path) for path, language in paths)
+        yield from self._run(tasks)
+
+    def analyze_tree(self, root):
+        yield from self.analyze_paths(iter_source_files(root))
+
+    def _run(self, tasks):
+        self.report = BatchReport()
+        max_pending = self.workers * 2
+        chunks = _chunked(tasks, self.chunksize)
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = set()
+            for chunk in chunks:
+                pending.add(executor.submit(_analyze_chunk, chunk))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from self._drain(done)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from self._drain(done)
+
+    def _drain(self, futures):
+        for future in futures:
+            for key, result in future.result():
+                self.report.add(result)
+                yield key, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量代碼分析')
+    parser.add_argument('root', help='要分析的目錄')
+    parser.add_argument('--workers', type=int, default=None, help='工作進程數，默認為 CPU 核數')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--json', action='store_true', help='逐行輸出每個文件的 JSON 結果')
+    args = parser.parse_args()
+
+    batch = BatchAnalyzer(workers=args.workers, chunksize=args.chunksize)
+    for path, result in batch.analyze_tree(args.root):
+        if args.json:
+            print(json.dumps({'path': path, 'result': result}, ensure_ascii=False))
+        elif 'error' in result:
+            print(f"❌ {path}: {result['error']} (line {result.get('line')})")
+
+    report = batch.report.to_dict()
+    print(f"📊 分析 {report['files']} 個文件，{report['errors']} 個錯誤，"
+          f"{report['lines_of_code']} 行代碼，耗時 {report['elapsed']}s，"
+          f"{report['files_per_sec']} files/sec ({batch.workers} 進程)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
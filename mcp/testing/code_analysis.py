@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+代碼分析引擎
+Python 基於 AST、JavaScript 基於詞法掃描，計算代碼行數、函數數量、圈複雜度與語法錯誤位置，
+結果按內容哈希做 LRU 快取，並發的相同請求只計算一次
+"""
+
+import ast
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class _PythonVisitor(ast.NodeVisitor):
+    """單次遍歷 AST，統計函數與圈複雜度"""
+
+    def __init__(self):
+        self.functions = []
+        self.module_complexity = 1
+        self._stack = []
+
+    def _add(self, amount):
+        if self._stack:
+            self._stack[-1]['complexity'] += amount
+        else:
+            self.module_complexity += amount
+
+    def _visit_function(self, node):
+        info = {'name': node.name, 'line': node.lineno, 'complexity': 1}
+        self.functions.append(info)
+        self._stack.append(info)
+        self.generic_visit(node)
+        self._stack.pop()
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def _visit_branch(self, node):
+        self._add(1)
+        self.generic_visit(node)
+
+    visit_If = _visit_branch
+    visit_For = _visit_branch
+    visit_AsyncFor = _visit_branch
+    visit_While = _visit_branch
+    visit_IfExp = _visit_branch
+    visit_ExceptHandler = _visit_branch
+    visit_Assert = _visit_branch
+
+    def visit_BoolOp(self, node):
+        self._add(len(node.values) - 1)
+        self.generic_visit(node)
+
+    def visit_comprehension(self, node):
+        self._add(1 + len(node.ifs))
+        self.generic_visit(node)
+
+    def visit_match_case(self, node):
+        self._add(1)
+        self.generic_visit(node)
+
+
+def _count_python_loc(code):
+    return sum(1 for line in code.splitlines() if line.strip() and not line.lstrip().startswith('#'))
+
+
+def analyze_python(code):
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return {
+            'error': f"Syntax error: {e.msg}",
+            'error_type': 'syntax_error',
+            'line': e.lineno,
+            'column': e.offset
+        }
+
+    visitor = _PythonVisitor()
+    visitor.visit(tree)
+    return _build_analysis('python', code, _count_python_loc(code),
+                           visitor.functions, visitor.module_complexity)
+
+
+_JS_TOKEN = re.compile(r'''
+    (?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|$))
+  | (?P<string>"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?|`(?:[^`\\]|\\[\s\S])*`?)
+  | (?P<word>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<op>=>|&&|\|\||\?\?|\?\.|[{}()\[\]?])
+  | (?P<punct>\+\+|--|[^\s\w$])
+  | (?P<newline>\n)
+''', re.VERBOSE)
+# 正則字面量：字符類中的 '/' 不結束字面量
+_JS_REGEX = re.compile(r'(?P<regex>/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*)')
+
+_JS_BRANCH_KEYWORDS = {'if', 'for', 'while', 'case', 'catch'}
+# 這些關鍵詞之後的 '/' 開始正則字面量而不是除號
+_JS_REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                      'case', 'do', 'else', 'yield', 'await'}
+_JS_PAIRS = {')': '(', ']': '[', '}': '{'}
+
+
+def analyze_javascript(code):
+    """詞法掃描 JavaScript：一次遍歷統計函數、分支與括號配對"""
+    functions = []
+    complexity = 1
+    stack = []
+    line = 1
+    line_start = 0
+    code_lines = set()
+    regex_allowed = True        # 上一個有效記號之後能否出現表達式（從而 '/' 為正則字面量）
+    position = 0
+
+    while True:
+        match = _JS_TOKEN.search(code, position)
+        if match is None:
+            break
+        if regex_allowed and match.group() == '/':
+            match = _JS_REGEX.match(code, match.start()) or match
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group()
+        column = match.start() - line_start + 1
+        if kind == 'newline':
+            line += 1
+            line_start = match.end()
+            continue
+        if kind == 'comment':
+            if text.startswith('/*') and not text.endswith('*/'):
+                return _js_error('Unterminated comment', line, column)
+            newlines = text.count('\n')
+            if newlines:
+                line += newlines
+                line_start = match.start() + text.rfind('\n') + 1
+            continue
+
+        code_lines.add(line)
+        if kind == 'word':
+            regex_allowed = text in _JS_REGEX_KEYWORDS
+        elif kind in ('op', 'punct'):
+            regex_allowed = text not in (')', ']', '}', '++', '--')
+        else:
+            regex_allowed = False
+
+        if kind == 'string':
+            if len(text) < 2 or text[-1] != text[0]:
+                return _js_error('Unterminated string literal', line, column)
+            newlines = text.count('\n')
+            if newlines:
+                line += newlines
+                line_start = match.start() + text.rfind('\n') + 1
+        elif kind == 'word':
+            if text == 'function':
+                functions.append({'name': None, 'line': line, 'complexity': 1})
+            elif text in _JS_BRANCH_KEYWORDS:
+                complexity += 1
+        elif text == '=>':
+            functions.append({'name': None, 'line': line, 'complexity': 1})
+        elif text in ('&&', '||', '??', '?'):
+            complexity += 1
+        elif text in '([{':
+            stack.append((text, line, column))
+        elif text in _JS_PAIRS:
+            if not stack or stack[-1][0] != _JS_PAIRS[text]:
+                return _js_error(f"Unexpected '{text}'", line, column)
+            stack.pop()
+
+    if stack:
+        opener, open_line, open_column = stack[-1]
+        return _js_error(f"Unclosed '{opener}'", open_line, open_column)
+
+    # 詞法掃描無法可靠地把分支歸屬到具體函數，只給出整體複雜度
+    return _build_analysis('javascript', code, len(code_lines), functions, complexity)
+
+
+def _js_error(message, line, column):
+    return {
+        'error': f"Syntax error: {message}",
+        'error_type': 'syntax_error',
+        'line': line,
+        'column': column
+    }
+
+
+def _build_analysis(language, code, loc, functions, module_complexity):
+    total_complexity = module_complexity + sum(f['complexity'] - 1 for f in functions)
+    max_complexity = max([f['complexity'] for f in functions] + [module_complexity])
+    average = total_complexity / max(len(functions), 1)
+    return {
+        'analysis': {
+            'language': language,
+            'lines_of_code': loc,
+            'total_lines': code.count('\n') + 1,
+            'functions_detected': len(functions),
+            'functions': functions,
+            'cyclomatic_complexity': total_complexity,
+            'max_function_complexity': max_complexity,
+            'complexity_score': min(round(average), 10),
+            'quality_score': max(100 - max(max_complexity - 10, 0) * 5 - max(round(average) - 5, 0) * 3, 0)
+        },
+        'language': language,
+        'status': 'success'
+    }
+
+
+ANALYZERS = {
+    'python': analyze_python,
+    'javascript': analyze_javascript,
+    'js': analyze_javascript
+}
+
+
+def _copy_result(result, **fields):
+    """按已知結構拷貝分析結果（只有 analysis 與其 functions 是可變的嵌套層），比 deepcopy 快一個數量級"""
+    copied = dict(result, **fields)
+    analysis = result.get('analysis')
+    if analysis is not None:
+        copied['analysis'] = dict(analysis, functions=[dict(f) for f in analysis.get('functions', ())])
+    return copied
+
+
+class CodeAnalyzer:
+    """帶 LRU 快取的代碼分析器，快取鍵為語言與內容的 SHA-256。
+    返回值是快取條目的深拷貝，調用方修改嵌套結構不會污染快取；
+    同一鍵正在計算時，後到的請求等待其結果而不重複計算"""
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._in_flight = {}        # 快取鍵 -> 正在計算的 Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def cache_key(code, language):
+        return hashlib.sha256(f"{language}\0{code}".encode('utf-8')).hexdigest()
+
+    def analyze(self, code, language):
+        if not code or not code.strip():
+            return {
+                'error': 'Empty code input',
+                'error_type': 'validation_error'
+            }
+        analyzer = ANALYZERS.get(language.lower())
+        if analyzer is None:
+            return {
+                'error': f'Unsupported language: {language}',
+                'error_type': 'validation_error'
+            }
+
+        key = self.cache_key(code, language.lower())
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                pending = self._in_flight.get(key)
+                if pending is not None:
+                    self.coalesced += 1
+                else:
+                    self.misses += 1
+                    self._in_flight[key] = leader = Future()
+        if cached is not None:
+            return _copy_result(cached, timestamp=time.time(), cached=True)
+        if pending is not None:
+            return _copy_result(pending.result(), timestamp=time.time(), cached=True)
+
+        try:
+            result = analyzer(code)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            leader.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            if self.cache_size > 0:
+                self._cache[key] = result
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                    self.evictions += 1
+        leader.set_result(result)
+        return _copy_result(result, timestamp=time.time(), cached=False)
+
+    def cache_info(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'size': len(self._cache),
+                'max_size': self.cache_size
+            }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -4,6 +4,7 @@
 包含完整的測試邏輯和驗證機制
 """
 
+import argparse
 import unittest
 import json
 import time
@@ -11,14 +12,22 @@ import psutil
 import threading
 import requests
 from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 import sys
 import os
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from code_analysis import CodeAnalyzer
+from batch_analysis import BatchAnalyzer
+from profiling import (CpuSampler, DEFAULT_ITERATIONS, DEFAULT_SAMPLE_INTERVAL, DEFAULT_TOP,
+                       iter_test_cases, print_cpu_report, print_memory_report, profile_memory)
+
 class TestCodingWorkflowMcp(unittest.TestCase):
     """編碼工作流MCP增強測試用例"""
     
     def setUp(self):
         """測試前準備"""
+        self.analyzer = CodeAnalyzer()
         self.test_data = {
             'python_code': '''
 def fibonacci(n):
@@ -48,12 +57,7 @@ def broken_function(
 ''',
             'large_code': 'def large_function():\n' + '    pass\n' * 1000
         }
-        
-        self.performance_baseline = {
-            'max_response_time': 5.0,  # 秒
-            'max_memory_usage': 100,   # MB
-            'max_cpu_usage': 80        # %
-        }
+        # 用例只驗證行為，耗時僅作輸出；性能回歸由 scripts/perf_suite.py 按歷史基線檢測
     
     def test_basic_code_analysis(self):
         """TC001: 基礎代碼分析測試"""
@@ -72,7 +76,6 @@ def broken_function(
         self.assertIn('analysis', result)
         self.assertIn('language', result)
         self.assertEqual(result['language'], 'python')
-        self.assertLess(response_time, self.performance_baseline['max_response_time'])
         
         print(f"✅ TC001 基礎代碼分析測試 - 通過 (響應時間: {response_time:.2f}s)")
     
@@ -120,9 +123,7 @@ def broken_function(
             self.assertIsNotNone(result)
             self.assertIn('analysis', result)
         
-        # 驗證並發性能
         avg_time_per_request = total_time / concurrent_requests
-        self.assertLess(avg_time_per_request, self.performance_baseline['max_response_time'])
         
         print(f"✅ TC003 並發處理測試 - 通過 (平均響應時間: {avg_time_per_request:.2f}s)")
     
@@ -140,7 +141,7 @@ def broken_function(
         # 驗證大文件處理
         self.assertIsNotNone(result)
         self.assertIn('analysis', result)
-        self.assertLess(processing_time, self.performance_baseline['max_response_time'] * 2)  # 大文件允許更長時間
+        self.assertEqual(result['analysis']['functions_detected'], 1)
         
         print(f"✅ TC004 大代碼文件處理測試 - 通過 (處理時間: {processing_time:.2f}s)")
     
@@ -160,8 +161,8 @@ def broken_function(
         final_memory = process.memory_info().rss / 1024 / 1024  # MB
         memory_increase = final_memory - initial_memory
         
-        # 驗證記憶體使用在合理範圍內
-        self.assertLess(memory_increase, self.performance_baseline['max_memory_usage'])
+        # 重複內容命中快取，不會累積新的分析結果
+        self.assertEqual(self.analyzer.cache_info()['hits'], 9)
         
         print(f"✅ TC005 記憶體使用監控測試 - 通過 (記憶體增長: {memory_increase:.2f}MB)")
     
@@ -182,56 +183,154 @@ def broken_function(
         
         print("✅ TC006 錯誤恢復測試 - 通過")
     
+    def test_syntax_error_location(self):
+        """TC007: 語法錯誤定位測試"""
+        print("🔍 執行測試用例: TC007 語法錯誤定位測試")
+        
+        result = self._analyze_code(self.test_data['invalid_code'], 'python')
+        self.assertEqual(result['error_type'], 'syntax_error')
+        self.assertEqual(result['line'], 2)
+        
+        js_result = self._analyze_code('function f() {\n    return (1;\n}', 'javascript')
+        self.assertEqual(js_result['error_type'], 'syntax_error')
+        self.assertEqual(js_result['line'], 3)
+        
+        print(f"✅ TC007 語法錯誤定位測試 - 通過 (第 {result['line']} 行)")
+    
+    def test_analysis_cache(self):
+        """TC008: 分析結果快取測試"""
+        print("🔍 執行測試用例: TC008 分析結果快取測試")
+        
+        first = self._analyze_code(self.test_data['python_code'], 'python')
+        second = self._analyze_code(self.test_data['python_code'], 'python')
+        
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(first['analysis'], second['analysis'])
+        self.assertEqual(first['analysis']['functions_detected'], 2)
+        self.assertEqual(self.analyzer.cache_info()['hits'], 1)
+        
+        print("✅ TC008 分析結果快取測試 - 通過")
+
+    def test_batch_process_analysis(self):
+        """TC009: 進程池批量分析測試"""
+        print("🔍 執行測試用例: TC009 進程池批量分析測試")
+
+        items = [(i, self.test_data['python_code'] + f"\nx_{i} = {i}\n", 'python') for i in range(20)]
+        items.append(('invalid', self.test_data['invalid_code'], 'python'))
+
+        batch = BatchAnalyzer(workers=2, chunksize=4)
+        results = dict(batch.analyze_items(items))
+
+        self.assertEqual(len(results), 21)
+        self.assertEqual(results[7]['analysis']['functions_detected'], 2)
+        self.assertEqual(results['invalid']['error_type'], 'syntax_error')
+        report = batch.report.to_dict()
+        self.assertEqual(report['files'], 21)
+        self.assertEqual(report['errors'], 1)
+        self.assertGreater(report['files_per_sec'], 0)
+
+        print(f"✅ TC009 進程池批量分析測試 - 通過 ({report['files_per_sec']} files/sec)")
+
+    def test_cache_isolation_and_single_flight(self):
+        """TC010: 快取隔離與並發去重測試"""
+        print("🔍 執行測試用例: TC010 快取隔離與並發去重測試")
+
+        first = self._analyze_code(self.test_data['python_code'], 'python')
+        first['analysis']['functions'].clear()
+        first['analysis']['functions_detected'] = -1
+        second = self._analyze_code(self.test_data['python_code'], 'python')
+        self.assertEqual(second['analysis']['functions_detected'], 2)
+        self.assertEqual(len(second['analysis']['functions']), 2)
+
+        # 讓首個請求停在分析階段，確認其餘相同請求等待它的結果而不重複計算
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_analyzer(code):
+            calls.append(code)
+            started.set()
+            release.wait(5)
+            return {'analysis': {'functions': []}, 'language': 'slow', 'status': 'success'}
+
+        concurrent_requests = 5
+        with mock.patch.dict('code_analysis.ANALYZERS', {'slow': slow_analyzer}):
+            with ThreadPoolExecutor(max_workers=concurrent_requests) as executor:
+                futures = [executor.submit(self._analyze_code, 'x = 1', 'slow')]
+                self.assertTrue(started.wait(5))
+                futures += [executor.submit(self._analyze_code, 'x = 1', 'slow')
+                            for _ in range(concurrent_requests - 1)]
+                while self.analyzer.cache_info()['coalesced'] < concurrent_requests - 1:
+                    time.sleep(0.01)
+                release.set()
+                results = [future.result() for future in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sum(1 for r in results if not r['cached']), 1)
+        self.assertIsNot(results[0]['analysis'], results[1]['analysis'])
+
+        print("✅ TC010 快取隔離與並發去重測試 - 通過")
+
+    def test_javascript_regex_literals(self):
+        """TC011: JavaScript 正則字面量測試"""
+        print("🔍 執行測試用例: TC011 JavaScript 正則字面量測試")
+
+        # 正則中的括號與引號不參與配對，'/' 在值之後仍是除號
+        for code in ('const r = s.replace(/\\(/g, "");',
+                     "const q = /'/.test(x);",
+                     'function f(s) {\n    if (/[/(]/.test(s)) return /\\//g;\n    return a / b / c;\n}'):
+            result = self._analyze_code(code, 'javascript')
+            self.assertNotIn('error', result, code)
+
+        result = self._analyze_code('const half = total / 2;\nconst bad = (half;', 'javascript')
+        self.assertEqual(result['error_type'], 'syntax_error')
+        self.assertEqual((result['line'], result['column']), (2, 13))
+
+        print("✅ TC011 JavaScript 正則字面量測試 - 通過")
+
     def _analyze_code(self, code, language):
-        """模擬代碼分析功能"""
+        """代碼分析：AST/詞法分析，結果按內容哈希快取"""
         try:
-            # 模擬API調用延遲
-            time.sleep(0.1)
-            
-            # 檢查輸入有效性
-            if not code.strip():
-                return {
-                    'error': 'Empty code input',
-                    'error_type': 'validation_error'
-                }
-            
-            # 檢查語法錯誤（簡單檢查）
-            if 'def broken_function(' in code and 'return "this will fail"' in code:
-                return {
-                    'error': 'Syntax error detected',
-                    'error_type': 'syntax_error'
-                }
-            
-            # 正常分析結果
-            return {
-                'analysis': {
-                    'language': language,
-                    'lines_of_code': len(code.split('\n')),
-                    'functions_detected': code.count('def ') + code.count('function '),
-                    'complexity_score': min(len(code) // 100, 10),
-                    'quality_score': 85
-                },
-                'language': language,
-                'timestamp': time.time(),
-                'status': 'success'
-            }
-            
+            return self.analyzer.analyze(code, language)
         except Exception as e:
             return {
                 'error': str(e),
                 'error_type': 'processing_error'
             }
 
-def run_tests():
-    """運行所有測試"""
+def run_tests(argv=None):
+    """運行所有測試；--profile-mem / --profile-cpu 時附帶剖析報告"""
+    parser = argparse.ArgumentParser(description='coding_workflow_mcp 增強測試')
+    parser.add_argument('--profile-mem', action='store_true', help='tracemalloc 逐用例內存剖析')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help='內存剖析每個用例的運行輪數')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='報告中列出的分配熱點數')
+    parser.add_argument('--profile-cpu', action='store_true', help='採樣式 CPU 剖析')
+    parser.add_argument('--cpu-output', default='coding_workflow_cpu.folded', help='collapsed stacks 輸出路徑')
+    parser.add_argument('--cpu-interval', type=float, default=DEFAULT_SAMPLE_INTERVAL, help='採樣間隔（秒）')
+    args = parser.parse_args(argv)
+
     print("✅ 開始測試 coding_workflow_mcp")
     
     # 創建測試套件
     suite = unittest.TestLoader().loadTestsFromTestCase(TestCodingWorkflowMcp)
+    # 套件運行後會釋放用例引用，剖析前先記下
+    cases = list(iter_test_cases(suite))
     
     # 運行測試
     runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
+    if args.profile_cpu:
+        started = time.perf_counter()
+        with CpuSampler(args.cpu_interval) as sampler:
+            result = runner.run(suite)
+        sampler.write_collapsed(args.cpu_output)
+        print_cpu_report(sampler, args.cpu_output, started, args.top)
+    else:
+        result = runner.run(suite)
+    
+    if args.profile_mem:
+        reports = [profile_memory(test, args.iterations, args.top) for test in cases]
+        print_memory_report(reports, args.top)
     
     # 輸出測試結果
     if result.wasSuccessful():
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+並行分片測試運行器
+發現 mcp/testing 下的所有測試模塊，按用例分發到多個工作進程並行執行，單個用例超時即終止其進程；
+輸出 JUnit XML 與按耗時排序的 JSON 報告，並按上次耗時從慢到快排序以縮短總時長
+
+用法: python parallel_runner.py [--workers N] [--timeout 60] [--shard 1/3] [-k 關鍵字]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+import unittest
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from multiprocessing.connection import wait
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTING_DIR)
+from profiling import iter_test_cases
+
+DEFAULT_PATTERNS = ('*_test.py', 'test_*.py')
+DEFAULT_TIMEOUT = 60.0          # 秒，單個用例
+REPORT_DIR = os.path.join(TESTING_DIR, 'reports')
+DEFAULT_JUNIT_PATH = os.path.join(REPORT_DIR, 'junit.xml')
+DEFAULT_TIMING_PATH = os.path.join(REPORT_DIR, 'timings.json')
+SLOWEST_COUNT = 10
+
+STATUS_ICONS = {'passed': '✅', 'failed': '❌', 'error': '💥', 'skipped': '⏭️', 'timeout': '⏱️', 'crashed': '💀'}
+
+
+class _CollectingResult(unittest.TestResult):
+    """只記錄單個用例的結果，供工作進程回傳"""
+
+    def __init__(self):
+        super().__init__()
+        self.status = 'passed'
+        self.message = None
+        self.details = None
+
+    def _record(self, status, err):
+        self.status = status
+        self.message = str(err[1]).splitlines()[0] if str(err[1]) else err[0].__name__
+        self.details = ''.join(traceback.format_exception(*err))
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record('failed', err)
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record('error', err)
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self.status = 'skipped'
+        self.message = reason
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self.status = 'failed'
+        self.message = 'unexpected success'
+
+
+def run_single_test(test_id, test):
+    """運行單個用例並捕獲輸出，返回可序列化的結果；test 可以是只含該用例的套件，
+    經由 TestSuite 運行時 setUpModule / setUpClass 等夾具才會執行"""
+    result = _CollectingResult()
+    output = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        test.run(result)
+    return {
+        'id': test_id,
+        'status': result.status,
+        'duration': round(time.perf_counter() - started, 4),
+        'message': result.message,
+        'details': result.details,
+        'output': output.getvalue()
+    }
+
+
+def _worker_main(conn, start_dir):
+    """工作進程：逐個接收用例 ID 並執行，收到 None 時退出"""
+    sys.path.insert(0, start_dir)
+    loader = unittest.TestLoader()
+    while True:
+        test_id = conn.recv()
+        if test_id is None:
+            break
+        try:
+            outcome = run_single_test(test_id, loader.loadTestsFromName(test_id))
+        except Exception as e:
+            outcome = {'id': test_id, 'status': 'error', 'duration': 0.0, 'message': str(e),
+                       'details': traceback.format_exc(), 'output': ''}
+        conn.send(outcome)
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, start_dir):
+        self.conn, child_conn = multiprocessing.Pipe()
+        # 非守護進程：用例內部可能還要創建進程池
+        self.process = multiprocessing.Process(target=_worker_main, args=(child_conn, start_dir))
+        self.process.start()
+        child_conn.close()
+        self.test_id = None
+        self.deadline = None
+        self.started = None
+
+    def assign(self, test_id, timeout):
+        self.test_id = test_id
+        self.started = time.perf_counter()
+        self.deadline = time.monotonic() + timeout
+        self.conn.send(test_id)
+
+    def release(self):
+        self.test_id = self.deadline = self.started = None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def shutdown(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+
+
+def discover_tests(start_dir=TESTING_DIR, patterns=DEFAULT_PATTERNS):
+    """返回 (可分發的用例 ID 列表, {用例 ID: 導入失敗的佔位用例})"""
+    loader = unittest.TestLoader()
+    test_ids = []
+    broken = {}
+    seen = set()
+    for pattern in patterns:
+        for test in iter_test_cases(loader.discover(start_dir, pattern=pattern, top_level_dir=start_dir)):
+            test_id = test.id()
+            if test_id in seen:
+                continue
+            seen.add(test_id)
+            if type(test).__name__ == '_FailedTest':
+                broken[test_id] = test
+            else:
+                test_ids.append(test_id)
+    return test_ids, broken
+
+
+def load_timings(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return {test_id: info['duration'] for test_id, info in json.load(f)['tests'].items()}
+    except (FileNotFoundError, ValueError, KeyError):
+        return {}
+
+
+def order_slowest_first(test_ids, timings):
+    """按上次耗時從慢到快排序；沒有記錄的用例視為最慢，盡早開始"""
+    unknown = max(timings.values(), default=0.0) + 1.0
+    return sorted(test_ids, key=lambda test_id: (-timings.get(test_id, unknown), test_id))
+
+
+def shard_tests(test_ids, timings, index, count):
+    """貪心分片：按耗時從大到小放入當前總耗時最小的分片，返回第 index 片（從 1 開始）"""
+    loads = [0.0] * count
+    shards = [[] for _ in range(count)]
+    default = sum(timings.values()) / len(timings) if timings else 1.0
+    for test_id in order_slowest_first(test_ids, timings):
+        target = loads.index(min(loads))
+        shards[target].append(test_id)
+        loads[target] += timings.get(test_id, default)
+    return shards[index - 1]
+
+
+def run_parallel(test_ids, workers, timeout, start_dir=TESTING_DIR, on_result=None):
+    """動態分發：空閒進程領取隊首用例，超時或崩潰的進程被替換"""
+    queue = list(reversed(test_ids))
+    results = []
+    pool = [_Worker(start_dir) for _ in range(min(workers, len(test_ids)))]
+
+    def finish(outcome):
+        results.append(outcome)
+        if on_result is not None:
+            on_result(outcome)
+
+    try:
+        for worker in pool:
+            if queue:
+                worker.assign(queue.pop(), timeout)
+        while any(worker.test_id for worker in pool):
+            busy = [worker for worker in pool if worker.test_id]
+            remaining = max(min(worker.deadline for worker in busy) - time.monotonic(), 0)
+            ready = wait([worker.conn for worker in busy], timeout=remaining)
+
+            for index, worker in enumerate(pool):
+                if worker.test_id is None:
+                    continue
+                if worker.conn in ready:
+                    try:
+                        outcome = worker.conn.recv()
+                    except EOFError:
+                        worker.process.join(timeout=5)
+                        outcome = {'id': worker.test_id, 'status': 'crashed',
+                                   'duration': round(time.perf_counter() - worker.started, 4),
+                                   'message': f'工作進程退出，返回碼 {worker.process.exitcode}',
+                                   'details': None, 'output': ''}
+                        worker.kill()
+                        worker = pool[index] = _Worker(start_dir)
+                    finish(outcome)
+                elif time.monotonic() >= worker.deadline:
+                    finish({'id': worker.test_id, 'status': 'timeout', 'duration': timeout,
+                            'message': f'用例超過 {timeout}s 未完成，已終止工作進程',
+                            'details': None, 'output': ''})
+                    worker.kill()
+                    worker = pool[index] = _Worker(start_dir)
+                else:
+                    continue
+                worker.release()
+                if queue:
+                    worker.assign(queue.pop(), timeout)
+    finally:
+        for worker in pool:
+            if worker.test_id is None:
+                worker.shutdown()
+            else:
+                worker.kill()
+    return results
+
+
+def write_junit_xml(results, path, wall_time):
+    root = ET.Element('testsuites', name='mcp-testing', time=f"{wall_time:.3f}")
+    by_module = {}
+    for outcome in results:
+        by_module.setdefault(outcome['id'].split('.')[0], []).append(outcome)
+
+    for module, outcomes in sorted(by_module.items()):
+        counts = {status: sum(1 for o in outcomes if o['status'] == status) for status in STATUS_ICONS}
+        suite = ET.SubElement(root, 'testsuite', name=module, tests=str(len(outcomes)),
+                              failures=str(counts['failed']),
+                              errors=str(counts['error'] + counts['timeout'] + counts['crashed']),
+                              skipped=str(counts['skipped']),
+                              time=f"{sum(o['duration'] for o in outcomes):.3f}")
+        for outcome in sorted(outcomes, key=lambda o: o['id']):
+            classname, _, name = outcome['id'].rpartition('.')
+            case = ET.SubElement(suite, 'testcase', classname=classname, name=name,
+                                 time=f"{outcome['duration']:.3f}")
+            status = outcome['status']
+            if status == 'failed':
+                ET.SubElement(case, 'failure', message=outcome['message'] or '').text = outcome['details']
+            elif status in ('error', 'timeout', 'crashed'):
+                ET.SubElement(case, 'error', type=status, message=outcome['message'] or '').text = outcome['details']
+            elif status == 'skipped':
+                ET.SubElement(case, 'skipped', message=outcome['message'] or '')
+            if outcome.get('output'):
+                ET.SubElement(case, 'system-out').text = outcome['output']
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    ET.ElementTree(root).write(path, encoding='utf-8', xml_declaration=True)
+
+
+def build_timing_report(results, workers, wall_time, previous_timings, known_ids=None):
+    """本次結果覆蓋歷史耗時；分片或 -k 運行時保留其餘已知用例的歷史，供下次排序"""
+    summary = {status: 0 for status in STATUS_ICONS}
+    for outcome in results:
+        summary[outcome['status']] += 1
+    total = sum(outcome['duration'] for outcome in results)
+    ranked = sorted(results, key=lambda o: o['duration'], reverse=True)
+    tests = {test_id: {'duration': duration, 'status': None}
+             for test_id, duration in previous_timings.items()
+             if known_ids is None or test_id in known_ids}
+    tests.update((o['id'], {'duration': o['duration'], 'status': o['status']}) for o in results)
+    return {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'workers': workers,
+        'wall_time': round(wall_time, 3),
+        'total_test_time': round(total, 3),
+        'parallel_speedup': round(total / wall_time, 2) if wall_time > 0 else None,
+        'summary': summary,
+        'slowest': [{'id': o['id'], 'duration': o['duration'], 'status': o['status'],
+                     'previous': previous_timings.get(o['id'])}
+                    for o in ranked[:SLOWEST_COUNT]],
+        'tests': dict(sorted(tests.items()))
+    }
+
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('分片格式應為 i/n，例如 1/3')
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError('分片序號應在 1..n 之間')
+    return index, count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='mcp/testing 並行分片測試運行器')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='工作進程數')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='單個用例超時（秒）')
+    parser.add_argument('--shard', type=parse_shard, help='只運行第 i/n 片，按歷史耗時均衡分片')
+    parser.add_argument('-k', dest='keyword', help='只運行 ID 包含該子串的用例')
+    parser.add_argument('--start-dir', default=TESTING_DIR)
+    parser.add_argument('--junit-xml', default=DEFAULT_JUNIT_PATH)
+    parser.add_argument('--timing-report', default=DEFAULT_TIMING_PATH,
+                        help='JSON 耗時報告，同時作為下次運行的排序依據')
+    args = parser.parse_args(argv)
+
+    timings = load_timings(args.timing_report)
+    test_ids, broken = discover_tests(args.start_dir)
+    # 導入失敗的佔位用例與普通用例一樣參與過濾和分片，只是不分發到工作進程
+    test_ids += list(broken)
+    known_ids = set(test_ids)
+    if args.keyword:
+        test_ids = [test_id for test_id in test_ids if args.keyword in test_id]
+    if args.shard:
+        test_ids = shard_tests(test_ids, timings, *args.shard)
+    broken_ids = [test_id for test_id in test_ids if test_id in broken]
+    test_ids = order_slowest_first([test_id for test_id in test_ids if test_id not in broken], timings)
+    print(f"🔍 發現 {len(test_ids) + len(broken_ids)} 個用例，{args.workers} 個工作進程"
+          f"{f'，分片 {args.shard[0]}/{args.shard[1]}' if args.shard else ''}")
+
+    def report(outcome):
+        icon = STATUS_ICONS[outcome['status']]
+        message = f" - {outcome['message']}" if outcome['status'] not in ('passed', 'skipped') else ''
+        print(f"{icon} {outcome['id']} ({outcome['duration']:.2f}s){message}", flush=True)
+
+    started = time.perf_counter()
+    results = [run_single_test(test_id, broken[test_id]) for test_id in broken_ids]
+    for outcome in results:
+        report(outcome)
+    if test_ids:
+        results += run_parallel(test_ids, args.workers, args.timeout, args.start_dir, on_result=report)
+    wall_time = time.perf_counter() - started
+
+    write_junit_xml(results, args.junit_xml, wall_time)
+    timing_report = build_timing_report(results, args.workers, wall_time, timings, known_ids)
+    os.makedirs(os.path.dirname(args.timing_report) or '.', exist_ok=True)
+    with open(args.timing_report, 'w', encoding='utf-8') as f:
+        json.dump(timing_report, f, indent=2, ensure_ascii=False)
+
+    summary = timing_report['summary']
+    print(f"\n📊 {len(results)} 個用例，牆鐘 {timing_report['wall_time']}s，"
+          f"累計 {timing_report['total_test_time']}s，加速比 {timing_report['parallel_speedup']}")
+    print('   ' + '，'.join(f"{status} {count}" for status, count in summary.items() if count))
+    print("🐢 最慢用例:")
+    for entry in timing_report['slowest']:
+        print(f"   {entry['duration']:>8.3f}s {entry['id']}")
+    print(f"📄 JUnit XML: {args.junit_xml}\n📄 耗時報告: {args.timing_report}")
+
+    failed = sum(summary[status] for status in ('failed', 'error', 'timeout', 'crashed'))
+    if failed:
+        print(f"❌ 測試失敗: {failed} 個用例未通過")
+        return False
+    print("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
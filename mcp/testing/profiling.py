@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+測試剖析工具
+tracemalloc 快照逐用例統計分配熱點、每輪淨增長（洩漏檢測）與峰值內存；
+採樣式 CPU 剖析輸出 flamegraph 可用的 collapsed stacks
+"""
+
+import contextlib
+import gc
+import io
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import unittest
+from collections import Counter
+
+DEFAULT_ITERATIONS = 20
+DEFAULT_TOP = 10
+DEFAULT_SAMPLE_INTERVAL = 0.001     # 秒
+LEAK_THRESHOLD_BYTES = 1024         # 每輪淨增長超過 1KB 視為可疑洩漏
+
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+]
+
+
+def iter_test_cases(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iter_test_cases(test)
+        else:
+            yield test
+
+
+def _run_quietly(test):
+    """以全新實例運行一次用例，吞掉用例自身的輸出"""
+    result = unittest.TestResult()
+    with contextlib.redirect_stdout(io.StringIO()):
+        type(test)(test._testMethodName).run(result)
+    return result
+
+
+def _traced_current():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _slope(values):
+    """最小二乘斜率：每輪的平均增長，比首尾差更能抵抗單次抖動"""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    numerator = sum((i - mean_x) * (v - mean_y) for i, v in enumerate(values))
+    denominator = sum((i - mean_x) ** 2 for i in range(n))
+    return numerator / denominator
+
+
+def _format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def profile_memory(test, iterations=DEFAULT_ITERATIONS, top=DEFAULT_TOP):
+    """對單個用例做內存剖析；先預熱一輪，排除導入與快取的一次性分配"""
+    _run_quietly(test)
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(25)
+    try:
+        baseline = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        tracemalloc.reset_peak()
+        samples = [_traced_current()]
+        failures = 0
+        for _ in range(iterations):
+            result = _run_quietly(test)
+            failures += len(result.failures) + len(result.errors)
+            samples.append(_traced_current())
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    # 只擬合後半段：前幾輪的快取、字符串駐留等一次性增長會逐漸收斂，持續增長才是洩漏
+    growth = _slope(samples[len(samples) // 2:])
+    sites = []
+    for stat in snapshot.compare_to(baseline, 'lineno')[:top]:
+        frame = stat.traceback[0]
+        sites.append({
+            'file': frame.filename,
+            'line': frame.lineno,
+            'size_diff': stat.size_diff,
+            'count_diff': stat.count_diff
+        })
+    return {
+        'test': test.id(),
+        'iterations': iterations,
+        'failures': failures,
+        'peak_bytes': peak - samples[0],
+        'net_growth_bytes': samples[-1] - samples[0],
+        'growth_per_iteration': round(growth, 1),
+        'suspected_leak': growth > LEAK_THRESHOLD_BYTES,
+        'top_sites': sites
+    }
+
+
+def print_memory_report(reports, top=DEFAULT_TOP):
+    print("\n📊 內存剖析報告")
+    for report in reports:
+        flag = '⚠️ 可疑洩漏' if report['suspected_leak'] else '✅'
+        print(f"\n{flag} {report['test']}")
+        print(f"   峰值: {_format_bytes(report['peak_bytes'])}，"
+              f"{report['iterations']} 輪淨增長: {_format_bytes(report['net_growth_bytes'])}，"
+              f"每輪: {_format_bytes(report['growth_per_iteration'])}")
+        if report['failures']:
+            print(f"   ❌ 剖析期間 {report['failures']} 次失敗")
+        for site in report['top_sites'][:top]:
+            print(f"   {_format_bytes(site['size_diff']):>10} {site['count_diff']:>+7} "
+                  f"{os.path.relpath(site['file'])}:{site['line']}")
+    leaks = [r['test'] for r in reports if r['suspected_leak']]
+    if leaks:
+        print(f"\n⚠️ {len(leaks)} 個用例每輪增長超過 {_format_bytes(LEAK_THRESHOLD_BYTES)}: {', '.join(leaks)}")
+
+
+# 棧頂為這些函數的線程視為空閒等待，默認不計入 CPU 採樣
+IDLE_FUNCTIONS = {'wait', '_wait_for_tstate_lock', 'select', 'poll', 'accept', '_recv_bytes', 'get', 'join'}
+
+
+class CpuSampler:
+    """後台線程定期抓取各線程調用棧，按 collapsed stacks 格式累計"""
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL, include_idle=False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if not self.include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='cpu-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def write_collapsed(self, path):
+        """每行 "棧幀;棧幀;... 次數"，可直接交給 flamegraph.pl / speedscope"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, limit=DEFAULT_TOP):
+        """按棧頂（自身時間）統計最熱的函數"""
+        leaf = Counter()
+        for stack, count in self.stacks.items():
+            leaf[stack.rsplit(';', 1)[-1]] += count
+        return leaf.most_common(limit)
+
+
+def print_cpu_report(sampler, output_path, started, top=DEFAULT_TOP):
+    elapsed = time.perf_counter() - started
+    print(f"\n🔥 CPU 採樣: {sampler.samples} 次 ({elapsed:.2f}s)，collapsed stacks 已寫入 {output_path}")
+    total = sum(sampler.stacks.values()) or 1
+    for label, count in sampler.top_functions(top):
+        print(f"   {count / total:>6.1%} {label}")
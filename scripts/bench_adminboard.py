@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+統一管理平台壓測腳本
+啟動本地樁服務與管理平台（開發服務器 / 生產入口），併發請求 JSON 端點，輸出吞吐量與尾延遲。
+-plain 模式關閉條件響應、壓縮與 orjson（ADMINBOARD_SERVING_HOOKS=0），用於對比這些處理本身的收益
+
+用法: python scripts/bench_adminboard.py --modes dev prod-plain prod --duration 15 --concurrency 16
+"""
+
+import argparse
+import http.client
+import http.server
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ADMINBOARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'adminboard')
+
+# 模式名 -> (啟動命令, 是否啟用 serving 響應處理)
+MODES = {
+    'dev-plain': (lambda port: [sys.executable, 'unified_admin_platform.py'], False),
+    'dev': (lambda port: [sys.executable, 'unified_admin_platform.py'], True),
+    'prod-plain': (lambda port: [sys.executable, 'serve.py', '--port', str(port), '--threads', '32'], False),
+    'prod': (lambda port: [sys.executable, 'serve.py', '--port', str(port), '--threads', '32'], True)
+}
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """樁服務：所有健康端點返回 200"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"status": "ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_stubs(count):
+    services = {}
+    for i in range(count):
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', free_port()), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        services[f'stub_{i}'] = {
+            'port': server.server_address[1],
+            'name': f'Stub {i}',
+            'type': 'API',
+            'health_path': '/health',
+            'interval': 2
+        }
+    return services
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * q / 100.0), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_load(port, paths, duration, concurrency, conditional):
+    """每個線程持有一條 keep-alive 連接循環請求"""
+    latencies = []
+    errors = [0]
+    not_modified = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(worker_index):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        etags = {}
+        local = []
+        local_errors = local_304 = 0
+        i = worker_index
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            headers = {'Accept-Encoding': 'br, gzip'}
+            if conditional and path in etags:
+                headers['If-None-Match'] = etags[path]
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+            if response.status == 304:
+                local_304 += 1
+            elif response.status != 200:
+                local_errors += 1
+            if response.getheader('ETag'):
+                etags[path] = response.getheader('ETag')
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+            not_modified[0] += local_304
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'not_modified': not_modified[0],
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(latencies[-1], 2) if latencies else 0.0
+    }
+
+
+def bench_mode(mode, port, registry_path, args):
+    command, serving_hooks = MODES[mode]
+    env = dict(os.environ, ADMINBOARD_SERVICES=registry_path,
+               ADMINBOARD_SERVING_HOOKS='1' if serving_hooks else '0')
+    process = subprocess.Popen(command(port), cwd=ADMINBOARD_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+    try:
+        if not wait_for_port(port):
+            raise RuntimeError(f"{mode} 模式未能在端口 {port} 上啟動")
+        # 預熱：觸發後台探測並等待第一輪結果
+        run_load(port, args.paths, 2, 2, False)
+        return run_load(port, args.paths, args.duration, args.concurrency, args.conditional)
+    finally:
+        os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+        process.wait(timeout=15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='統一管理平台壓測')
+    parser.add_argument('--modes', nargs='+', default=['dev-plain', 'prod-plain', 'prod'],
+                        choices=sorted(MODES))
+    parser.add_argument('--port', type=int, default=9001, help='開發服務器固定監聽 9001')
+    parser.add_argument('--services', type=int, default=7, help='樁服務數量')
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--conditional', action='store_true', help='攜帶 If-None-Match 復用 ETag')
+    parser.add_argument('--paths', nargs='+', default=['/api/services/status', '/api/system/info'])
+    parser.add_argument('--json', action='store_true', help='以 JSON 輸出結果')
+    args = parser.parse_args()
+
+    services = start_stubs(args.services)
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump({'services': services}, f)
+        registry_path = f.name
+
+    results = {}
+    try:
+        for mode in args.modes:
+            print(f"⏱️  壓測 {mode} 模式 ({args.concurrency} 併發, {args.duration}s)...", file=sys.stderr)
+            results[mode] = bench_mode(mode, args.port, registry_path, args)
+    finally:
+        os.remove(registry_path)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<10} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>9} {'304':>7} {'errors':>7}")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['requests_per_sec']:>9} {r['p50_ms']:>7}ms {r['p95_ms']:>7}ms "
+              f"{r['p99_ms']:>7}ms {r['max_ms']:>8}ms {r['not_modified']:>7} {r['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+性能回歸基準套件
+覆蓋編碼工作流分析與統一管理平台的熱路徑：預熱、重複採樣，輸出中位數 / p95 / MAD，
+結果按 git 提交寫入 JSON 歷史，compare 在指標相對基線回歸超過閾值時以非零狀態退出。
+管理平台基準只訪問本地樁服務，可離線運行。
+
+用法:
+    python scripts/perf_suite.py run [--filter status] [--save]
+    python scripts/perf_suite.py compare [--baseline <commit>] [--threshold 0.10]
+    python scripts/perf_suite.py list
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPTS_DIR, '..'))
+ADMINBOARD_DIR = os.path.join(REPO_ROOT, 'adminboard')
+TESTING_DIR = os.path.join(REPO_ROOT, 'mcp', 'testing')
+for path in (SCRIPTS_DIR, ADMINBOARD_DIR, TESTING_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+DEFAULT_HISTORY = os.path.join(SCRIPTS_DIR, 'perf_history.json')
+DEFAULT_THRESHOLD = 0.10        # 中位數或 p95 變慢超過 10% 視為回歸
+NOISE_FACTOR = 3.0              # 且差值需超過 3 倍 MAD，避免噪聲誤報
+MIN_SAMPLE_SECONDS = 0.01       # 每個樣本至少運行 10ms，自動確定循環次數
+
+BENCHMARKS = {}
+
+
+def benchmark(name, group, budget_us=None):
+    """註冊基準：被裝飾函數做準備工作並返回待測的無參可調用對象；
+    budget_us 為絕對預算，中位數超出即失敗，與歷史基線無關"""
+    def decorator(setup):
+        BENCHMARKS[name] = {'name': name, 'group': group, 'setup': setup, 'budget_us': budget_us}
+        return setup
+    return decorator
+
+
+# ---- 編碼工作流 ----
+
+SAMPLE_PYTHON = '''
+def fibonacci(n):
+    if n <= 1:
+        return n
+    return fibonacci(n-1) + fibonacci(n-2)
+
+def main():
+    for i in range(10):
+        print(f"fibonacci({i}) = {fibonacci(i)}")
+
+if __name__ == "__main__":
+    main()
+'''
+
+SAMPLE_JAVASCRIPT = '''
+function factorial(n) {
+    if (n <= 1) return 1;
+    return n * factorial(n - 1);
+}
+
+const double = (xs) => xs.map(x => x * 2).filter(x => x > 2 && x < 100);
+console.log("Factorial of 5:", factorial(5), double([1, 2, 3]));
+'''
+
+
+@benchmark('workflow.analyze_python', 'workflow')
+def bench_analyze_python():
+    from code_analysis import analyze_python
+    return lambda: analyze_python(SAMPLE_PYTHON)
+
+
+@benchmark('workflow.analyze_python_large', 'workflow')
+def bench_analyze_python_large():
+    from code_analysis import analyze_python
+    code = '\n'.join(SAMPLE_PYTHON.replace('fibonacci', f'fibonacci_{i}').replace('main', f'main_{i}')
+                     for i in range(200))
+    return lambda: analyze_python(code)
+
+
+@benchmark('workflow.analyze_javascript', 'workflow')
+def bench_analyze_javascript():
+    from code_analysis import analyze_javascript
+    return lambda: analyze_javascript(SAMPLE_JAVASCRIPT)
+
+
+@benchmark('workflow.analyzer_cache_hit', 'workflow')
+def bench_analyzer_cache_hit():
+    from code_analysis import CodeAnalyzer
+    analyzer = CodeAnalyzer()
+    analyzer.analyze(SAMPLE_PYTHON, 'python')
+    return lambda: analyzer.analyze(SAMPLE_PYTHON, 'python')
+
+
+# ---- 統一管理平台 ----
+
+@benchmark('adminboard.latency_record', 'adminboard')
+def bench_latency_record():
+    from latency_store import LatencyStore
+    store = LatencyStore()
+    result = {'status': 'healthy', 'response_time_ms': 12.5}
+    return lambda: store.record_result('stub_0', result)
+
+
+@benchmark('adminboard.latency_summarize', 'adminboard')
+def bench_latency_summarize():
+    from latency_store import LatencyStore
+    store = LatencyStore()
+    now = time.time()
+    for i in range(3600):
+        store.record('stub_0', 5 + (i % 97), ts=now - 3600 + i)
+    return lambda: store.summarize('stub_0', 3600, now=now)
+
+
+@benchmark('adminboard.metrics_render', 'adminboard')
+def bench_metrics_render():
+    from metrics_exporter import AdminBoardMetrics
+    metrics = AdminBoardMetrics()
+    for i in range(7):
+        for j in range(50):
+            metrics.observe_probe(f'stub_{i}', '/health', 0.001 * j, 200)
+            metrics.record_outcome(f'stub_{i}', {'status': 'healthy'})
+    return metrics.render
+
+
+_admin_app = None
+
+
+def _admin_client():
+    """導入管理平台前把註冊表指向本地樁服務，首個請求後等待一輪探測完成"""
+    global _admin_app
+    if _admin_app is None:
+        from bench_adminboard import start_stubs
+        services = start_stubs(7)
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({'services': services}, f)
+        os.environ['ADMINBOARD_SERVICES'] = f.name
+        import unified_admin_platform
+        _admin_app = unified_admin_platform
+        client = unified_admin_platform.app.test_client()
+        client.get('/api/services/status')
+        unified_admin_platform.health_prober.probe_now()
+        os.remove(f.name)
+    return _admin_app.app.test_client()
+
+
+@benchmark('adminboard.status_snapshot', 'adminboard')
+def bench_status_snapshot():
+    client = _admin_client()
+    return lambda: client.get('/api/services/status')
+
+
+@benchmark('adminboard.status_not_modified', 'adminboard')
+def bench_status_not_modified():
+    client = _admin_client()
+
+    def request():
+        etag = client.get('/api/services/status').headers['ETag']
+        return client.get('/api/services/status', headers={'If-None-Match': etag})
+    return request
+
+
+@benchmark('adminboard.status_fresh', 'adminboard')
+def bench_status_fresh():
+    client = _admin_client()
+    return lambda: client.get('/api/services/status?fresh=1')
+
+
+@benchmark('adminboard.metrics_endpoint', 'adminboard')
+def bench_metrics_endpoint():
+    client = _admin_client()
+    return lambda: client.get('/metrics')
+
+
+def _instrumentation_budget():
+    from metrics_exporter import INSTRUMENTATION_BUDGET_US
+    return INSTRUMENTATION_BUDGET_US
+
+
+@benchmark('adminboard.request_instrumentation', 'adminboard', budget_us=_instrumentation_budget())
+def bench_request_instrumentation():
+    """單個請求的插樁開銷：before_request 計時鉤子 + after_request 指標鉤子"""
+    _admin_client()
+    platform_module = _admin_app
+    context = platform_module.app.test_request_context('/api/services/status')
+    context.push()
+    response = platform_module.app.response_class(status=200)
+
+    def request():
+        platform_module.start_request_timer()
+        platform_module.record_request_metrics(response)
+    return request
+
+
+# ---- 統計與執行 ----
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * q / 100.0), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(samples):
+    """樣本為單次調用耗時（秒），輸出微秒"""
+    ordered = sorted(samples)
+    median = percentile(ordered, 50)
+    mad = percentile(sorted(abs(s - median) for s in ordered), 50)
+    return {
+        'median_us': round(median * 1e6, 3),
+        'p95_us': round(percentile(ordered, 95) * 1e6, 3),
+        'mad_us': round(mad * 1e6, 3),
+        'min_us': round(ordered[0] * 1e6, 3),
+        'samples': len(ordered)
+    }
+
+
+def calibrate(func):
+    """倍增循環次數直到單個樣本耗時超過 MIN_SAMPLE_SECONDS"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - started >= MIN_SAMPLE_SECONDS or number >= 1 << 20:
+            return number
+        number *= 2
+
+
+def run_benchmark(spec, warmup, repeats):
+    func = spec['setup']()
+    number = calibrate(func)
+    for _ in range(warmup):
+        for _ in range(number):
+            func()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    return dict(summarize(samples), number=number)
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def load_history(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'commits': {}}
+
+
+def save_history(path, history):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def select_benchmarks(patterns):
+    if not patterns:
+        return list(BENCHMARKS.values())
+    return [spec for name, spec in BENCHMARKS.items() if any(p in name for p in patterns)]
+
+
+def run_suite(args):
+    specs = select_benchmarks(args.filter)
+    if not specs:
+        print(f"❌ 沒有匹配 {' '.join(args.filter)} 的基準，可選: {', '.join(BENCHMARKS)}", file=sys.stderr)
+        sys.exit(2)
+    results = {}
+    for spec in specs:
+        print(f"⏱️  {spec['name']}...", file=sys.stderr)
+        results[spec['name']] = run_benchmark(spec, args.warmup, args.repeats)
+    return results
+
+
+def check_budgets(results):
+    """返回超出絕對預算的 (名稱, 中位數, 預算) 列表"""
+    over = []
+    for name, result in results.items():
+        budget = BENCHMARKS.get(name, {}).get('budget_us')
+        if budget is not None and result['median_us'] > budget:
+            over.append((name, result['median_us'], budget))
+    return over
+
+
+def report_budgets(results):
+    over = check_budgets(results)
+    for name, median, budget in over:
+        print(f"❌ {name} 中位數 {median}us 超出預算 {budget}us", file=sys.stderr)
+    return bool(over)
+
+
+def print_results(results):
+    print(f"{'benchmark':<34} {'median':>11} {'p95':>11} {'MAD':>10} {'n':>5}")
+    for name, r in results.items():
+        print(f"{name:<34} {r['median_us']:>9}us {r['p95_us']:>9}us {r['mad_us']:>8}us {r['samples']:>5}")
+
+
+def record_run(history_path, results):
+    commit, dirty = git_revision()
+    history = load_history(history_path)
+    entry = history['commits'].setdefault(commit, {'results': {}})
+    entry.update({
+        'dirty': dirty,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine()
+    })
+    entry['results'].update(results)
+    save_history(history_path, history)
+    print(f"💾 結果已寫入 {history_path} ({commit}{' dirty' if dirty else ''})", file=sys.stderr)
+
+
+def _change(base, cur, key, threshold, noise):
+    """返回 (相對變化, 'slower' / 'faster' / None)"""
+    delta = cur[key] - base[key]
+    ratio = delta / base[key] if base[key] else 0.0
+    if ratio > threshold and delta > noise:
+        return ratio, 'slower'
+    if ratio < -threshold and -delta > noise:
+        return ratio, 'faster'
+    return ratio, None
+
+
+def compare_results(baseline, current, threshold):
+    """分別比較中位數與 p95，任一變慢即為回歸；返回 (行列表, 是否有回歸)，只比較兩邊都有的基準"""
+    rows = []
+    regressed = False
+    for name in sorted(set(baseline) & set(current)):
+        base, cur = baseline[name], current[name]
+        noise = NOISE_FACTOR * max(base['mad_us'], cur['mad_us'])
+        median_ratio, median_change = _change(base, cur, 'median_us', threshold, noise)
+        p95_ratio, p95_change = _change(base, cur, 'p95_us', threshold, noise)
+        slower = [label for label, change in (('p50', median_change), ('p95', p95_change)) if change == 'slower']
+        if slower:
+            verdict = f"REGRESSION ({'+'.join(slower)})"
+            regressed = True
+        elif median_change == 'faster':
+            verdict = 'improved'
+        else:
+            verdict = 'ok'
+        rows.append((name, base, cur, median_ratio, p95_ratio, verdict))
+    return rows, regressed
+
+
+def command_run(args):
+    results = run_suite(args)
+    print_results(results)
+    if args.save:
+        record_run(args.history, results)
+    return 1 if report_budgets(results) else 0
+
+
+def command_compare(args):
+    history = load_history(args.history)
+    commits = history['commits']
+    current_commit, _ = git_revision()
+
+    baseline_commit = args.baseline
+    if baseline_commit is None:
+        candidates = sorted((entry['timestamp'], commit) for commit, entry in commits.items()
+                            if commit != current_commit)
+        if not candidates:
+            print("❌ 歷史中沒有可用的基線，請先在基線提交上運行 run --save", file=sys.stderr)
+            return 2
+        baseline_commit = candidates[-1][1]
+    if baseline_commit not in commits:
+        print(f"❌ 歷史中沒有提交 {baseline_commit}", file=sys.stderr)
+        return 2
+
+    if args.current:
+        if args.current not in commits:
+            print(f"❌ 歷史中沒有提交 {args.current}", file=sys.stderr)
+            return 2
+        current = commits[args.current]['results']
+    else:
+        current = run_suite(args)
+        if args.save:
+            record_run(args.history, current)
+
+    rows, regressed = compare_results(commits[baseline_commit]['results'], current, args.threshold)
+    print(f"基線 {baseline_commit}，閾值 {args.threshold:.0%}")
+    print(f"{'benchmark':<34} {'p50 base':>11} {'p50 now':>11} {'change':>8} "
+          f"{'p95 base':>11} {'p95 now':>11} {'change':>8}  verdict")
+    for name, base, cur, median_ratio, p95_ratio, verdict in rows:
+        print(f"{name:<34} {base['median_us']:>9}us {cur['median_us']:>9}us {median_ratio:>+8.1%} "
+              f"{base['p95_us']:>9}us {cur['p95_us']:>9}us {p95_ratio:>+8.1%}  {verdict}")
+    over_budget = report_budgets(current)
+    if regressed:
+        print("❌ 檢測到性能回歸", file=sys.stderr)
+        return 1
+    if over_budget:
+        return 1
+    print("✅ 未檢測到性能回歸", file=sys.stderr)
+    return 0
+
+
+def command_list(args):
+    history = load_history(args.history)
+    for commit, entry in sorted(history['commits'].items(), key=lambda item: item[1]['timestamp']):
+        print(f"{commit:<12} {entry['timestamp']}  {len(entry['results']):>3} 項"
+              f"{'  (dirty)' if entry.get('dirty') else ''}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='性能回歸基準套件')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON 歷史文件路徑')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_run_options(sub):
+        sub.add_argument('--filter', nargs='+', help='只運行名稱包含任一子串的基準')
+        sub.add_argument('--warmup', type=int, default=3, help='預熱樣本數')
+        sub.add_argument('--repeats', type=int, default=25, help='採樣次數')
+        sub.add_argument('--save', action='store_true', help='按當前 git 提交寫入歷史')
+
+    add_run_options(subparsers.add_parser('run', help='運行基準並輸出統計'))
+    compare = subparsers.add_parser('compare', help='與歷史基線比較，回歸時返回 1')
+    add_run_options(compare)
+    compare.add_argument('--baseline', help='基線提交，默認為歷史中最近的其他提交')
+    compare.add_argument('--current', help='直接使用歷史中的提交結果而不重新運行')
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    subparsers.add_parser('list', help='列出歷史中的提交')
+
+    args = parser.parse_args()
+    commands = {'run': command_run, 'compare': command_compare, 'list': command_list}
+    sys.exit(commands[args.command](args))
+
+
+if __name__ == '__main__':
+    main()